@@ -0,0 +1,113 @@
+# Compare how long the supported builders take to build the sdist of a project.
+#
+# Usage: python benchmarks/builders.py [PROJECT] [--runs N] [--builders rye,uv,...]
+#
+# Without a project, a minimal hatchling project is created in a temporary folder.
+# Every builder runs on its own copy of the project, such that caches of one builder
+# do not affect the others. Builders that are not installed are skipped.
+
+import argparse
+import importlib.util
+import io
+import shutil
+import statistics
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import box
+import box.utils as ut
+from box.config import pyproject_writer
+from box.packager import PackageApp
+
+MINIMAL_PROJECT = """[project]
+name = "benchpkg"
+version = "0.1.0"
+dependencies = []
+
+[build-system]
+requires = ["hatchling"]
+build-backend = "hatchling.build"
+"""
+
+
+def available(builder: str) -> bool:
+    """Check if the tool of a builder is installed."""
+    if builder == "inprocess":
+        return True
+    if builder == "build":
+        return importlib.util.find_spec("build") is not None
+    return shutil.which(builder) is not None
+
+
+def create_project(folder: Path) -> Path:
+    """Create a minimal hatchling project in the given folder."""
+    folder.joinpath("src/benchpkg").mkdir(parents=True)
+    folder.joinpath("src/benchpkg/__init__.py").write_text("def run():\n    pass\n")
+    folder.joinpath("pyproject.toml").write_text(MINIMAL_PROJECT)
+    return folder
+
+
+def benchmark(project: Path, builder: str, runs: int):
+    """Build the sdist of the project several times and return the durations.
+
+    :return: List of durations in seconds or `None` if no sdist was built.
+    """
+    durations = []
+    with ut.set_dir(project):
+        pyproject_writer("builder", builder)
+        pyproject_writer("app_entry", "benchpkg:run")
+        pyproject_writer("entry_type", "spec")
+        for _ in range(runs):
+            shutil.rmtree("dist", ignore_errors=True)
+            packager = PackageApp()
+            with redirect_stdout(io.StringIO()):
+                packager.build()
+            if packager.sdist is None:
+                return None
+            durations.append(packager.timings["build"])
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the sdist build times of the supported builders."
+    )
+    parser.add_argument("project", nargs="?", type=Path, help="Project to build.")
+    parser.add_argument("--runs", type=int, default=3, help="Builds per builder.")
+    parser.add_argument(
+        "--builders", default=",".join(box.BUILDERS), help="Builders to compare."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = args.project or create_project(tmp.joinpath("source"))
+
+        results = {}
+        for builder in args.builders.split(","):
+            if not available(builder):
+                results[builder] = "not installed"
+                continue
+            project = tmp.joinpath(builder)
+            shutil.copytree(
+                source,
+                project,
+                ignore=shutil.ignore_patterns("dist", "build", "target"),
+            )
+            durations = benchmark(project, builder, args.runs)
+            if durations is None:
+                results[builder] = "failed"
+            else:
+                results[builder] = (
+                    f"median {statistics.median(durations):7.3f} s, "
+                    f"min {min(durations):7.3f} s"
+                )
+
+    print(f"sdist build times of {args.runs} run(s) per builder:")
+    for builder, result in results.items():
+        print(f"  {builder:10} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,18 @@
 
 BUILD_DIR_NAME = "build"
 RELEASE_DIR_NAME = "target/release"
+
+# commands of the supported builders, besides a custom build command, with the
+# placeholders `{dist}` for the dist folder and `{python}` for the Python command
+BUILDER_COMMANDS = {
+    "rye": ("rye", "build", "--out", "{dist}", "--sdist"),
+    "hatch": ("hatch", "build", "-t", "sdist"),
+    "pdm": ("pdm", "build", "--no-wheel", "-d", "{dist}"),
+    "build": ("{python}", "-m", "build", "--sdist", "--outdir", "{dist}"),
+    "flit": ("flit", "build", "--format", "sdist"),
+    "uv": ("uv", "build", "--sdist", "--out-dir", "{dist}"),
+    "inprocess": None,  # calls the PEP 517 backend, see `box.pep517.build_sdist`
+}
+
+# supported builders, besides a custom build command
+BUILDERS = tuple(BUILDER_COMMANDS)
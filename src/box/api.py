@@ -0,0 +1,187 @@
+# Programmatic API to package projects and create installers with box.
+
+import io
+import os
+import threading
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Union
+
+import box.checksums as cs
+import box.utils as ut
+from box import RELEASE_DIR_NAME
+
+# callback with the name of a phase, e.g., "build", and "start" or "end"
+ProgressCallback = Callable[[str, str], None]
+
+# calls change the working directory and the environment of the process, see
+# `_in_project`, so only one may run at a time
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """A file that box created."""
+
+    path: Path
+    sha256: str
+    size: int
+
+
+@dataclass(frozen=True)
+class PackageResult:
+    """Result of packaging a project with `package`.
+
+    `timings` holds the duration of the phases "build", "pyapp_source", and "cargo"
+    in seconds. `cache_stats` counts if the PyApp source was reused ("hits") or
+    downloaded ("misses"). `log` holds the messages that the CLI would print.
+    """
+
+    binary: Artifact
+    sdist: Union[Path, None]
+    timings: Dict[str, float] = field(default_factory=dict)
+    cache_stats: Dict[str, int] = field(default_factory=dict)
+    log: str = ""
+
+
+@dataclass(frozen=True)
+class InstallerResult:
+    """Result of creating installers with `make_installer`.
+
+    `timings` holds the duration of the created installers in seconds, by format or
+    "installer" for the default one. `cache_stats` counts installers that were up to
+    date ("hits") or created ("misses"). `log` holds the messages that the CLI would
+    print.
+    """
+
+    artifacts: List[Artifact] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    cache_stats: Dict[str, int] = field(default_factory=dict)
+    log: str = ""
+
+
+def package(
+    project_dir: Union[Path, str] = ".",
+    verbose: bool = False,
+    reproducible: bool = False,
+    pyapp_version: str = "latest",
+    pyapp_source: Union[Path, str] = None,
+    progress: ProgressCallback = None,
+) -> PackageResult:
+    """Build a project and package it with PyApp, like `box package`.
+
+    :param project_dir: Folder of the initialized box project.
+    :param verbose: Pass the output of the builder and cargo through.
+    :param reproducible: Create a reproducible build.
+    :param pyapp_version: PyApp version to download.
+    :param pyapp_source: Local PyApp source, folder or .tar.gz archive.
+    :param progress: Callback that is called at the start and end of each phase.
+
+    :return: The release binary, its hash, timings, and cache statistics.
+
+    :raises click.ClickException: Invalid project or packaging failed.
+    """
+    from box.packager import PackageApp
+
+    if pyapp_source is not None:
+        pyapp_source = Path(pyapp_source).absolute()
+
+    with _in_project(project_dir) as log:
+        ut.check_boxproject()
+        packager = PackageApp(
+            verbose=verbose, reproducible=reproducible, progress=progress
+        )
+        packager.check_requirements()
+        packager.build()
+        packager.package(pyapp_version, local_source=pyapp_source)
+        binary = _artifact(Path(packager.binary_name).absolute())
+        sdist = packager.sdist
+
+    return PackageResult(
+        binary=binary,
+        sdist=sdist.absolute() if sdist is not None else None,
+        timings=dict(packager.timings),
+        cache_stats=dict(packager.cache_stats),
+        log=log.getvalue(),
+    )
+
+
+def make_installer(
+    project_dir: Union[Path, str] = ".",
+    formats: Iterable[str] = None,
+    verbose: bool = False,
+    reproducible: bool = False,
+    force: bool = False,
+    progress: ProgressCallback = None,
+) -> InstallerResult:
+    """Create the installer(s) of a packaged project, like `box installer`.
+
+    :param project_dir: Folder of the initialized and packaged box project.
+    :param formats: Installer formats to create in parallel, e.g., `["tar", "zip"]`.
+        If not given, the default installer for the operating system is created.
+    :param verbose: Pass the output of external installer tools through.
+    :param reproducible: Create reproducible installers.
+    :param force: Create the installers even if they are up to date.
+    :param progress: Callback that is called at the start and end of each
+        installer. Formats are created in parallel, so it must be thread-safe.
+
+    :return: The installers with their hashes, timings, and cache statistics.
+
+    :raises click.ClickException: Invalid project or no release binary found.
+    """
+    from box.installer import CreateInstaller
+
+    with _in_project(project_dir) as log:
+        ut.check_boxproject()
+        installer = CreateInstaller(
+            verbose=verbose, reproducible=reproducible, force=force, progress=progress
+        )
+        if formats:
+            installer.create_formats(list(formats))
+            names = installer.installer_names
+        else:
+            installer.create_installer()
+            names = [installer.installer_name] if installer.installer_name else []
+
+        release_dir = Path(RELEASE_DIR_NAME).absolute()
+        manifest = cs.read_manifest(release_dir)
+        artifacts = [
+            _artifact(release_dir.joinpath(name), manifest.get(name))
+            for name in names
+            if release_dir.joinpath(name).is_file()
+        ]
+
+    return InstallerResult(
+        artifacts=artifacts,
+        timings=dict(installer.timings),
+        cache_stats=dict(installer.cache_stats),
+        log=log.getvalue(),
+    )
+
+
+def _artifact(path: Path, entry: Dict = None) -> Artifact:
+    """Return the artifact of a file, hashing it if no manifest entry is given."""
+    if entry is None:
+        entry = cs.hash_file(path, ["sha256"])
+    return Artifact(path=path, sha256=entry["sha256"], size=entry["size"])
+
+
+@contextmanager
+def _in_project(project_dir: Union[Path, str]) -> io.StringIO:
+    """Run in the project folder, capture the output, and restore the environment.
+
+    Packaging sets `PYAPP_*` and other variables for cargo, which must not leak
+    into the calling process. The working directory, the environment, and the
+    standard streams are global to the process, so calls are serialized with a lock.
+    """
+    with _lock:
+        environ = dict(os.environ)
+        log = io.StringIO()
+        try:
+            with ut.set_dir(Path(project_dir)), redirect_stdout(log):
+                with redirect_stderr(log):
+                    yield log
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
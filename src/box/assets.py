@@ -0,0 +1,232 @@
+# Find assets like icons in the project with an indexed, ignore-aware resolver.
+
+import fnmatch
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+# folders that never contain project assets, at any depth
+EXCLUDED_DIRS = ("build", "dist", "target", "venv", "node_modules", "__pycache__")
+
+# name of the folders that contain assets
+ASSETS_DIR_NAME = "assets"
+
+# icon suffixes in order of preference if no suffix is requested
+ICON_SUFFIXES = ("svg", "png", "jpg", "jpeg")
+
+# icon formats that can be derived from a master PNG, see `convert_icon`
+CONVERTIBLE_SUFFIXES = ("ico", "icns")
+
+# version of the icon conversion, part of the cache key of converted icons
+ICON_CONVERSION_VERSION = "1"
+
+# cache of asset folders per project root, see `asset_dirs`
+_index_cache: Dict[Path, Tuple[List[Path], Dict[Path, int]]] = {}
+
+
+class GitIgnore:
+    """Match paths against the patterns of a `.gitignore` file.
+
+    Only a subset of the `.gitignore` syntax is supported, which is sufficient to
+    skip folders during the search for assets: comments, trailing `/` for folders,
+    leading or inner `/` to anchor a pattern to the folder of the `.gitignore` file,
+    and the wildcards `*`, `?`, `[...]`, and `**/`. Negated patterns (`!`) are
+    ignored, i.e., they do not re-include anything.
+    """
+
+    def __init__(self, patterns: List[str]):
+        """Initialize the matcher.
+
+        :param patterns: Lines of the `.gitignore` file.
+        """
+        self._rules = []
+        for line in patterns:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#") or line.startswith("!"):
+                continue
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line.startswith("**/"):
+                line = line[3:]
+            anchored = "/" in line
+            self._rules.append((line.lstrip("/"), anchored, dir_only))
+
+    @classmethod
+    def from_file(cls, file: Path) -> "GitIgnore":
+        """Create the matcher from a `.gitignore` file.
+
+        :param file: Path to the `.gitignore` file.
+        """
+        with open(file, encoding="utf-8", errors="replace") as f:
+            return cls(f.readlines())
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Check if a path is ignored.
+
+        :param rel_path: Path relative to the folder of the `.gitignore` file,
+            with `/` as separator.
+        :param is_dir: If the path is a folder.
+        """
+        name = rel_path.rsplit("/", 1)[-1]
+        for pattern, anchored, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if anchored:
+                if fnmatch.fnmatchcase(rel_path, pattern):
+                    return True
+            elif fnmatch.fnmatchcase(name, pattern):
+                return True
+        return False
+
+
+def asset_dirs(root: Union[Path, None] = None) -> List[Path]:
+    """Return all asset folders in the project, in the order they are searched.
+
+    The project is walked top-down once and excluded, hidden, and ignored folders
+    are pruned, such that the walk never enters them. The result is cached and
+    re-used as long as the modification times of all walked folders and
+    `.gitignore` files are unchanged, i.e., no folder was added or removed.
+
+    :param root: Root folder of the project, defaults to the current folder.
+    """
+    root = Path.cwd() if root is None else Path(root).absolute()
+
+    cached = _index_cache.get(root)
+    if cached is not None and _mtimes_unchanged(cached[1]):
+        return cached[0]
+
+    found = []
+    mtimes = {}
+    ignores: List[Tuple[Path, GitIgnore]] = []
+    for current, dirs, files in os.walk(root):
+        current = Path(current)
+        mtimes[current] = _mtime(current)
+        if ".gitignore" in files:
+            gitignore = current.joinpath(".gitignore")
+            mtimes[gitignore] = _mtime(gitignore)
+            ignores.append((current, GitIgnore.from_file(gitignore)))
+
+        # prune the walk in place
+        dirs[:] = sorted(
+            it
+            for it in dirs
+            if not it.startswith(".")
+            and it not in EXCLUDED_DIRS
+            and not _ignored(current.joinpath(it), ignores)
+        )
+        if ASSETS_DIR_NAME in dirs:
+            found.append(current.joinpath(ASSETS_DIR_NAME))
+
+    _index_cache[root] = (found, mtimes)
+    return found
+
+
+def clear_cache() -> None:
+    """Clear the cache of asset folders."""
+    _index_cache.clear()
+
+
+def convert_icon(master: Path, suffix: str) -> Path:
+    """Convert a master PNG into an `.ico` or `.icns` icon.
+
+    Converted icons are stored in the `icons` folder of the user cache folder, see
+    `box.utils.cache_dir`, keyed by the hash of the master PNG, the target format,
+    and the version of the conversion. An existing conversion is returned without
+    decoding the master PNG again.
+
+    :param master: Path to the master PNG.
+    :param suffix: Icon format, see `CONVERTIBLE_SUFFIXES`.
+
+    :return: Path to the converted icon, named `icon.suffix`.
+
+    :raises ValueError: Invalid master PNG or unknown suffix.
+    """
+    from box.installer_utils.icon_hlp import convert_png
+    from box.utils import cache_dir
+
+    data = Path(master).read_bytes()
+    key = hashlib.sha256(
+        f"{ICON_CONVERSION_VERSION}:{suffix}:".encode() + data
+    ).hexdigest()
+    icon_file = cache_dir().joinpath("icons", key, f"icon.{suffix}")
+    if icon_file.is_file():
+        return icon_file
+
+    content = convert_png(data, suffix)
+    icon_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = icon_file.with_name(f".{icon_file.name}.{os.getpid()}.tmp")
+    tmp_file.write_bytes(content)
+    os.replace(tmp_file, icon_file)  # atomic, concurrent builds never see half a file
+    return icon_file
+
+
+def find_icon(
+    suffix: Union[str, None] = None,
+    icon: Union[Path, str, None] = None,
+    root: Union[Path, None] = None,
+) -> Union[Path, None]:
+    """Find the icon of the project.
+
+    If an icon is configured explicitly, it is used if it has the requested suffix.
+    Otherwise, a file with the same name and the requested suffix next to it is used.
+    If none exists, `None` is returned, such that the configured icon can be
+    converted, see `convert_icon`, instead of using a stale `icon.suffix` file.
+    Only if no icon is configured, all asset folders are searched for an
+    `icon.suffix` file. Without a suffix, the first of `ICON_SUFFIXES` that is found
+    is returned.
+
+    :param suffix: The suffix of the icon file, without the leading dot.
+    :param icon: Explicitly configured icon, relative to the project root.
+    :param root: Root folder of the project, defaults to the current folder.
+
+    :return: Path to the icon or `None` if no icon was found.
+    """
+    root = Path.cwd() if root is None else Path(root).absolute()
+    suffixes = [suffix] if suffix else list(ICON_SUFFIXES)
+
+    if icon is not None:
+        icon = root.joinpath(icon)
+        if suffix is None and icon.is_file():
+            return icon
+        for it in suffixes:
+            candidate = icon.with_suffix(f".{it}")
+            if candidate.is_file():
+                return candidate
+        return None
+
+    for assets_dir in asset_dirs(root):
+        for it in suffixes:
+            icon_file = assets_dir.joinpath(f"icon.{it}")
+            if icon_file.is_file():
+                return icon_file
+    return None
+
+
+def _ignored(path: Path, ignores: List[Tuple[Path, GitIgnore]]) -> bool:
+    """Check if a folder is ignored by any of the `.gitignore` files above it.
+
+    :param path: Absolute path to the folder.
+    :param ignores: Tuples of the folder of a `.gitignore` file and its matcher.
+    """
+    for base, gitignore in ignores:
+        try:
+            rel_path = path.relative_to(base).as_posix()
+        except ValueError:  # `.gitignore` of a sibling folder
+            continue
+        if gitignore.ignored(rel_path, is_dir=True):
+            return True
+    return False
+
+
+def _mtime(path: Path) -> int:
+    """Return the modification time of a path in ns, or -1 if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _mtimes_unchanged(mtimes: Dict[Path, int]) -> bool:
+    """Check if the modification times of all paths are still the same."""
+    return all(_mtime(path) == mtime for path, mtime in mtimes.items())
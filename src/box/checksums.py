@@ -0,0 +1,157 @@
+# Compute checksums of artifacts while writing them and verify them later.
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable
+
+CHECKSUM_ALGORITHMS = ("sha256", "blake2b")
+MANIFEST_JSON = "checksums.json"
+MANIFEST_SHA256SUMS = "SHA256SUMS"
+
+
+class HashingWriter:
+    """File-like object that hashes and counts all bytes written through it.
+
+    Use it to wrap a file that is opened for writing, such that the checksums are
+    computed while the bytes are streamed out and the file does not have to be read
+    again afterwards. Writers may seek back to patch a header in place: The hashes
+    computed on the fly are then invalid, which is flagged with `patched`, and the
+    file must be hashed again once it is complete.
+    """
+
+    def __init__(self, fout: BinaryIO, algorithms: Iterable[str] = CHECKSUM_ALGORITHMS):
+        """Initialize the hashing writer.
+
+        :param fout: File object to forward all writes to.
+        :param algorithms: Names of the `hashlib` algorithms to compute.
+        """
+        self._fout = fout
+        self._hashers = {it: hashlib.new(it) for it in algorithms}
+        try:
+            self._start = self._pos = fout.tell()
+        except (AttributeError, OSError):  # not seekable, e.g., a pipe
+            self._start = self._pos = 0
+        self.size = 0
+        self.patched = False
+
+    def write(self, data: bytes) -> int:
+        """Write data to the underlying file and update all hashes and the size."""
+        if self._pos != self._start + self.size:
+            self.patched = True
+        elif not self.patched:
+            for hasher in self._hashers.values():
+                hasher.update(data)
+        self._pos += len(data)
+        self.size = max(self.size, self._pos - self._start)
+        return self._fout.write(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Move the position in the underlying file, e.g., to patch a header."""
+        self._pos = self._fout.seek(offset, whence)
+        return self._pos
+
+    def tell(self) -> int:
+        """Return the current position in the underlying file."""
+        return self._pos
+
+    def flush(self) -> None:
+        """Flush the underlying file."""
+        self._fout.flush()
+
+    def hexdigests(self) -> Dict[str, str]:
+        """Return a dictionary with the algorithm names and the hex digests.
+
+        :raises ValueError: Bytes were patched, so the hashes are not valid.
+        """
+        if self.patched:
+            raise ValueError("Patched output must be hashed again after writing.")
+        return {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
+
+
+def hash_file(file: Path, algorithms: Iterable[str] = CHECKSUM_ALGORITHMS) -> Dict:
+    """Hash a file that already exists and return its manifest entry.
+
+    :param file: Path to the file.
+    :param algorithms: Names of the `hashlib` algorithms to compute.
+
+    :return: Dictionary with the hex digests of all algorithms and the size.
+    """
+    hashers = {it: hashlib.new(it) for it in algorithms}
+    with open(file, "rb") as f:
+        while chunk := f.read(1 << 20):
+            for hasher in hashers.values():
+                hasher.update(chunk)
+    entry = {name: hasher.hexdigest() for name, hasher in hashers.items()}
+    entry["size"] = os.path.getsize(file)
+    return entry
+
+
+def write_manifest(folder: Path, entries: Dict[str, Dict]) -> None:
+    """Write the `checksums.json` and `SHA256SUMS` manifests into a folder.
+
+    Existing entries in the manifest are kept if their files still exist,
+    such that artifacts from previous runs stay listed.
+
+    :param folder: Folder in which the artifacts and the manifests live.
+    :param entries: Dictionary with file names as keys and entries as values,
+        see `hash_file`.
+    """
+    manifest = read_manifest(folder)
+    manifest.update(entries)
+    manifest = {
+        name: manifest[name]
+        for name in sorted(manifest)
+        if folder.joinpath(name).is_file()
+    }
+
+    with open(folder.joinpath(MANIFEST_JSON), "w", newline="\n") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+    with open(folder.joinpath(MANIFEST_SHA256SUMS), "w", newline="\n") as f:
+        for name, entry in manifest.items():
+            f.write(f"{entry['sha256']}  {name}\n")
+
+
+def read_manifest(folder: Path) -> Dict[str, Dict]:
+    """Read the `checksums.json` manifest in a folder.
+
+    :param folder: Folder in which the manifest lives.
+
+    :return: Manifest entries, empty if no manifest exists.
+    """
+    manifest_file = folder.joinpath(MANIFEST_JSON)
+    if not manifest_file.is_file():
+        return {}
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+def verify_manifest(folder: Path, jobs: int = None) -> Dict[str, str]:
+    """Re-hash all files in the manifest of a folder in parallel.
+
+    :param folder: Folder in which the artifacts and the manifest live.
+    :param jobs: Number of files to hash in parallel, defaults to number of CPUs.
+
+    :return: Dictionary with the file names as keys and the status as value:
+        "ok", "missing", or "mismatch".
+    """
+    manifest = read_manifest(folder)
+
+    def verify(name: str) -> str:
+        """Verify a single file and return its status."""
+        file = folder.joinpath(name)
+        if not file.is_file():
+            return "missing"
+        entry = manifest[name]
+        algorithms = [it for it in CHECKSUM_ALGORITHMS if it in entry]
+        actual = hash_file(file, algorithms)
+        if all(actual[it] == entry[it] for it in algorithms + ["size"] if it in entry):
+            return "ok"
+        return "mismatch"
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return dict(zip(manifest, executor.map(verify, manifest)))
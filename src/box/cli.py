@@ -1,5 +1,8 @@
 """CLI for box-packager."""
 
+import os
+import signal
+import sys
 from pathlib import Path
 
 import rich_click as click
@@ -7,17 +10,47 @@ import rich_click as click
 import box
 import box.formatters as fmt
 import box.utils as ut
-from box import env_vars
-from box.cleaner import CleanProject
-from box.config import uninitialize
-from box.initialization import InitializeProject
-from box.installer import CreateInstaller
-from box.packager import PackageApp
+
+# subsystems are imported in the commands, such that `box --help` stays fast
 
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 
 
-@click.group(context_settings=CONTEXT_SETTINGS)
+class BoxGroup(click.RichGroup):
+    """Command group that forwards commands to a `box serve` daemon if one is set."""
+
+    def main(self, args=None, **kwargs):
+        """Run the command in the daemon at `BOX_DAEMON_SOCKET`, otherwise locally."""
+        if args is None:
+            args = sys.argv[1:]
+        args = list(args)
+
+        socket_path = os.environ.get("BOX_DAEMON_SOCKET")
+        if socket_path and args and not {"-h", "--help"} & set(args):
+            from box.daemon import DAEMON_COMMANDS, forward
+
+            if args[0] in DAEMON_COMMANDS and not self.keeps_running(args):
+                code = forward(socket_path, args)
+                if code is not None:
+                    sys.exit(code)
+        return super().main(args, **kwargs)
+
+    def keeps_running(self, args) -> bool:
+        """Check if a command runs until interrupted, e.g., `package --watch`.
+
+        Such commands would block the daemon's only worker, so they always run
+        locally.
+
+        :param args: Command line arguments, without `box`.
+        """
+        command = self.get_command(None, args[0]) if args else None
+        if command is None:
+            return False
+        with command.make_context(args[0], args[1:], resilient_parsing=True) as ctx:
+            return bool(ctx.params.get("watch"))
+
+
+@click.group(cls=BoxGroup, context_settings=CONTEXT_SETTINGS)
 @click.version_option(package_name="box_packager")
 def cli():
     """Automatic packaging and installers of your GUI with PyApp."""
@@ -35,7 +68,7 @@ def cli():
 @click.option(
     "-b",
     "--builder",
-    type=click.Choice(PackageApp().builders_and_custom),
+    type=click.Choice(list(box.BUILDERS) + ["custom"]),
     help="Set the builder for the project.",
 )
 @click.option(
@@ -83,6 +116,8 @@ def init(
     python_version,
 ):
     """Initialize a new project in the current folder."""
+    from box.initialization import InitializeProject
+
     ut.check_pyproject()
     my_init = InitializeProject(
         quiet=quiet,
@@ -97,6 +132,35 @@ def init(
     my_init.initialize()
 
 
+@cli.command(name="config")
+@click.option(
+    "--show-origin",
+    is_flag=True,
+    help=(
+        "Show where each value comes from: `default`, `user:<file>`, "
+        "`pyproject.toml`, or `env:<variable>`."
+    ),
+)
+def config_cmd(show_origin):
+    """Show the resolved configuration.
+
+    Values are resolved in layers, where later layers override earlier ones:
+    built-in defaults, the user configuration file (`BOX_CONFIG_FILE`), the
+    `[tool.box]` table of `pyproject.toml`, and `BOX_<KEY>` environmental variables.
+    Works outside of box projects, too, showing the host-wide settings.
+    """
+    import json
+
+    from box.config import current_pyproject, resolve_config
+
+    # outside of a valid project, only the host-wide settings are shown
+    for key, (value, origin) in sorted(resolve_config(current_pyproject()).items()):
+        if value is None:
+            continue
+        line = f"{key} = {json.dumps(value)}"
+        click.echo(f"{origin}\t{line}" if show_origin else line)
+
+
 @cli.command(name="env")
 @click.option(
     "--get", "get_var", help="Get the value that is currently set to a variable."
@@ -119,26 +183,58 @@ def init(
     help=("Set a `key=value` environmental variable pair with an integer value."),
 )
 @click.option("--unset", help="Unset variable with a given name.")
-def env(get_var, list_vars, set_bool, set_int, set_string, unset):
+@click.option(
+    "--import",
+    "import_file",
+    type=click.Path(exists=True, dir_okay=False),
+    help=(
+        "Set all variables from a `.env`, `.json`, or `.toml` file, "
+        "with one write of `pyproject.toml`."
+    ),
+)
+@click.option(
+    "--export",
+    "export_file",
+    type=click.Path(dir_okay=False),
+    help=(
+        "Write all variables to a `.env`, `.json`, or `.toml` file. "
+        "Use `-` to print them in `.env` format."
+    ),
+)
+def env(
+    get_var, list_vars, set_bool, set_int, set_string, unset, import_file, export_file
+):
     """Manage the environmental variables.
 
     All environmental variables will be set when packaging the app with PyApp.
     Therefore, if you want to set specific PYAPP_X variables, set them here.
     """
+    from contextlib import nullcontext
+
+    from box import env_vars
+    from box.config import pyproject_transaction
+
     ut.check_boxproject()
 
-    if get_var:
-        env_vars.get_var(get_var)
-    if set_bool:
-        env_vars.set_bool(set_bool)
-    if set_int:
-        env_vars.set_int(set_int)
-    if set_string:
-        env_vars.set_string(set_string)
-    if unset:
-        env_vars.unset(unset)
-    if list_vars:
-        env_vars.get_list()
+    # all changes are written at once, read-only calls do not need `tomlkit`
+    writes = set_bool or set_int or set_string or unset or import_file
+    with pyproject_transaction() if writes else nullcontext():
+        if import_file:
+            env_vars.import_file(import_file)
+        if get_var:
+            env_vars.get_var(get_var)
+        if set_bool:
+            env_vars.set_bool(set_bool)
+        if set_int:
+            env_vars.set_int(set_int)
+        if set_string:
+            env_vars.set_string(set_string)
+        if unset:
+            env_vars.unset(unset)
+        if list_vars:
+            env_vars.get_list()
+        if export_file:
+            env_vars.export_file(export_file)
 
 
 @cli.command(name="package")
@@ -164,7 +260,27 @@ def env(get_var, list_vars, set_bool, set_int, set_string, unset):
     default="latest",
     help="Specify the PyApp version to use. See release page on PyApp GitHub.",
 )
-def package(verbose, pyapp_source, pyapp_version):
+@click.option(
+    "-r",
+    "--reproducible",
+    default=False,
+    is_flag=True,
+    help=(
+        "Create a reproducible build. Timestamps are set to `SOURCE_DATE_EPOCH` "
+        "(or 1980-01-01 if not set) and local paths are not embedded."
+    ),
+)
+@click.option(
+    "-w",
+    "--watch",
+    default=False,
+    is_flag=True,
+    help=(
+        "Keep watching the project after packaging it and package it again "
+        "whenever files change that end up in the source distribution."
+    ),
+)
+def package(verbose, pyapp_source, pyapp_version, reproducible, watch):
     """Build the project, then package it with PyApp.
 
     Note that if the pyapp source is already in the `build` directory,
@@ -172,8 +288,10 @@ def package(verbose, pyapp_source, pyapp_version):
     This speeds up the process if you are packaging multiple times.
     If you want to re-download it, please clean the project first with `box clean`.
     """
+    from box.packager import PackageApp
+
     ut.check_boxproject()
-    my_packager = PackageApp(verbose=verbose)
+    my_packager = PackageApp(verbose=verbose, reproducible=reproducible)
     my_packager.check_requirements()
     my_packager.build()
     my_packager.package(pyapp_version, local_source=pyapp_source)
@@ -184,6 +302,17 @@ def package(verbose, pyapp_source, pyapp_version):
         f"in the `target/release` folder."
     )
 
+    if watch:
+        from box.watcher import ProjectWatcher
+
+        watcher = ProjectWatcher(
+            verbose=verbose, reproducible=reproducible, pyapp_version=pyapp_version
+        )
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            fmt.info("Stopped watching.")
+
 
 @cli.command(name="installer")
 @click.option(
@@ -193,11 +322,73 @@ def package(verbose, pyapp_source, pyapp_version):
     is_flag=True,
     help="Flag to enable verbose mode.",
 )
-def installer(verbose):
-    """Create an installer for the project."""
+@click.option(
+    "-f",
+    "--formats",
+    default=None,
+    help=(
+        "Comma separated list of installer formats to create in parallel, "
+        "e.g., `sh,tar,zip,bin`. If not given, the default installer for the "
+        "operating system is created."
+    ),
+)
+@click.option(
+    "-r",
+    "--reproducible",
+    default=False,
+    is_flag=True,
+    help=(
+        "Create reproducible installers. Timestamps are set to `SOURCE_DATE_EPOCH` "
+        "(or 1980-01-01 if not set)."
+    ),
+)
+@click.option(
+    "--verify-reproducible",
+    default=False,
+    is_flag=True,
+    help=(
+        "Create the installer(s) twice in reproducible mode and verify that the "
+        "created files are identical."
+    ),
+)
+@click.option(
+    "--force",
+    default=False,
+    is_flag=True,
+    help=(
+        "Create the installer(s) even if the release binary, icon, and configuration "
+        "did not change since the last run."
+    ),
+)
+def installer(verbose, formats, reproducible, verify_reproducible, force):
+    """Create an installer for the project.
+
+    Installers are only created again if their inputs changed since the last run.
+    """
+    from box.installer import CreateInstaller
+
     ut.check_boxproject()
-    my_installer = CreateInstaller(verbose=verbose)
-    my_installer.create_installer()
+    my_installer = CreateInstaller(
+        verbose=verbose, reproducible=reproducible or verify_reproducible, force=force
+    )
+    if formats:
+        formats = [it.strip() for it in formats.split(",")]
+
+    if verify_reproducible:
+        my_installer.verify_reproducible(formats)
+    elif formats:
+        my_installer.create_formats(formats)
+    else:
+        my_installer.create_installer()
+
+    if formats:
+        fmt.success(
+            f"Installers successfully created.\n"
+            f"You can find the installer files "
+            f"{', '.join(my_installer.installer_names)} in the `target/release` folder."
+        )
+        return
+
     inst_name = my_installer.installer_name
     if inst_name is not None:
         if Path(box.RELEASE_DIR_NAME).joinpath(inst_name).exists():
@@ -213,6 +404,81 @@ def installer(verbose):
             )
 
 
+@cli.command(name="verify")
+def verify():
+    """Verify the checksums of all artifacts in the `target/release` folder.
+
+    All files that are listed in the `checksums.json` manifest, which is written by
+    `box installer`, are hashed again in parallel and compared to the manifest.
+    """
+    from box.checksums import verify_manifest
+    from box.config import BoxConfig
+
+    ut.check_boxproject()
+    jobs = BoxConfig.from_pyproject().jobs or None
+    results = verify_manifest(Path(box.RELEASE_DIR_NAME), jobs=jobs)
+    if not results:
+        raise click.ClickException(
+            "No checksums found. Create the installer(s) first with `box installer`."
+        )
+
+    failed = [name for name, status in results.items() if status != "ok"]
+    for name in failed:
+        fmt.warning(f"{name}: {results[name]}")
+    if failed:
+        raise click.ClickException(
+            f"Verification failed for {len(failed)} of {len(results)} file(s)."
+        )
+    fmt.success(f"All {len(results)} file(s) verified.")
+
+
+@cli.command(name="serve")
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=(
+        "Unix socket to listen on. Defaults to `BOX_DAEMON_SOCKET` or `daemon.sock` "
+        "in the box cache folder."
+    ),
+)
+@click.option(
+    "-q",
+    "--queue-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of commands that can wait for the daemon, defaults to 8.",
+)
+def serve(socket_path, queue_size):
+    """Run a daemon that keeps box warm and runs commands for clients.
+
+    Clients forward the `config`, `env`, `package`, `installer`, `verify`, and
+    `clean` commands to the daemon if the `BOX_DAEMON_SOCKET` environmental variable
+    is set to its socket, and stream the output back. Commands run one after the
+    other. If the daemon is busy or cannot be reached, clients run the command
+    locally.
+    """
+    from box.daemon import DAEMON_SOCKET_VAR, BoxDaemon
+
+    socket_path = Path(
+        socket_path
+        or os.environ.get(DAEMON_SOCKET_VAR)
+        or ut.cache_dir().joinpath("daemon.sock")
+    ).absolute()
+    daemon = BoxDaemon(socket_path, queue_size=queue_size)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # clean up when stopped
+    fmt.info(
+        f"Serving on {socket_path}. "
+        f"Set `{DAEMON_SOCKET_VAR}={socket_path}` to forward commands."
+    )
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        fmt.info("Box daemon stopped.")
+
+
 @cli.command(name="clean")
 @click.option(
     "-d",
@@ -259,6 +525,8 @@ def clean(dist, build, target, source_pyapp, pyapp_folder):
     By default, the `dist`, `build`, and `target` folders are deleted.
     The cleaner will ensure that you are in an initialized `box` project folder.
     """
+    from box.cleaner import CleanProject
+
     ut.check_boxproject()
     my_cleaner = CleanProject(
         dist=dist,
@@ -283,6 +551,8 @@ def uninit(clean_project):
 
     All references to `box` will be removed from the `pyproject.toml` file.
     """
+    from box.config import uninitialize
+
     ut.check_boxproject()
     if clean_project:
         clean()
@@ -1,19 +1,78 @@
 # Parse the pyproject.toml file
 
+import copy
+import os
+import sys
 from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Tuple, Union
 
-import tomlkit
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+if TYPE_CHECKING:  # `tomlkit` is only imported for writing
+    from tomlkit import TOMLDocument
+
+# parsed `pyproject.toml` files per absolute path with their mtime and size
+_pyproject_cache: Dict[Path, Tuple[Tuple[int, int], Dict]] = {}
+
+# marker for required settings, see `BoxConfig.from_pyproject`
+_REQUIRED = object()
+
+# documents of the active transactions per absolute path, see `pyproject_transaction`
+_transactions: Dict[Path, "TOMLDocument"] = {}
+
+# seconds to wait for the lock on a `pyproject.toml` file on Windows
+PYPROJECT_LOCK_TIMEOUT = 60
+
+# host-wide settings with their type and default, which can also be set in the user
+# configuration file and overridden with `BOX_<KEY>` variables, see `resolve_config`
+CONFIG_DEFAULTS: Dict[str, Tuple[type, Any]] = {
+    "cache_dir": (str, None),  # platform default, see `box.utils.cache_dir`
+    "installer_prewarm": (bool, False),
+    "installer_prewarm_timeout": (int, 600),
+    "jobs": (int, 0),  # number of parallel jobs, 0 for one per task or CPU
+    "keep_versions": (int, 3),
+    "nsis_compressor": (str, "lzma"),
+    "nsis_dict_size": (int, None),
+    "nsis_solid": (bool, True),
+    "pyapp_source_url": (str, None),  # mirror of the PyApp GitHub releases
+}
+
+
+def config_default(key: str) -> Any:
+    """Return the built-in default of a host-wide setting, see `CONFIG_DEFAULTS`.
+
+    :param key: Name of the setting, e.g., `keep_versions`.
+    """
+    return CONFIG_DEFAULTS[key][1]
+
+
+def _type_error(key: str, value: Any) -> Union[str, None]:
+    """Return why a value of a host-wide setting has the wrong type, if it has.
+
+    :param key: Name of the setting, other keys are not checked.
+    :param value: Value of the setting.
+    """
+    typ = CONFIG_DEFAULTS.get(key, (object,))[0]
+    # booleans are integers in Python, but not in TOML
+    if not isinstance(value, typ) or (isinstance(value, bool) and typ is int):
+        return f"`{key}` must be a {typ.__name__}, not {value!r}."
+    return None
 
 
 class PyProjectParser:
-    """Parse the pyproject.toml file in the current folder."""
+    """Parse the pyproject.toml file in the current folder.
+
+    The file is parsed into plain dictionaries, see `load_pyproject`.
+    """
 
     def __init__(self):
         """Initialize the PyProjectParser."""
-        with open("pyproject.toml", "rb") as f:
-            self._pyproject = tomlkit.load(f)
+        self._pyproject = load_pyproject()
 
         try:
             self._project = self._pyproject["project"]
@@ -35,11 +94,39 @@ class PyProjectParser:
         """Return the (first) author of the project."""
         return self._project["authors"][0]["name"]
 
+    @property
+    def box_table(self) -> Dict:
+        """Return the complete `[tool.box]` configuration as a plain dictionary."""
+        try:
+            return copy.deepcopy(self._pyproject["tool"]["box"])
+        except KeyError:
+            return dict()
+
+    def box_setting(self, key: str) -> Any:
+        """Return a host-wide setting from `[tool.box]` or its built-in default.
+
+        Only the project layer is considered, see `resolve_config` for all layers.
+
+        :param key: Name of the setting, see `CONFIG_DEFAULTS`.
+        """
+        try:
+            return self._pyproject["tool"]["box"][key]
+        except KeyError:
+            return config_default(key)
+
     @property
     def builder(self) -> str:
         """Return the builder of the project."""
         return self._pyproject["tool"]["box"]["builder"]
 
+    @property
+    def description(self) -> str:
+        """Return the description of the project, or its name if not available."""
+        try:
+            return self._project["description"]
+        except KeyError:
+            return self.name
+
     @property
     def env_vars(self) -> Dict:
         """Return optional pyapp variables as list (if set), otherwise empty dict."""
@@ -48,6 +135,24 @@ class PyProjectParser:
         except (KeyError, TypeError):
             return dict()
 
+    @property
+    def icon(self) -> Union[str, None]:
+        """Return the explicitly configured icon path, or `None` if not set."""
+        try:
+            return self._pyproject["tool"]["box"]["icon"]
+        except KeyError:
+            return None
+
+    @property
+    def installer_prewarm(self) -> bool:
+        """Return if installers pre-warm the PyApp environment."""
+        return self.box_setting("installer_prewarm")
+
+    @property
+    def installer_prewarm_timeout(self) -> int:
+        """Return the timeout in seconds for pre-warming."""
+        return self.box_setting("installer_prewarm_timeout")
+
     @property
     def is_box_project(self):
         """Return if this folder is a box project or not."""
@@ -62,6 +167,11 @@ class PyProjectParser:
         """Return if the project is a GUI project."""
         return self._pyproject["tool"]["box"]["is_gui"]
 
+    @property
+    def keep_versions(self) -> int:
+        """Return the number of versions that Linux installers keep."""
+        return self.box_setting("keep_versions")
+
     @property
     def name(self) -> str:
         """Return the name of the project."""
@@ -72,6 +182,21 @@ class PyProjectParser:
         """Return the name of the package (project name with '-' replaced by '_')."""
         return self.name.replace("-", "_")
 
+    @property
+    def nsis_compressor(self) -> str:
+        """Return the compressor for NSIS installers."""
+        return self.box_setting("nsis_compressor")
+
+    @property
+    def nsis_dict_size(self) -> Union[int, None]:
+        """Return the LZMA dictionary size in MB for NSIS, `None` for its default."""
+        return self.box_setting("nsis_dict_size")
+
+    @property
+    def nsis_solid(self) -> bool:
+        """Return if NSIS installers are compressed solid."""
+        return self.box_setting("nsis_solid")
+
     @property
     def optional_dependencies(self) -> Union[str, None]:
         """Return optional dependencies for the project, or `None` if no key found."""
@@ -104,6 +229,11 @@ class PyProjectParser:
             pass
         return possible_entries
 
+    @property
+    def project_table(self) -> Dict:
+        """Return the complete `[project]` table as a plain dictionary."""
+        return copy.deepcopy(self._project)
+
     @property
     def python_version(self):
         """Get the python version to package the project with. If unset, return None."""
@@ -123,24 +253,535 @@ class PyProjectParser:
         return self._project["version"]
 
 
+class BoxConfig:
+    """Validated snapshot of the project configuration.
+
+    The snapshot is created once per run with `BoxConfig.from_pyproject` from the
+    layered configuration, see `resolve_config`. It checks all settings that are
+    required for packaging up front, such that a misconfigured project fails
+    before any build starts. Afterwards, all settings
+    are plain attributes. Installer specific settings (`keep_versions`,
+    `nsis_*`, `installer_prewarm*`) are taken over as they are and validated by
+    the installer.
+    """
+
+    __slots__ = (
+        "app_entry",
+        "app_entry_type",
+        "author",
+        "box_table",
+        "builder",
+        "description",
+        "env_vars",
+        "icon",
+        "installer_prewarm",
+        "installer_prewarm_timeout",
+        "is_gui",
+        "jobs",
+        "keep_versions",
+        "name",
+        "name_pkg",
+        "nsis_compressor",
+        "nsis_dict_size",
+        "nsis_solid",
+        "optional_dependencies",
+        "pyapp_source_url",
+        "python_version",
+        "version",
+    )
+
+    def __init__(self, **kwargs):
+        """Initialize the snapshot, use `BoxConfig.from_pyproject` instead.
+
+        :param kwargs: Value for each attribute in `__slots__`.
+        """
+        for key in self.__slots__:
+            setattr(self, key, kwargs.pop(key))
+        if kwargs:
+            raise TypeError(f"Unknown configuration keys: {', '.join(kwargs)}")
+
+    def __repr__(self) -> str:
+        """Return the representation of the snapshot."""
+        values = ", ".join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"BoxConfig({values})"
+
+    @classmethod
+    def from_pyproject(cls, pyproject: "PyProjectParser" = None) -> "BoxConfig":
+        """Create and validate the snapshot from the `pyproject.toml` file.
+
+        Settings that are not in `[tool.box]` are taken from the host-wide layers,
+        see `resolve_config`.
+
+        Values of `[tool.box.env-vars]` are converted to strings, booleans to
+        "1" and "0", such that they can be set as environmental variables.
+
+        :param pyproject: Parsed `pyproject.toml` file, parsed if not given.
+
+        :return: The validated snapshot.
+
+        :raises click.ClickException: Invalid configuration, listing all problems.
+        """
+        from rich_click import ClickException
+
+        from box import BUILDERS
+        from box.utils import PYAPP_APP_ENTRY_TYPES
+
+        if pyproject is None:
+            pyproject = PyProjectParser()
+        project = pyproject.project_table
+        # host-wide settings always have a value, at least their default
+        box = {
+            key: value
+            for key, (value, _) in resolve_config(pyproject).items()
+            if value is not None
+        }
+        errors = []
+
+        def get(table: Dict, key: str, typ: type, default: Any = _REQUIRED) -> Any:
+            """Return a value and record an error if it is missing or invalid."""
+            if key not in table:
+                if default is _REQUIRED:
+                    errors.append(f"`{key}` is missing.")
+                    return None
+                return default
+            value = table[key]
+            # booleans are integers in Python, but not in TOML
+            if not isinstance(value, typ) or (
+                isinstance(value, bool) and typ is not bool
+            ):
+                errors.append(f"`{key}` must be a {typ.__name__}, not {value!r}.")
+            return value
+
+        name = get(project, "name", str)
+        builder = get(box, "builder", str)
+        if isinstance(builder, str) and builder not in BUILDERS:
+            if not builder.lower().startswith("custom"):
+                errors.append(
+                    f"Unknown builder {builder!r}, valid builders are "
+                    f"{', '.join(BUILDERS)}, or `custom='command'`."
+                )
+            elif not builder.split("=", 1)[-1].strip("'\" "):
+                errors.append("The custom builder has no command.")
+        app_entry_type = get(box, "entry_type", str)
+        if isinstance(app_entry_type, str) and (
+            app_entry_type not in PYAPP_APP_ENTRY_TYPES
+        ):
+            errors.append(
+                f"Unknown entry_type {app_entry_type!r}, valid entry types are "
+                f"{', '.join(PYAPP_APP_ENTRY_TYPES)}."
+            )
+
+        env_vars = {}
+        for key, value in get(box, "env-vars", dict, {}).items():
+            if isinstance(value, bool):
+                env_vars[key] = "1" if value else "0"
+            elif isinstance(value, (str, int, float)):
+                env_vars[key] = str(value)
+            else:
+                errors.append(f"Variable `{key}` must be a string, number, or bool.")
+
+        # installers need an author, the project name is used if none is given
+        authors = project.get("authors") or [{}]
+        author = authors[0].get("name") if isinstance(authors[0], dict) else None
+        snapshot = dict(
+            app_entry=get(box, "app_entry", str),
+            app_entry_type=app_entry_type,
+            author=author if isinstance(author, str) and author else name,
+            box_table=box,
+            builder=builder,
+            description=project.get("description", name),
+            env_vars=env_vars,
+            icon=get(box, "icon", str, None),
+            installer_prewarm=box.get("installer_prewarm"),
+            installer_prewarm_timeout=box.get("installer_prewarm_timeout"),
+            is_gui=get(box, "is_gui", bool, False),
+            jobs=get(box, "jobs", int, config_default("jobs")),
+            keep_versions=box.get("keep_versions"),
+            name=name,
+            name_pkg=name.replace("-", "_") if isinstance(name, str) else name,
+            nsis_compressor=box.get("nsis_compressor"),
+            nsis_dict_size=box.get("nsis_dict_size"),
+            nsis_solid=box.get("nsis_solid"),
+            optional_dependencies=get(box, "optional_deps", str, None),
+            pyapp_source_url=get(box, "pyapp_source_url", str, None),
+            python_version=get(box, "python_version", str, None),
+            version=get(project, "version", str),
+        )
+
+        if isinstance(snapshot["jobs"], int) and snapshot["jobs"] < 0:
+            errors.append("`jobs` must not be negative.")
+
+        if errors:
+            raise ClickException(
+                "Invalid box configuration in `pyproject.toml`:\n- "
+                + "\n- ".join(errors)
+            )
+        return cls(**snapshot)
+
+
+def clear_pyproject_cache() -> None:
+    """Clear the cache of parsed `pyproject.toml` files, see `load_pyproject`."""
+    _pyproject_cache.clear()
+
+
+def load_pyproject(pyproject_file: Union[Path, str] = "pyproject.toml") -> Dict:
+    """Load a `pyproject.toml` file, parsing it only once per process.
+
+    The file is parsed with `tomllib` (`tomli` on Python < 3.11) into plain
+    dictionaries, which is much faster than the style-preserving `tomlkit` that is
+    only used for writing. The result is cached by the absolute path and re-used
+    as long as the modification time and size of the file are unchanged. Writes by
+    box invalidate the cache explicitly. Within a `pyproject_transaction`, the
+    pending document is returned, such that readers see the uncommitted changes.
+    The returned dictionary is shared and must not be modified; use
+    `pyproject_transaction` in order to edit the file.
+
+    :param pyproject_file: Path to the `pyproject.toml` file.
+
+    :return: The parsed file.
+    """
+    path = Path(pyproject_file).absolute()
+    if path in _transactions:
+        return _transactions[path].unwrap()
+
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _pyproject_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        doc = tomllib.load(f)
+    _pyproject_cache[path] = (key, doc)
+    return doc
+
+
+def load_user_config() -> Dict:
+    """Load the user configuration file, see `user_config_file`.
+
+    :return: The settings in the file, empty if the file does not exist.
+
+    :raises click.ClickException: Invalid file.
+    """
+    from rich_click import ClickException
+
+    user_file = user_config_file()
+    try:
+        with open(user_file, "rb") as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        return {}
+    except tomllib.TOMLDecodeError as e:
+        raise ClickException(f"Invalid user configuration file {user_file}: {e}")
+
+
+def resolve_config(
+    pyproject: "PyProjectParser" = None,
+) -> Dict[str, Tuple[Any, str]]:
+    """Resolve the layered configuration and the origin of each value.
+
+    The layers are, where later layers override earlier ones:
+
+    1. The built-in defaults of the host-wide settings, see `CONFIG_DEFAULTS`.
+    2. The user configuration file, see `user_config_file`, with the same keys
+       as `[tool.box]` at the top level.
+    3. The `[tool.box]` table of the `pyproject.toml` file, if given.
+    4. `BOX_<KEY>` environmental variables for the host-wide settings, e.g.,
+       `BOX_KEEP_VERSIONS=5`.
+
+    :param pyproject: Parsed `pyproject.toml` file, or `None` to only resolve the
+        host-wide layers.
+
+    :return: Dictionary with the key as key and a tuple of the value and its origin
+        as value. The origin is `default`, `user:<path>`, `pyproject.toml`, or
+        `env:<variable>`.
+
+    :raises click.ClickException: Invalid user configuration file, `[tool.box]`
+        setting, or variable.
+    """
+    from rich_click import ClickException
+
+    resolved = {
+        key: (default, "default") for key, (_, default) in CONFIG_DEFAULTS.items()
+    }
+
+    user_file = user_config_file()
+    for key, value in load_user_config().items():
+        if error := _type_error(key, value):
+            raise ClickException(
+                f"Invalid user configuration file {user_file}: {error}"
+            )
+        resolved[key] = (value, f"user:{user_file}")
+
+    if pyproject is not None:
+        for key, value in pyproject.box_table.items():
+            if error := _type_error(key, value):
+                raise ClickException(
+                    f"Invalid box configuration in `pyproject.toml`: {error}"
+                )
+            resolved[key] = (value, "pyproject.toml")
+
+    for key, (typ, _) in CONFIG_DEFAULTS.items():
+        var = f"BOX_{key.upper()}"
+        if (value := os.environ.get(var)) is None:
+            continue
+        if typ is bool and value.lower() in ("1", "true", "yes", "on"):
+            value = True
+        elif typ is bool and value.lower() in ("0", "false", "no", "off"):
+            value = False
+        elif typ is int:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ClickException(f"Cannot convert {var}={value} to int.") from None
+        elif typ is not str:
+            raise ClickException(f"Cannot convert {var}={value} to {typ.__name__}.")
+        resolved[key] = (value, f"env:{var}")
+
+    return resolved
+
+
+def current_pyproject() -> Union[PyProjectParser, None]:
+    """Return the parsed `pyproject.toml` file of the current folder, if any.
+
+    :return: The parsed file, or `None` if the folder has no valid project.
+    """
+    if not Path("pyproject.toml").is_file():
+        return None
+    try:
+        return PyProjectParser()
+    except KeyError:  # no `[project]` table
+        return None
+
+
+def user_config_file() -> Path:
+    """Return the path to the user configuration file of box.
+
+    The path can be set with the `BOX_CONFIG_FILE` environmental variable.
+    Otherwise, `config.toml` in the platform's user configuration folder is used.
+    """
+    if env_file := os.environ.get("BOX_CONFIG_FILE"):
+        return Path(env_file)
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or Path.home().joinpath("AppData/Roaming")
+    elif sys.platform == "darwin":
+        base = Path.home().joinpath("Library", "Application Support")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or Path.home().joinpath(".config")
+    return Path(base).joinpath("box", "config.toml")
+
+
+@contextmanager
+def pyproject_transaction(
+    pyproject_file: Union[Path, str] = "pyproject.toml",
+) -> Iterator["TOMLDocument"]:
+    """Batch modifications of a `pyproject.toml` file in memory.
+
+    The file is parsed once when the transaction starts. All modifications of the
+    yielded document, including the ones by `pyproject_writer`, are written with
+    one serialization and one atomic write when the transaction ends. Nothing is
+    written if an exception is raised or if the document is unchanged.
+    Transactions for the same file can be nested, the inner ones join the
+    outermost one.
+
+    :param pyproject_file: Path to the `pyproject.toml` file.
+
+    :return: The document to modify.
+
+    :raises FileNotFoundError: No `pyproject.toml` file found.
+    """
+    path = Path(pyproject_file).absolute()
+    if path in _transactions:
+        yield _transactions[path]
+        return
+
+    if not path.is_file():
+        raise FileNotFoundError("No `pyproject.toml` file found in current folder.")
+
+    import tomlkit
+
+    with _lock_pyproject(path):
+        with open(path, "rb") as f:
+            doc = tomlkit.load(f)
+        original = doc.as_string()
+
+        _transactions[path] = doc
+        try:
+            yield doc
+        finally:
+            del _transactions[path]
+
+        if doc.as_string() != original:
+            _dump_pyproject(doc, path)
+
+
 def pyproject_writer(key: str, value: Any, category: str = None) -> None:
     """Modify the existing `pyproject.toml` file using `tomlkit`.
 
     Project specific, the table [tools.box] is used. If the table does not exist,
     it is created. If the key does not exist, it is created. If the key exists,
-    it is overwritten.
+    it is overwritten. Within a `pyproject_transaction`, the change is only
+    written when the transaction ends.
 
     :param key: Key to write to.
     :param value: Value to write to key.
     :param category: If given, will write to ["tool"]["box"]["category"]["key"]["value"]
 
     """
-    pyproject_file = Path("pyproject.toml")
-    if not pyproject_file.is_file():
-        raise FileNotFoundError("No `pyproject.toml` file found in current folder.")
+    with pyproject_transaction() as doc:
+        _set_key(doc, key, value, category)
+
+
+def uninitialize() -> None:
+    """Un-initialize a box project."""
+    with pyproject_transaction() as doc:
+        doc["tool"].remove("box")
+
+
+def unset_env_variable(var_name: str) -> bool:
+    """Unset a variable name and return status if done or not.
+
+    :param var_name: Variable name in ["tool.box.env-vars"]
+
+    :return: True if variable successfully unset, False if not found, otherwise.
+    """
+    try:
+        with pyproject_transaction() as doc:
+            doc["tool"]["box"]["env-vars"].remove(var_name)
+        return True
+    except:  # noqa: E722
+        return False
+
+
+def _dump_pyproject(doc: "TOMLDocument", pyproject_file: Path) -> None:
+    """Write a `pyproject.toml` file atomically and invalidate its cached document.
+
+    The document is written to a temporary file in the same folder and synced to
+    disk, then the temporary file replaces the `pyproject.toml` file. Readers hence
+    never see a partial file, not even after a crash. The file mode is kept.
+
+    :param doc: Document to write.
+    :param pyproject_file: Path to the `pyproject.toml` file.
+    """
+    pyproject_file = Path(pyproject_file)
+    tmp_file = pyproject_file.with_name(f".{pyproject_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "w", newline="\n") as f:
+            f.write(doc.as_string())
+            f.flush()
+            os.fsync(f.fileno())
+        if pyproject_file.exists():
+            os.chmod(tmp_file, pyproject_file.stat().st_mode & 0o7777)
+        os.replace(tmp_file, pyproject_file)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+    _fsync_dir(pyproject_file.absolute().parent)
+    _pyproject_cache.pop(pyproject_file.absolute(), None)
+
+
+def _fsync_dir(folder: Path) -> None:
+    """Sync a folder to disk, such that a rename in it is durable.
+
+    Not possible on Windows, where `os.replace` is durable on its own.
+
+    :param folder: Folder to sync.
+    """
+    if os.name == "nt":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:  # not supported by all file systems
+        pass
+    finally:
+        os.close(fd)
 
-    with open(pyproject_file, "rb") as f:
-        doc = tomlkit.load(f)
+
+@contextmanager
+def _lock_pyproject(pyproject_file: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock for modifying a `pyproject.toml` file.
+
+    The lock is taken on a separate file, since the `pyproject.toml` file itself is
+    replaced on every write. The lock file lives in the `locks` folder of the box
+    cache folder, keyed by the absolute path of the `pyproject.toml` file, such that
+    it never ends up in the project, e.g., in an sdist or a commit. If the cache
+    folder cannot be used, e.g., in a read-only home folder, a hidden lock file
+    next to the `pyproject.toml` file is used instead. It is left in place, as
+    removing it would race with other processes. The call blocks until the lock is
+    available, on Windows at most `PYPROJECT_LOCK_TIMEOUT` seconds.
+
+    :param pyproject_file: Path to the `pyproject.toml` file.
+
+    :raises click.ClickException: Timed out waiting for the lock on Windows.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        fcntl = None
+        import msvcrt
+
+    with open(_pyproject_lock_file(pyproject_file), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            import errno
+            import time
+
+            from rich_click import ClickException
+
+            deadline = time.monotonic() + PYPROJECT_LOCK_TIMEOUT
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError as e:
+                    if e.errno not in (errno.EACCES, errno.EDEADLOCK):
+                        raise
+                    if time.monotonic() >= deadline:
+                        raise ClickException(
+                            f"Timed out waiting for the lock on {pyproject_file}."
+                        ) from e
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _pyproject_lock_file(pyproject_file: Path) -> Path:
+    """Return the lock file for a `pyproject.toml` file, see `_lock_pyproject`."""
+    import hashlib
+
+    from rich_click import ClickException
+
+    from box.utils import cache_dir
+
+    key = hashlib.sha256(os.fsencode(pyproject_file.resolve())).hexdigest()[:16]
+    try:
+        lock_file = cache_dir().joinpath("locks", f"{key}.lock")
+        lock_file.parent.mkdir(parents=True, exist_ok=True)
+        lock_file.touch()
+    except (ClickException, OSError):  # invalid configuration or not writable
+        lock_file = pyproject_file.with_name(f".{pyproject_file.name}.lock")
+    return lock_file
+
+
+def _set_key(doc: "TOMLDocument", key: str, value: Any, category: str = None) -> None:
+    """Set a key in the `[tool.box]` table of a document, see `pyproject_writer`.
+
+    :param doc: Document to modify.
+    :param key: Key to write to.
+    :param value: Value to write to key.
+    :param category: If given, will write to ["tool"]["box"]["category"]["key"]["value"]
+    """
+    import tomlkit
 
     key_box_present = False
     try:
@@ -181,40 +822,3 @@ def pyproject_writer(key: str, value: Any, category: str = None) -> None:
             doc.add("tool", tool_table)
 
     edit_table.update({key: value})
-
-    with open(pyproject_file, "w", newline="\n") as f:
-        tomlkit.dump(doc, f)
-
-
-def uninitialize() -> None:
-    """Un-initialize a box project."""
-    pyproject_file = Path("pyproject.toml")
-
-    with open(pyproject_file, "rb") as f:
-        doc = tomlkit.load(f)
-
-    doc["tool"].remove("box")
-
-    with open(pyproject_file, "w", newline="\n") as f:
-        tomlkit.dump(doc, f)
-
-
-def unset_env_variable(var_name: str) -> bool:
-    """Unset a variable name and return status if done or not.
-
-    :param var_name: Variable name in ["tool.box.env-vars"]
-
-    :return: True if variable successfully unset, False if not found, otherwise.
-    """
-    pyproject_file = Path("pyproject.toml")
-
-    with open(pyproject_file, "rb") as f:
-        doc = tomlkit.load(f)
-
-    try:
-        doc["tool"]["box"]["env-vars"].remove(var_name)
-        with open(pyproject_file, "w", newline="\n") as f:
-            tomlkit.dump(doc, f)
-        return True
-    except:  # noqa: E722
-        return False
@@ -0,0 +1,273 @@
+# Long-running daemon that runs box commands for thin clients over a Unix socket.
+
+import codecs
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from pathlib import Path
+from typing import Dict, List, Union
+
+import rich_click as click
+
+import box.formatters as fmt
+
+# environmental variable with the socket path that clients forward commands to
+DAEMON_SOCKET_VAR = "BOX_DAEMON_SOCKET"
+
+# commands that are forwarded to the daemon, all others always run locally
+DAEMON_COMMANDS = ("config", "env", "package", "installer", "verify", "clean")
+
+# default number of jobs that can wait for the daemon before clients run locally
+DAEMON_QUEUE_SIZE = 8
+
+
+class _Job:
+    """One command that a client asked the daemon to run."""
+
+    def __init__(self, request: Dict):
+        """Initialize the job from a client request.
+
+        :param request: Dictionary with the `args`, the `cwd`, and the `env`.
+        """
+        self.args = [str(it) for it in request["args"]]
+        self.cwd = request["cwd"]
+        self.env = dict(request["env"])
+        self.messages = queue.Queue()  # messages to stream back to the client
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Queue the job of a client and stream its output back."""
+
+    def handle(self):
+        try:
+            job = _Job(json.loads(self.rfile.readline()))
+        except (ValueError, KeyError, TypeError):  # e.g., `is_running` probes
+            return
+
+        try:
+            self.server.jobs.put_nowait(job)
+        except queue.Full:
+            self._send({"error": "The box daemon is busy."})
+            return
+
+        while True:
+            message = job.messages.get()
+            try:
+                self._send(message)
+            except OSError:  # client is gone, the job still runs to the end
+                return
+            if "exit" in message:
+                return
+
+    def _send(self, message: Dict) -> None:
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+        self.wfile.flush()
+
+
+class BoxDaemon:
+    """Run box commands for clients, one after the other, in a warm process.
+
+    Modules stay imported, `pyproject.toml` files stay parsed (see
+    `box.config.load_pyproject`), and the user configuration is resolved without
+    starting a new interpreter. Jobs change the working directory and the
+    environment of the process, therefore, a single worker runs them in order from
+    a bounded queue.
+    """
+
+    def __init__(self, socket_path: Union[Path, str], queue_size: int = None):
+        """Initialize the daemon.
+
+        :param socket_path: Path of the Unix socket to listen on.
+        :param queue_size: Number of jobs that can wait, defaults to
+            `DAEMON_QUEUE_SIZE`. Clients run their command locally if it is full.
+        """
+        self.socket_path = Path(socket_path)
+        self.jobs = queue.Queue(maxsize=queue_size or DAEMON_QUEUE_SIZE)
+        self._server = None
+
+    def serve_forever(self) -> None:
+        """Listen on the socket and run the jobs until interrupted.
+
+        :raises click.ClickException: Unix sockets are not supported or another
+            daemon is already listening on the socket.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise click.ClickException(
+                "The box daemon requires Unix sockets, which are not available."
+            )
+        if self.socket_path.exists():
+            if is_running(self.socket_path):
+                raise click.ClickException(
+                    f"A box daemon is already listening on {self.socket_path}."
+                )
+            self.socket_path.unlink()  # left over from a daemon that was killed
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # only the current user may connect: jobs run with the daemon's permissions
+        umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                str(self.socket_path), _Handler
+            )
+        finally:
+            os.umask(umask)
+        self._server.daemon_threads = True
+        self._server.jobs = self.jobs
+
+        # stream the output of jobs line by line, even if it is not a terminal
+        for stream in (sys.stdout, sys.stderr):
+            if hasattr(stream, "reconfigure"):
+                stream.reconfigure(line_buffering=True)
+
+        # the main thread listens, such that it handles the signals to stop
+        worker = threading.Thread(target=self._work)
+        worker.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.jobs.put(None)
+            worker.join()
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        """Stop listening and stop the daemon after the jobs that are queued."""
+        self._server.shutdown()
+
+    def _work(self) -> None:
+        """Run the queued jobs until `None` is queued."""
+        while (job := self.jobs.get()) is not None:
+            fmt.info(f"Running `box {' '.join(job.args)}` in {job.cwd}")
+            code = self._run_captured(job)
+            job.messages.put({"exit": code})
+
+    def _run_captured(self, job: _Job) -> int:
+        """Run a job and stream everything it writes to the client.
+
+        Standard output and error are redirected on the file descriptor level,
+        such that the output of builders and cargo is streamed as well.
+        """
+        read_fd, write_fd = os.pipe()
+        pump = threading.Thread(target=_pump, args=(read_fd, job.messages))
+        pump.start()
+
+        saved = [os.dup(1), os.dup(2)]
+        try:
+            _flush()
+            os.dup2(write_fd, 1)
+            os.dup2(write_fd, 2)
+            return _run(job)
+        finally:
+            _flush()
+            for fd, saved_fd in enumerate(saved, start=1):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+            os.close(write_fd)
+            pump.join()
+
+
+def _flush() -> None:
+    """Flush the standard output and error of the daemon."""
+    for stream in (sys.stdout, sys.stderr):
+        stream.flush()
+
+
+def _pump(read_fd: int, messages: queue.Queue) -> None:
+    """Forward everything that is written to the pipe as output messages.
+
+    Characters can be split across chunks, so the output is decoded incrementally.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(read_fd, "rb") as fin:
+        while chunk := fin.read1(1 << 16):
+            if text := decoder.decode(chunk):
+                messages.put({"out": text})
+    if text := decoder.decode(b"", final=True):
+        messages.put({"out": text})
+
+
+def _run(job: _Job) -> int:
+    """Run the command of a job in its working directory and environment.
+
+    :return: Exit code of the command.
+    """
+    from box.cli import cli
+
+    if cli.keeps_running(job.args):
+        click.ClickException(
+            "Commands that keep running, e.g., `package --watch`, cannot run in "
+            "the box daemon."
+        ).show()
+        return 1
+
+    cwd, environ = os.getcwd(), dict(os.environ)
+    try:
+        os.chdir(job.cwd)
+        os.environ.clear()
+        os.environ.update(job.env)
+        os.environ.pop(DAEMON_SOCKET_VAR, None)  # never forward to ourselves
+        cli.main(job.args, prog_name="box")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(environ)
+    return 0
+
+
+def forward(socket_path: Union[Path, str], args: List[str]) -> Union[int, None]:
+    """Run a command in the daemon and stream its output to the console.
+
+    :param socket_path: Path of the socket the daemon listens on.
+    :param args: Command line arguments of the command, without `box`.
+
+    :return: Exit code of the command or `None` if the daemon could not run it.
+    """
+    request = {"args": list(args), "cwd": os.getcwd(), "env": dict(os.environ)}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as fin:
+                for line in fin:
+                    message = json.loads(line)
+                    if "out" in message:
+                        click.echo(message["out"], nl=False)
+                    elif "exit" in message:
+                        return message["exit"]
+                    else:
+                        fmt.warning(f"{message.get('error')} Running locally.")
+                        return None
+    except (AttributeError, OSError, ValueError) as e:
+        fmt.warning(
+            f"Cannot reach the box daemon at {socket_path}: {e}. Running locally."
+        )
+        return None
+
+    fmt.warning("The box daemon stopped before the command finished.")
+    return 1
+
+
+def is_running(socket_path: Union[Path, str]) -> bool:
+    """Check if a daemon is listening on the given socket.
+
+    :param socket_path: Path of the socket.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+        return True
+    except (AttributeError, OSError):
+        return False
@@ -1,6 +1,10 @@
 # Deal with environmental variables.
 
+import json
+import re
 from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Union
 
 import rich_click as click
 from rich_click import ClickException
@@ -8,6 +12,12 @@ from rich_click import ClickException
 import box.config as cfg
 import box.formatters as fmt
 
+# file formats for importing and exporting variables, by suffix
+ENV_FILE_FORMATS = (".env", ".json", ".toml")
+
+# unquoted integer values in `.env` files
+_ENV_INT = re.compile(r"[+-]?\d+")
+
 
 class VariableType(Enum):
     """Define valid variable types that can be set."""
@@ -17,6 +27,38 @@ class VariableType(Enum):
     BOOL = "bool"
 
 
+def export_file(file: Union[Path, str]) -> None:
+    """Export all variables to a file.
+
+    The format is chosen by the suffix of the file, see `ENV_FILE_FORMATS`.
+    A file name of `-` prints the variables in `.env` format.
+
+    :param file: File to write to.
+    """
+    env_vars = cfg.PyProjectParser().env_vars
+    if not env_vars:
+        fmt.warning("No variables set.")
+        return
+
+    if file == "-":
+        click.echo(_dump_env(env_vars), nl=False)
+        return
+
+    file = Path(file)
+    suffix = _file_format(file)
+    if suffix == ".json":
+        content = json.dumps(env_vars, indent=2) + "\n"
+    elif suffix == ".toml":
+        import tomlkit
+
+        content = tomlkit.dumps(env_vars)
+    else:
+        content = _dump_env(env_vars)
+    file.write_text(content, encoding="utf-8", newline="\n")
+
+    fmt.success(f"Exported {len(env_vars)} variables to {file}.")
+
+
 def get_list() -> None:
     """Get a list of all environmental variables set in the configuration."""
     parser = cfg.PyProjectParser()
@@ -40,6 +82,49 @@ def get_var(name: str) -> None:
         fmt.warning(f"No variable named {name} found in the configuration.")
 
 
+def import_file(file: Union[Path, str]) -> None:
+    """Import variables from a file and set them all in a single write.
+
+    The format is chosen by the suffix of the file, see `ENV_FILE_FORMATS`.
+    JSON and TOML values must be strings, integers, or booleans. In `.env` files,
+    quoted values are strings, unquoted `true`/`false` (case insensitive) are
+    booleans, unquoted integers are integers, and everything else is a string.
+    Already existing variables are overwritten.
+
+    :param file: File to read from.
+
+    :raises ClickException: Invalid file or values.
+    """
+    file = Path(file)
+    suffix = _file_format(file)
+    content = file.read_text(encoding="utf-8")
+    try:
+        if suffix == ".json":
+            variables = json.loads(content)
+        elif suffix == ".toml":
+            variables = cfg.tomllib.loads(content)
+        else:
+            variables = _load_env(content)
+    except ValueError as e:  # JSON and TOML decode errors are ValueErrors
+        raise ClickException(f"Cannot read {file}: {e}") from e
+    if not isinstance(variables, dict):
+        raise ClickException(f"{file} must contain an object of variables.")
+
+    for key, value in variables.items():
+        if not key or "=" in key or any(it.isspace() for it in key):
+            raise ClickException(f"Invalid variable name {key!r} in {file}.")
+        if not isinstance(value, (str, int)):  # booleans are integers
+            raise ClickException(
+                f"Variable {key} in {file} must be a string, integer, or boolean."
+            )
+
+    with cfg.pyproject_transaction():
+        for key, value in variables.items():
+            cfg.pyproject_writer(key, value, category="env-vars")
+
+    fmt.success(f"Imported {len(variables)} variables from {file}.")
+
+
 def set_bool(key_val: str) -> None:
     """Set a key-value pair as a boolean.
 
@@ -135,3 +220,69 @@ def _set_variable(key_val: str, typ: VariableType) -> None:
     cfg.pyproject_writer(key, value, category="env-vars")
 
     fmt.success(f"Variable {key} successfully set to {value} (type {typ.value}).")
+
+
+def _dump_env(env_vars: Dict[str, Any]) -> str:
+    """Return variables in `.env` format, such that `_load_env` keeps their types.
+
+    :param env_vars: Variables to dump.
+    """
+    lines = []
+    for key, value in env_vars.items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, str):
+            value = json.dumps(value)  # double quotes with escapes
+        lines.append(f"{key}={value}\n")
+    return "".join(lines)
+
+
+def _file_format(file: Path) -> str:
+    """Return the format of a file to import or export by its suffix.
+
+    Files that are named `.env` have no suffix, but the `.env` format.
+
+    :param file: File to import or export.
+
+    :raises ClickException: Unsupported format.
+    """
+    suffix = ".env" if file.name == ".env" else file.suffix.lower()
+    if suffix not in ENV_FILE_FORMATS:
+        raise ClickException(
+            f"Unsupported file format {suffix or file.name}, "
+            f"valid formats are {', '.join(ENV_FILE_FORMATS)}."
+        )
+    return suffix
+
+
+def _load_env(content: str) -> Dict[str, Any]:
+    """Parse a `.env` file with typed values, see `import_file`.
+
+    Empty lines, comments, and `export` prefixes are ignored.
+
+    :param content: Content of the file.
+
+    :raises ValueError: Invalid line.
+    """
+    variables = {}
+    for num, line in enumerate(content.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export ") :].lstrip()
+        key, sep, value = line.partition("=")
+        if not sep:
+            raise ValueError(f"line {num} is not a `KEY=VALUE` pair")
+        key, value = key.strip(), value.strip()
+
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = json.loads(value)
+        elif len(value) >= 2 and value[0] == value[-1] == "'":
+            value = value[1:-1]
+        elif value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        elif _ENV_INT.fullmatch(value):
+            value = int(value)
+        variables[key] = value
+    return variables
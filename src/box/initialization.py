@@ -1,13 +1,13 @@
 # Initialize a new project
 
-from typing import List
+from typing import Any, Dict, List
 
 import rich_click as click
 
 import box.formatters as fmt
 import box.utils as ut
-from box.config import PyProjectParser, pyproject_writer
-from box.packager import PackageApp
+from box import BUILDERS
+from box.config import PyProjectParser, pyproject_transaction, pyproject_writer
 
 
 class InitializeProject:
@@ -49,6 +49,7 @@ class InitializeProject:
 
         self.app_entry = None
         self.pyproj = None
+        self._settings: Dict[str, Any] = {}  # written at once, see `initialize`
 
         if self._build_command:
             self._build_command = self._build_command.strip("'\"")
@@ -58,7 +59,9 @@ class InitializeProject:
     def initialize(self):
         """Initialize a new project.
 
-        :param app_entry: the app entry point
+        All answers are collected first and then written to `pyproject.toml` at once,
+        such that the file is only locked for the final write and not while the
+        user is prompted.
         """
         self._set_builder()
         self._set_optional_deps()
@@ -67,6 +70,10 @@ class InitializeProject:
         self._set_app_entry_type()
         self._set_python_version()
 
+        with pyproject_transaction():
+            for key, value in self._settings.items():
+                pyproject_writer(key, value)
+
         if not self._quiet:
             fmt.success("Project initialized.")
 
@@ -117,7 +124,7 @@ class InitializeProject:
 
                     query_app_entry(query_text, options)
 
-        pyproject_writer("app_entry", self.app_entry)
+        self._settings["app_entry"] = self.app_entry
 
     def _set_app_entry_type(self):
         """Set the app entry type for the PyApp packaging. Defaults to `spec`."""
@@ -139,11 +146,11 @@ class InitializeProject:
                     default=default_entry_type,
                 )
 
-        pyproject_writer("entry_type", entry_type)
+        self._settings["entry_type"] = entry_type
 
     def _set_builder(self):
         """Set the builder for the project (defaults to rye)."""
-        possible_builders = PackageApp().builders_and_custom
+        possible_builders = list(BUILDERS) + ["custom"]
 
         default_builder = "rye"
         try:
@@ -179,9 +186,7 @@ class InitializeProject:
                         )
                     builder = f"{builder}={builder_cmd}"
 
-        pyproject_writer("builder", builder)
-        # reload
-        self._set_pyproj()
+        self._settings["builder"] = builder
 
     def _set_is_gui(self):
         """Set if the project is a GUI project or not."""
@@ -196,7 +201,7 @@ class InitializeProject:
             else:
                 is_gui = click.confirm("Is this a GUI project?", default=False)
 
-        pyproject_writer("is_gui", is_gui)
+        self._settings["is_gui"] = is_gui
 
     def _set_optional_deps(self):
         """Set optional dependencies for the project (if any)."""
@@ -218,7 +223,7 @@ class InitializeProject:
                 )
 
         if opt_deps != "":
-            pyproject_writer("optional_deps", opt_deps)
+            self._settings["optional_deps"] = opt_deps
 
     def _set_pyproj(self):
         """Check if the pyproject.toml file is valid."""
@@ -253,4 +258,4 @@ class InitializeProject:
                     default=default_py_version,
                 )
 
-        pyproject_writer("python_version", py_version)
+        self._settings["python_version"] = py_version
@@ -1,29 +1,64 @@
 # Create an OS specific installer for GUI or CLI application.
 
+import gzip
+import hashlib
+import io
+import json
 import os
 import shutil
 import subprocess
 import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Union
 
 import rich_click as click
 
+import box.checksums as cs
 import box.formatters as fmt
 import box.utils as ut
 from box import RELEASE_DIR_NAME
-from box.config import PyProjectParser
+from box.config import BoxConfig
+
+# file in the release folder that stores the fingerprints of the installer inputs
+FINGERPRINT_FILE = ".box-installer.json"
 
 
 class CreateInstaller:
     """Create an installer specific for the OS and depending on if GUI or CLI."""
 
-    def __init__(self, verbose: bool = False):
+    def __init__(
+        self,
+        verbose: bool = False,
+        reproducible: bool = False,
+        force: bool = False,
+        progress: Callable = None,
+    ):
         """Initialize the installer creator.
 
         :param verbose: If True, print verbose output.
+        :param reproducible: If True, create reproducible installers with fixed
+            timestamps. Also enabled if `SOURCE_DATE_EPOCH` is set.
+        :param force: If True, always create the installers, even if their inputs
+            did not change since the last run.
+        :param progress: Callback that is called with the name of each phase
+            ("installer" or the format) and "start" or "end". Formats are created
+            in parallel, so the callback must be thread-safe.
         """
-        self._config = PyProjectParser()
+        self._config = BoxConfig.from_pyproject()
+        self._mtime = ut.source_date_epoch(reproducible)
+        self._force = force
         self._installer_name = None
+        self._installer_names = []
+        self._checksums = {}
+        self._progress = progress
+
+        self.timings = {}  # duration of each phase in seconds
+        self.cache_stats = {"hits": 0, "misses": 0}  # installers that are up to date
 
         self.subp_kwargs = {}
         if not verbose:
@@ -48,69 +83,233 @@ class CreateInstaller:
         """Return the name of the installer."""
         return self._installer_name
 
+    @property
+    def installer_names(self) -> List[str]:
+        """Return the names of all installers created with `create_formats`."""
+        return self._installer_names
+
+    @property
+    def formats(self) -> List[str]:
+        """Return a list of installer formats that can be created in parallel."""
+        return list(self._format_writers().keys())
+
+    @property
+    def checksums(self) -> Dict[str, Dict]:
+        """Return the checksums of all files created in the last run."""
+        return self._checksums
+
     def create_installer(self):
-        """Create the actual installer based on the OS and mode."""
+        """Create the actual installer based on the OS and mode.
+
+        Checksums of the installer are written to the manifests in the release folder.
+        If the release binary, the icon, and the configuration did not change since
+        the last run and the installer still exists, it is not created again.
+        """
         self._release_file = self._check_release()
+        self._checksums = {}
+
+        binary_sha256 = cs.hash_file(self._release_file, ["sha256"])["sha256"]
+        icon_suffix = {"Windows": "ico", "macOS": "icns"}.get(self._os)
+        fingerprint = self._fingerprint("installer", binary_sha256, icon_suffix)
+        existing = self._up_to_date("installer", fingerprint)
+        self._count_cache([existing])
+        if existing is not None:
+            self._installer_name = existing
+            fmt.info(f"{existing} is up to date. Use `--force` to create it again.")
+            return
+
+        with ut.phase("installer", self.timings, self._progress):
+            if self._os == "Linux" and self._mode == "CLI":
+                self.linux_cli()
+            elif self._os == "Linux" and self._mode == "GUI":
+                self.linux_gui()
+            elif self._os == "Windows" and self._mode == "CLI":
+                self.windows_cli()
+            elif self._os == "Windows" and self._mode == "GUI":
+                self.windows_gui()
+            elif self._os == "macOS" and self._mode == "CLI":
+                self.macos_cli()
+            elif self._os == "macOS" and self._mode == "GUI":
+                self.macos_gui()
+            else:
+                self.unsupported_os_or_mode()
+
+        if self._installer_name is None:
+            return
+        installer_file = Path(RELEASE_DIR_NAME).joinpath(self._installer_name)
+        if not installer_file.is_file():
+            return
+
+        self._set_mtime(installer_file)
+        # installers from external tools must be read again to hash them
+        if self._installer_name not in self._checksums:
+            self._checksums[self._installer_name] = cs.hash_file(installer_file)
+        self._write_manifest()
+        self._store_fingerprints({"installer": (fingerprint, installer_file)})
+
+    def create_formats(self, formats: List[str]) -> Dict[str, float]:
+        """Create multiple installer formats in parallel.
+
+        The release binary is read only once and then handed to all format writers,
+        which run concurrently in a thread pool. Checksums are computed while the
+        files are written and saved to the manifests in the release folder.
+        Formats whose inputs did not change since the last run are skipped.
+
+        :param formats: List of formats to create, see `formats` for valid ones.
+            Duplicates are created only once.
+
+        :return: Dictionary with the format as key and the time it took to create
+            the installer (in seconds) as value. Skipped formats are not included.
+
+        :raises ClickException: Unknown format requested.
+        """
+        formats = list(dict.fromkeys(formats))  # writers must not share a file
+        writers = self._format_writers()
+        unknown = [it for it in formats if it not in writers]
+        if unknown:
+            raise click.ClickException(
+                f"Unknown installer format(s): {', '.join(unknown)}. "
+                f"Valid formats are {', '.join(writers.keys())}."
+            )
 
-        if self._os == "Linux" and self._mode == "CLI":
-            self.linux_cli()
-        elif self._os == "Linux" and self._mode == "GUI":
-            self.linux_gui()
-        elif self._os == "Windows" and self._mode == "CLI":
-            self.windows_cli()
-        elif self._os == "Windows" and self._mode == "GUI":
-            self.windows_gui()
-        elif self._os == "macOS" and self._mode == "CLI":
-            self.macos_cli()
-        elif self._os == "macOS" and self._mode == "GUI":
-            self.macos_gui()
-        else:
-            self.unsupported_os_or_mode()
+        self._release_file = self._check_release()
+        self._checksums = {}
+        with open(self._release_file, "rb") as f:
+            binary_part = f.read()
+
+        binary_sha256 = hashlib.sha256(binary_part).hexdigest()
+        fingerprints = {it: self._fingerprint(it, binary_sha256) for it in formats}
+        existing = {it: self._up_to_date(it, fingerprints[it]) for it in formats}
+        self._count_cache(existing.values())
+        for fmt_name in formats:
+            if existing[fmt_name] is not None:
+                fmt.info(
+                    f"{existing[fmt_name]} ({fmt_name}) is up to date. "
+                    f"Use `--force` to create it again."
+                )
+        to_create = [it for it in formats if existing[it] is None]
+
+        def run_writer(fmt_name: str):
+            """Run a single writer and time it."""
+            timings = {}
+            with ut.phase(fmt_name, timings, self._progress):
+                installer_file = writers[fmt_name](binary_part)
+                self._set_mtime(installer_file)
+            return installer_file, timings[fmt_name]
+
+        workers = min(len(to_create), self._config.jobs or len(to_create)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(to_create, executor.map(run_writer, to_create)))
+
+        timings = {}
+        created = {}
+        self._installer_names = []
+        for fmt_name in formats:
+            if fmt_name not in results:
+                self._installer_names.append(existing[fmt_name])
+                continue
+            installer_file, duration = results[fmt_name]
+            self._installer_names.append(installer_file.name)
+            timings[fmt_name] = duration
+            created[fmt_name] = (fingerprints[fmt_name], installer_file)
+            fmt.info(f"Created {installer_file.name} ({fmt_name}) in {duration:.2f} s.")
+
+        self._write_manifest()
+        self._store_fingerprints(created)
 
-    def linux_cli(self) -> None:
-        """Create a Linux CLI installer."""
+        self.timings.update(timings)
+        return timings
+
+    def verify_reproducible(self, formats: List[str] = None) -> None:
+        """Create the installer(s) twice and compare the hashes of all artifacts.
+
+        :param formats: Formats to create, see `create_formats`. If not given, the
+            default installer is created.
+
+        :raises ClickException: Artifacts of the two runs differ.
+        """
+        force, self._force = self._force, True  # the cache would skip the runs
+        hashes = []
+        try:
+            for _ in range(2):
+                if formats:
+                    self.create_formats(formats)
+                    names = self.installer_names
+                else:
+                    self.create_installer()
+                    names = [self.installer_name] if self.installer_name else []
+                hashes.append({name: self._checksums[name]["sha256"] for name in names})
+        finally:
+            self._force = force
+
+        differ = [
+            name for name, digest in hashes[0].items() if hashes[1][name] != digest
+        ]
+        if differ:
+            raise click.ClickException(
+                f"Installer(s) not reproducible: {', '.join(differ)} differ between "
+                f"two runs."
+            )
+        fmt.info("Installer(s) are reproducible, two runs created identical files.")
+
+    def linux_cli(self, binary_part: bytes = None) -> Path:
+        """Create a Linux CLI installer.
+
+        :param binary_part: Content of the release binary. Read from file if not given.
+
+        :return: Path to the installer file.
+        """
         from box.installer_utils.linux_hlp import create_bash_installer_cli
 
         name = self._config.name
         version = self._config.version
 
-        bash_part = create_bash_installer_cli(name, version)
+        bash_part = create_bash_installer_cli(
+            name, version, self._keep_versions, self._bash_prewarm()
+        )
 
-        with open(self._release_file, "rb") as f:
-            binary_part = f.read()
+        if binary_part is None:
+            with open(self._release_file, "rb") as f:
+                binary_part = f.read()
 
         # Write the installer file
         installer_file = Path(RELEASE_DIR_NAME).joinpath(f"{name}-v{version}-linux.sh")
-        with open(installer_file, "wb") as f:
+        with self._open_artifact(installer_file) as f:
             f.write(bash_part.encode("utf-8"))
             f.write(binary_part)
 
         self._installer_name = installer_file.name
 
-        # make installer executable
-        mode = os.stat(installer_file).st_mode
-        mode |= (mode & 0o444) >> 2
-        os.chmod(installer_file, mode)
+        _make_executable(installer_file)
+        return installer_file
+
+    def linux_gui(self, binary_part: bytes = None) -> Path:
+        """Create a Linux GUI installer.
 
-    def linux_gui(self) -> None:
-        """Create a Linux GUI installer."""
+        :param binary_part: Content of the release binary. Read from file if not given.
+
+        :return: Path to the installer file.
+        """
         from box.installer_utils.linux_hlp import create_bash_installer_gui
 
         name = self._config.name
         version = self._config.version
-        icon = get_icon()
+        icon = self._icon()
         icon_name = icon.name
 
-        bash_part = create_bash_installer_gui(name, version, icon_name)
+        bash_part = create_bash_installer_gui(
+            name, version, icon_name, self._keep_versions, self._bash_prewarm()
+        )
 
-        with open(self._release_file, "rb") as f:
-            binary_part = f.read()
+        if binary_part is None:
+            with open(self._release_file, "rb") as f:
+                binary_part = f.read()
 
         with open(icon, "rb") as f:
             icon_part = f.read()
 
         installer_file = Path(RELEASE_DIR_NAME).joinpath(f"{name}-v{version}-linux.sh")
-        with open(installer_file, "wb") as f:
+        with self._open_artifact(installer_file) as f:
             f.write(bash_part.encode("utf-8"))
             f.write(binary_part)
             f.write(b"\n#__ICON_BINARY__\n")
@@ -118,10 +317,8 @@ class CreateInstaller:
 
         self._installer_name = installer_file.name
 
-        # make installer executable
-        mode = os.stat(installer_file).st_mode
-        mode |= (mode & 0o444) >> 2
-        os.chmod(installer_file, mode)
+        _make_executable(installer_file)
+        return installer_file
 
     def macos_cli(self):
         """Create a macOS CLI installer using applecrate."""
@@ -169,12 +366,12 @@ class CreateInstaller:
             self._config.name,
             self._config.author,
             self._config.version,
-            get_icon("icns"),
+            self._icon("icns"),
         )
 
         # create the dmg
         settings = dmgbuild_settings(
-            Path(RELEASE_DIR_NAME), self._config.name, get_icon("icns")
+            Path(RELEASE_DIR_NAME), self._config.name, self._icon("icns")
         )
         with ut.set_dir(RELEASE_DIR_NAME):
             dmgbuild.build_dmg(
@@ -216,6 +413,7 @@ class CreateInstaller:
                         self._config.author,
                         self._config.version,
                         self._release_file,
+                        self._nsis_compression(),
                     )
                 )
 
@@ -234,7 +432,7 @@ class CreateInstaller:
 
         name = self._config.name
         version = self._config.version
-        icon = get_icon("ico")
+        icon = self._icon("ico")
 
         installer_name = f"{name}-v{version}-win.exe"
 
@@ -249,6 +447,7 @@ class CreateInstaller:
                         self._config.version,
                         self._release_file,
                         icon,
+                        self._nsis_compression(),
                     )
                 )
 
@@ -259,6 +458,439 @@ class CreateInstaller:
 
         self._installer_name = installer_name
 
+    def binary_with_checksum(self, binary_part: bytes) -> Path:
+        """Write the raw binary with a versioned name and a `.sha256` checksum file.
+
+        :param binary_part: Content of the release binary.
+
+        :return: Path to the versioned binary.
+        """
+        binary_file = self._artifact_path(self._release_file.suffix)
+        with self._open_artifact(binary_file) as f:
+            f.write(binary_part)
+        _make_executable(binary_file)
+
+        checksum = self._checksums[binary_file.name]["sha256"]
+        checksum_file = binary_file.with_name(f"{binary_file.name}.sha256")
+        with self._open_artifact(checksum_file) as f:
+            f.write(f"{checksum}  {binary_file.name}\n".encode("utf-8"))
+        self._set_mtime(checksum_file)
+
+        return binary_file
+
+    def portable_tar(self, binary_part: bytes) -> Path:
+        """Create a portable `.tar.gz` archive that contains the binary.
+
+        :param binary_part: Content of the release binary.
+
+        :return: Path to the archive.
+        """
+        archive_file = self._artifact_path(".tar.gz")
+        binary_info = tarfile.TarInfo(
+            f"{self._portable_folder}/{self._release_file.name}"
+        )
+        binary_info.size = len(binary_part)
+        binary_info.mode = 0o755
+        binary_info.mtime = self._timestamp
+        binary_info.uname = binary_info.gname = "root"
+
+        with self._open_artifact(archive_file) as f:
+            with gzip.GzipFile(
+                archive_file.name, "wb", fileobj=f, mtime=self._timestamp
+            ) as gz:
+                with tarfile.open(fileobj=gz, mode="w") as tar:
+                    tar.addfile(binary_info, io.BytesIO(binary_part))
+
+        return archive_file
+
+    def portable_zip(self, binary_part: bytes) -> Path:
+        """Create a portable `.zip` archive that contains the binary.
+
+        :param binary_part: Content of the release binary.
+
+        :return: Path to the archive.
+        """
+        archive_file = self._artifact_path(".zip")
+        binary_info = zipfile.ZipInfo(
+            f"{self._portable_folder}/{self._release_file.name}",
+            date_time=time.gmtime(self._timestamp)[:6],
+        )
+        binary_info.external_attr = 0o755 << 16
+        binary_info.compress_type = zipfile.ZIP_DEFLATED
+
+        with self._open_artifact(archive_file) as f:
+            with zipfile.ZipFile(f, "w") as zf:
+                zf.writestr(binary_info, binary_part)
+
+        return archive_file
+
+    def linux_deb(self, binary_part: bytes) -> Path:
+        """Create a Debian `.deb` package.
+
+        :param binary_part: Content of the release binary.
+
+        :return: Path to the package.
+        """
+        from box.installer_utils.linux_pkg_hlp import deb_architecture, write_deb
+
+        package_file = Path(RELEASE_DIR_NAME).joinpath(
+            f"{self._config.name}-v{self._config.version}-{deb_architecture()}.deb"
+        )
+        with self._open_artifact(package_file) as f:
+            write_deb(
+                f,
+                self._config.name,
+                self._config.version,
+                self._config.author,
+                self._config.description,
+                self._linux_package_files(binary_part),
+                mtime=self._timestamp,
+            )
+        return package_file
+
+    def linux_rpm(self, binary_part: bytes) -> Path:
+        """Create an `.rpm` package.
+
+        :param binary_part: Content of the release binary.
+
+        :return: Path to the package.
+        """
+        from box.installer_utils.linux_pkg_hlp import rpm_architecture, write_rpm
+
+        package_file = Path(RELEASE_DIR_NAME).joinpath(
+            f"{self._config.name}-v{self._config.version}-{rpm_architecture()}.rpm"
+        )
+        with self._open_artifact(package_file) as f:
+            write_rpm(
+                f,
+                self._config.name,
+                self._config.version,
+                self._config.author,
+                self._config.description,
+                self._linux_package_files(binary_part),
+                mtime=self._timestamp,
+            )
+        return package_file
+
+    def shell_installer(self, binary_part: bytes) -> Path:
+        """Create the Linux bash installer for the current mode.
+
+        :param binary_part: Content of the release binary.
+
+        :return: Path to the installer file.
+        """
+        if self._mode == "GUI":
+            return self.linux_gui(binary_part)
+        return self.linux_cli(binary_part)
+
+    def pipe_installer(self, binary_part: bytes) -> Path:
+        """Create a Linux bash installer for CLIs that can be piped into bash.
+
+        :param binary_part: Content of the release binary.
+
+        :return: Path to the installer file.
+
+        :raises click.ClickException: The project is a GUI.
+        """
+        from box.installer_utils.linux_hlp import create_bash_installer_pipe
+
+        if self._mode == "GUI":
+            raise click.ClickException(
+                "The pipe installer is only available for CLIs. "
+                "Use the `sh` format for GUIs."
+            )
+
+        bash_part = create_bash_installer_pipe(
+            self._config.name,
+            self._config.version,
+            len(binary_part),
+            hashlib.sha256(binary_part).hexdigest(),
+            self._keep_versions,
+            self._bash_prewarm(),
+        )
+
+        installer_file = self._artifact_path("-pipe.sh")
+        with self._open_artifact(installer_file) as f:
+            f.write(bash_part.encode("utf-8"))
+            f.write(binary_part)
+
+        _make_executable(installer_file)
+        return installer_file
+
+    def _linux_package_files(self, binary_part: bytes) -> List:
+        """Return the files that go into a `.deb` or `.rpm` package.
+
+        The binary is installed to `/usr/bin`. For GUIs, the icon and a
+        `.desktop` file are added as well.
+
+        :param binary_part: Content of the release binary.
+        """
+        from box.installer_utils.linux_pkg_hlp import PackageFile, desktop_file
+
+        name = self._config.name
+        exec_path = f"/usr/bin/{name}"
+        files = [PackageFile(exec_path, binary_part, 0o755)]
+
+        if self._mode == "GUI":
+            icon = self._icon()
+            icon_path = f"/usr/share/pixmaps/{name}{icon.suffix}"
+            files += [
+                PackageFile(icon_path, icon.read_bytes()),
+                PackageFile(
+                    f"/usr/share/applications/{name}.desktop",
+                    desktop_file(name, exec_path, icon_path),
+                ),
+            ]
+
+        return files
+
+    def _fingerprint(
+        self, key: str, binary_sha256: str, icon_suffix: Union[str, None] = None
+    ) -> str:
+        """Return a fingerprint of all inputs that go into an installer.
+
+        The fingerprint covers the release binary, the icon (for GUIs), the project
+        and `[tool.box]` configuration, the timestamp in reproducible mode, and the
+        source code of the installer templates.
+
+        :param key: Format of the installer or "installer" for the default one.
+        :param binary_sha256: SHA-256 hash of the release binary.
+        :param icon_suffix: Suffix of the icon that is used, see `get_icon`.
+
+        :return: Hex digest of the fingerprint.
+        """
+        icon_sha256 = None
+        if self._mode == "GUI":
+            try:
+                icon = self._icon(icon_suffix)
+                icon_sha256 = cs.hash_file(icon, ["sha256"])["sha256"]
+            except click.ClickException:  # raised again when creating the installer
+                pass
+
+        templates = hashlib.sha256()
+        module_path = Path(__file__)
+        for file in [module_path] + sorted(
+            module_path.parent.joinpath("installer_utils").glob("*.py")
+        ):
+            templates.update(file.read_bytes())
+
+        inputs = {
+            "key": key,
+            "os": self._os,
+            "mode": self._mode,
+            "binary": binary_sha256,
+            "icon": icon_sha256,
+            "project": {
+                "name": self._config.name,
+                "version": self._config.version,
+                "author": self._config.author,
+                "description": self._config.description,
+            },
+            "box": self._config.box_table,
+            "mtime": self._mtime,
+            "templates": templates.hexdigest(),
+        }
+        data = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _load_fingerprints(self) -> Dict[str, Dict]:
+        """Load the fingerprints of the last runs from the release folder."""
+        fingerprint_file = Path(RELEASE_DIR_NAME).joinpath(FINGERPRINT_FILE)
+        if not fingerprint_file.is_file():
+            return {}
+        try:
+            with open(fingerprint_file) as f:
+                return json.load(f)
+        except ValueError:  # corrupt file, simply create everything again
+            return {}
+
+    def _store_fingerprints(self, created: Dict[str, tuple]) -> None:
+        """Store the fingerprints of created installers in the release folder.
+
+        Size and modification time of the installers are stored as well, such that
+        modified or deleted installers are created again.
+
+        :param created: Dictionary with the key of the installer as key and a tuple of
+            the fingerprint and the path to the installer as value.
+        """
+        if not created:
+            return
+        fingerprints = self._load_fingerprints()
+        for key, (fingerprint, installer_file) in created.items():
+            stat = os.stat(installer_file)
+            fingerprints[key] = {
+                "fingerprint": fingerprint,
+                "file": installer_file.name,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        fingerprint_file = Path(RELEASE_DIR_NAME).joinpath(FINGERPRINT_FILE)
+        with open(fingerprint_file, "w") as f:
+            json.dump(fingerprints, f, indent=2, sort_keys=True)
+        self._set_mtime(fingerprint_file)
+
+    def _count_cache(self, existing: Iterable[Union[str, None]]) -> None:
+        """Count installers that are up to date as hits, all others as misses."""
+        for name in existing:
+            self.cache_stats["misses" if name is None else "hits"] += 1
+
+    def _up_to_date(self, key: str, fingerprint: str) -> Union[str, None]:
+        """Check if an installer was already created from the same inputs.
+
+        :param key: Format of the installer or "installer" for the default one.
+        :param fingerprint: Fingerprint of the current inputs, see `_fingerprint`.
+
+        :return: Name of the existing installer if it is up to date, otherwise None.
+        """
+        if self._force:
+            return None
+        entry = self._load_fingerprints().get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return None
+        installer_file = Path(RELEASE_DIR_NAME).joinpath(entry["file"])
+        if not installer_file.is_file():
+            return None
+        stat = os.stat(installer_file)
+        if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+            return None
+        return entry["file"]
+
+    @property
+    def _portable_folder(self) -> str:
+        """Name of the top-level folder in portable archives."""
+        return f"{self._config.name}-v{self._config.version}"
+
+    @contextmanager
+    def _open_artifact(self, file: Path):
+        """Open an artifact for writing and hash it while it is written.
+
+        The checksums are stored in `self._checksums` once the file is closed.
+        Artifacts whose headers were patched after writing, e.g., `.deb` and
+        `.rpm` packages, are hashed again once they are complete.
+
+        :param file: Path to the artifact.
+        """
+        with open(file, "wb") as f:
+            writer = cs.HashingWriter(f)
+            yield writer
+        if writer.patched:
+            self._checksums[file.name] = cs.hash_file(file)
+            return
+        checksums = writer.hexdigests()
+        checksums["size"] = writer.size
+        self._checksums[file.name] = checksums
+
+    def _write_manifest(self):
+        """Write the checksums of the last run to the manifests in the release dir."""
+        release_dir = Path(RELEASE_DIR_NAME)
+        cs.write_manifest(release_dir, self._checksums)
+        for manifest in (cs.MANIFEST_JSON, cs.MANIFEST_SHA256SUMS):
+            self._set_mtime(release_dir.joinpath(manifest))
+
+    @property
+    def _timestamp(self) -> int:
+        """Timestamp for files in archives: fixed in reproducible mode, else now."""
+        if self._mtime is not None:
+            return self._mtime
+        return int(time.time())
+
+    def _bash_prewarm(self) -> str:
+        """Return the bash commands to pre-warm the environment, if enabled.
+
+        :raises click.ClickException: Invalid timeout configured.
+        """
+        from box.installer_utils.linux_hlp import bash_prewarm
+
+        if not self._config.installer_prewarm:
+            return ""
+
+        self_command = self._config.env_vars.get("PYAPP_SELF_COMMAND", "self")
+        if self_command == "none":
+            fmt.warning(
+                "Pre-warming is disabled since `PYAPP_SELF_COMMAND` is set to `none`."
+            )
+            return ""
+
+        timeout = self._config.installer_prewarm_timeout
+        if not isinstance(timeout, int) or isinstance(timeout, bool) or timeout < 1:
+            raise click.ClickException(
+                f"Invalid installer_prewarm_timeout {timeout}, "
+                f"must be a positive integer."
+            )
+        return bash_prewarm(self_command, int(timeout))
+
+    @property
+    def _keep_versions(self) -> int:
+        """Number of versions that Linux installers keep side by side.
+
+        :raises click.ClickException: Invalid number configured.
+        """
+        keep_versions = self._config.keep_versions
+        if (
+            not isinstance(keep_versions, int)
+            or isinstance(keep_versions, bool)
+            or keep_versions < 1
+        ):
+            raise click.ClickException(
+                f"Invalid keep_versions {keep_versions}, must be a positive integer."
+            )
+        return int(keep_versions)
+
+    def _icon(self, suffix: str = None) -> Path:
+        """Return the icon of the project, see `get_icon`.
+
+        :param suffix: The suffix of the icon file.
+        """
+        return get_icon(suffix, self._config.icon)
+
+    def _nsis_compression(self) -> str:
+        """Return the NSIS compression commands as configured in `pyproject.toml`.
+
+        :raises click.ClickException: Invalid compression configuration.
+        """
+        from box.installer_utils.windows_hlp import nsis_compression
+
+        try:
+            return nsis_compression(
+                self._config.nsis_compressor,
+                self._config.nsis_solid,
+                self._config.nsis_dict_size,
+            )
+        except ValueError as err:
+            raise click.ClickException(str(err)) from err
+
+    def _set_mtime(self, file: Path) -> None:
+        """Set the modification time of an artifact in reproducible mode.
+
+        :param file: Path to the artifact.
+        """
+        if self._mtime is not None:
+            os.utime(file, (self._mtime, self._mtime))
+
+    def _artifact_path(self, suffix: str) -> Path:
+        """Return the path for an artifact in the release folder.
+
+        :param suffix: Suffix to append to `name-vX.Y.Z-os`.
+        """
+        os_name = {"Linux": "linux", "macOS": "macos", "Windows": "win"}.get(
+            self._os, self._os
+        )
+        return Path(RELEASE_DIR_NAME).joinpath(
+            f"{self._config.name}-v{self._config.version}-{os_name}{suffix}"
+        )
+
+    def _format_writers(self) -> Dict:
+        """Return a dictionary of all supported formats and their writer routines."""
+        return {
+            "sh": self.shell_installer,
+            "pipe": self.pipe_installer,
+            "tar": self.portable_tar,
+            "zip": self.portable_zip,
+            "bin": self.binary_with_checksum,
+            "deb": self.linux_deb,
+            "rpm": self.linux_rpm,
+        }
+
     @staticmethod
     def _check_makensis():
         """Check if NSIS is installed correctly and available on the path."""
@@ -290,10 +922,23 @@ class CreateInstaller:
         return release_file
 
 
-def get_icon(suffix: str = None) -> Path:
+def _make_executable(file: Path) -> None:
+    """Make a file executable for everyone who can read it.
+
+    :param file: Path to the file.
+    """
+    mode = os.stat(file).st_mode
+    mode |= (mode & 0o444) >> 2
+    os.chmod(file, mode)
+
+
+def get_icon(suffix: str = None, icon: Union[Path, str] = None) -> Path:
     """Return the icon file path.
 
-    Walks through all the assets folders and returns the first `icon.suffix` file found.
+    Returns the configured icon or a file with the same name next to it. If no
+    icon is configured, searches all `assets` folders of the project and returns
+    the first `icon.suffix` file found, see `box.assets.find_icon`. Build, virtual
+    environment, hidden, and ignored folders are skipped.
 
     If no suffix is provided, the following priorites will be returned (depending
     on file availability):
@@ -303,40 +948,40 @@ def get_icon(suffix: str = None) -> Path:
     - icon.jpeg
 
     Note: Windows `.ico` files must be called out explicitly,
-    same with MacOS `.icns` files.
+    same with MacOS `.icns` files. If none exists, they are converted from the
+    PNG icon of the project, see `box.assets.convert_icon`.
 
     :param suffix: The suffix of the icon file.
+    :param icon: Icon that is configured explicitly with `icon` in `[tool.box]`.
 
     :return: The path to the icon file.
 
     :raises ClickException: If no icon file is found.
     """
-    excluded_folders = ["build", "dist", "target", "venv"]
-    suffixes = ["svg", "png", "jpg", "jpeg"]
-
-    for root, dirs, _ in os.walk("."):
-        # excluded folders
-        root_fld = root.split("/")
-        if len(root_fld) > 1 and (
-            root_fld[1] in excluded_folders or root_fld[1].startswith(".")
-        ):
-            continue
-
-        for my_dir in dirs:
-            if my_dir != "assets":
-                continue
+    from box.assets import CONVERTIBLE_SUFFIXES, ICON_SUFFIXES, convert_icon, find_icon
 
-            icon_file = Path.cwd().joinpath(f"{root}/{my_dir}/icon")
-
-            if suffix:
-                suffixes = [suffix]  # overwrite exisiting and only check this.
-
-            for suffix in suffixes:
-                icon_file = icon_file.with_suffix(f".{suffix}")
-                if icon_file.exists():
-                    return icon_file
+    icon_file = find_icon(suffix, icon)
+    if icon_file is not None:
+        return icon_file
 
+    master = find_icon("png", icon) if suffix in CONVERTIBLE_SUFFIXES else None
+    if master is not None:
+        try:
+            return convert_icon(master, suffix)
+        except ValueError as err:
+            raise click.ClickException(
+                f"Cannot convert {master} to an `.{suffix}` icon: {err}"
+            ) from err
+
+    suffixes = [suffix] if suffix else ICON_SUFFIXES
+    if icon is not None:
+        raise click.ClickException(
+            f"No icon file found for the configured icon {icon}. Please provide a "
+            f"file with the same name next to it. Valid formats are "
+            f"{', '.join(suffixes)}."
+        )
     raise click.ClickException(
-        f"No icon file found. Please provide an icon file in an `assets` folder. "
+        f"No icon file found. Please provide an icon file in an `assets` folder "
+        f"or set `icon` in the `[tool.box]` section of your `pyproject.toml`. "
         f"Valid formats are {', '.join(suffixes)}."
     )
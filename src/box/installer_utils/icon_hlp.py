@@ -0,0 +1,441 @@
+# Helper functions to convert a master PNG into platform icons in pure Python.
+
+import struct
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# sizes of the images embedded into Windows `.ico` files
+ICO_SIZES = (16, 24, 32, 48, 64, 128, 256)
+
+# icon types and sizes of the PNG images embedded into macOS `.icns` files
+ICNS_TYPES = (
+    (b"icp4", 16),
+    (b"icp5", 32),
+    (b"icp6", 64),
+    (b"ic07", 128),
+    (b"ic08", 256),
+    (b"ic09", 512),
+    (b"ic10", 1024),
+    (b"ic11", 32),
+    (b"ic12", 64),
+    (b"ic13", 256),
+    (b"ic14", 512),
+)
+
+# channels per pixel for the PNG color types
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+class Image:
+    """RGBA image with 8 bits per channel and premultiplied alpha."""
+
+    def __init__(self, width: int, height: int, pixels: bytearray):
+        """Initialize the image.
+
+        :param width: Width in pixels.
+        :param height: Height in pixels.
+        :param pixels: Premultiplied RGBA values, row by row.
+        """
+        self.width = width
+        self.height = height
+        self.pixels = pixels
+
+    @classmethod
+    def from_rgba(cls, width: int, height: int, rgba: bytearray) -> "Image":
+        """Create an image from straight (not premultiplied) RGBA values."""
+        pixels = bytearray(rgba)
+        alpha = rgba[3::4]
+        for ch in range(3):
+            pixels[ch::4] = bytes(
+                map(lambda v, a: (v * a + 127) // 255, rgba[ch::4], alpha)
+            )
+        return cls(width, height, pixels)
+
+    def to_rgba(self) -> bytearray:
+        """Return straight (not premultiplied) RGBA values."""
+        rgba = bytearray(self.pixels)
+        alpha = self.pixels[3::4]
+        for ch in range(3):
+            rgba[ch::4] = bytes(
+                map(
+                    lambda v, a: min(255, (v * 255 + a // 2) // a) if a else 0,
+                    self.pixels[ch::4],
+                    alpha,
+                )
+            )
+        return rgba
+
+    def resized(self, size: int) -> "Image":
+        """Return a square copy of the image with the given size.
+
+        The image is halved as long as possible, which is fast and exact, and then
+        resampled with an area-averaging (box) filter to the final size. Since alpha
+        is premultiplied, transparent pixels do not bleed into the result.
+
+        :param size: Width and height of the new image.
+        """
+        image = self
+        while image.width >= 2 * size and image.height >= 2 * size:
+            image = image._halved()
+        if (image.width, image.height) != (size, size):
+            image = image._box_resampled(size, size)
+        return image
+
+    def _halved(self) -> "Image":
+        """Return the image with half the width and height, averaging 2x2 blocks."""
+        width, height = self.width // 2, self.height // 2
+        stride = self.width * 4
+        pixels = bytearray(width * height * 4)
+        for y in range(height):
+            row0 = self.pixels[2 * y * stride : (2 * y + 1) * stride]
+            row1 = self.pixels[(2 * y + 1) * stride : (2 * y + 2) * stride]
+            out = bytearray(width * 4)
+            for ch in range(4):
+                out[ch::4] = bytes(
+                    map(
+                        lambda a, b, c, d: (a + b + c + d + 2) >> 2,
+                        row0[ch : 8 * width : 8],
+                        row0[ch + 4 : 8 * width : 8],
+                        row1[ch : 8 * width : 8],
+                        row1[ch + 4 : 8 * width : 8],
+                    )
+                )
+            pixels[y * width * 4 : (y + 1) * width * 4] = out
+        return Image(width, height, pixels)
+
+    def _box_resampled(self, width: int, height: int) -> "Image":
+        """Return the image resampled with an area-averaging filter."""
+        x_weights = _box_weights(self.width, width)
+        y_weights = _box_weights(self.height, height)
+        stride = self.width * 4
+
+        # horizontal pass
+        rows = []
+        for y in range(self.height):
+            row = self.pixels[y * stride : (y + 1) * stride]
+            out = [0] * (width * 4)
+            for x, weights in enumerate(x_weights):
+                for ch in range(4):
+                    out[4 * x + ch] = sum(w * row[4 * i + ch] for i, w in weights)
+            rows.append(out)
+
+        # vertical pass
+        pixels = bytearray(width * height * 4)
+        for y, weights in enumerate(y_weights):
+            for k in range(width * 4):
+                value = sum(w * rows[i][k] for i, w in weights)
+                pixels[y * width * 4 + k] = min(255, int(value + 0.5))
+        return Image(width, height, pixels)
+
+
+def _box_weights(size_in: int, size_out: int) -> List[List[Tuple[int, float]]]:
+    """Return the source pixels and their weights for each output pixel.
+
+    Each output pixel averages the source pixels it covers, weighted by the
+    covered area. For upscaling, this results in nearest-neighbor sampling.
+
+    :param size_in: Number of source pixels.
+    :param size_out: Number of output pixels.
+    """
+    scale = size_in / size_out
+    weights = []
+    for out in range(size_out):
+        start = out * scale
+        end = start + scale
+        pixels = []
+        i = int(start)
+        while i < end and i < size_in:
+            cover = min(end, i + 1) - max(start, i)
+            if cover > 1e-9:
+                pixels.append((i, cover / scale))
+            i += 1
+        weights.append(pixels)
+    return weights
+
+
+def read_png(data: bytes) -> Image:
+    """Decode a non-interlaced PNG file.
+
+    All color types and bit depths are supported. 16 bit images are reduced to
+    8 bit.
+
+    :param data: Content of the PNG file.
+
+    :return: The decoded image.
+
+    :raises ValueError: Invalid or unsupported PNG file.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file.")
+
+    header = None
+    palette = None
+    transparency = None
+    idat = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos : pos + 8])
+        chunk = data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"PLTE":
+            palette = chunk
+        elif chunk_type == b"tRNS":
+            transparency = chunk
+        elif chunk_type == b"IDAT":
+            idat.append(chunk)
+        elif chunk_type == b"IEND":
+            break
+
+    if header is None or not idat:
+        raise ValueError("Invalid PNG file.")
+    width, height, depth, color_type, _, _, interlace = header
+    if interlace:
+        raise ValueError("Interlaced PNG files are not supported.")
+    if color_type not in _PNG_CHANNELS or (color_type == 3 and palette is None):
+        raise ValueError(f"Unsupported PNG color type {color_type}.")
+
+    channels = _PNG_CHANNELS[color_type]
+    bits_per_pixel = channels * depth
+    bpp = max(1, bits_per_pixel // 8)
+    stride = (width * bits_per_pixel + 7) // 8
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error as err:
+        raise ValueError("Invalid PNG file.") from err
+
+    rgba = bytearray()
+    prev = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        row = bytearray(raw[start + 1 : start + 1 + stride])
+        row = _unfilter_row(row, prev, raw[start], bpp)
+        prev = row
+        samples = _samples(row, depth, width * channels)
+        rgba += _to_rgba(samples, color_type, palette, transparency, depth)
+
+    return Image.from_rgba(width, height, rgba)
+
+
+def write_png(image: Image) -> bytes:
+    """Encode an image as 8 bit RGBA PNG file.
+
+    :param image: Image to encode.
+    """
+    rgba = image.to_rgba()
+    stride = image.width * 4
+    raw = b"".join(
+        b"\x00" + rgba[y * stride : (y + 1) * stride] for y in range(image.height)
+    )
+
+    def chunk(chunk_type: bytes, content: bytes) -> bytes:
+        """Return a PNG chunk with length and CRC."""
+        crc = zlib.crc32(chunk_type + content) & 0xFFFFFFFF
+        return (
+            struct.pack(">I", len(content))
+            + chunk_type
+            + content
+            + (struct.pack(">I", crc))
+        )
+
+    header = struct.pack(">IIBBBBB", image.width, image.height, 8, 6, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_ico(images: Dict[int, bytes]) -> bytes:
+    """Create a Windows `.ico` file with embedded PNG images.
+
+    :param images: Dictionary with the size as key and the PNG data as value.
+    """
+    sizes = sorted(images)
+    header = struct.pack("<HHH", 0, 1, len(sizes))
+    offset = len(header) + 16 * len(sizes)
+    entries = b""
+    for size in sizes:
+        dim = size if size < 256 else 0  # 0 means 256 pixels
+        entries += struct.pack(
+            "<BBBBHHII", dim, dim, 0, 0, 1, 32, len(images[size]), offset
+        )
+        offset += len(images[size])
+    return header + entries + b"".join(images[size] for size in sizes)
+
+
+def make_icns(images: Dict[int, bytes]) -> bytes:
+    """Create a macOS `.icns` file with embedded PNG images.
+
+    :param images: Dictionary with the size as key and the PNG data as value.
+        Icon types whose size is not available are left out.
+    """
+    body = b"".join(
+        icon_type + struct.pack(">I", 8 + len(images[size])) + images[size]
+        for icon_type, size in ICNS_TYPES
+        if size in images
+    )
+    return b"icns" + struct.pack(">I", 8 + len(body)) + body
+
+
+def icon_sizes(suffix: str, master_size: int) -> List[int]:
+    """Return the sizes that are required for an icon format.
+
+    Sizes larger than the master image are left out, but the smallest size is
+    always included.
+
+    :param suffix: Icon format, "ico" or "icns".
+    :param master_size: Size of the (square) master image.
+    """
+    sizes: Iterable[int] = ICO_SIZES if suffix == "ico" else {s for _, s in ICNS_TYPES}
+    sizes = sorted(sizes)
+    return [it for it in sizes if it <= master_size] or sizes[:1]
+
+
+def convert_png(data: bytes, suffix: str) -> bytes:
+    """Convert a master PNG into an `.ico` or `.icns` icon.
+
+    Non-square images are scaled to a square. All sizes are derived from each other
+    by halving the image, starting with the largest.
+
+    :param data: Content of the master PNG file.
+    :param suffix: Icon format, "ico" or "icns".
+
+    :raises ValueError: Invalid PNG file or unknown suffix.
+    """
+    if suffix not in ("ico", "icns"):
+        raise ValueError(f"Cannot convert a PNG to {suffix}.")
+
+    master = read_png(data)
+    sizes = icon_sizes(suffix, min(master.width, master.height))
+
+    images = {}
+    source = master
+    for size in sorted(sizes, reverse=True):
+        image = source.resized(size)
+        images[size] = write_png(image)
+        if size & (size - 1) == 0:  # powers of two are halved further
+            source = image
+
+    return make_ico(images) if suffix == "ico" else make_icns(images)
+
+
+def _unfilter_row(
+    row: bytearray, prev: bytearray, filter_type: int, bpp: int
+) -> bytearray:
+    """Reverse the PNG filter of one row in place.
+
+    :param row: Filtered row without the filter type byte.
+    :param prev: Previous, already unfiltered row.
+    :param filter_type: PNG filter type, 0 to 4.
+    :param bpp: Bytes per complete pixel, at least 1.
+
+    :raises ValueError: Unknown filter type.
+    """
+    n = len(row)
+    if filter_type > 4:
+        raise ValueError(f"Invalid PNG filter type {filter_type}.")
+    if filter_type == 1:  # Sub
+        for i in range(bpp, n):
+            row[i] = (row[i] + row[i - bpp]) & 0xFF
+    elif filter_type == 2:  # Up
+        row[:] = bytes(map(lambda a, b: (a + b) & 0xFF, row, prev))
+    elif filter_type == 3:  # Average
+        for i in range(n):
+            left = row[i - bpp] if i >= bpp else 0
+            row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xFF
+    elif filter_type == 4:  # Paeth
+        for i in range(n):
+            a = row[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            c = prev[i - bpp] if i >= bpp else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            if pa <= pb and pa <= pc:
+                pred = a
+            elif pb <= pc:
+                pred = b
+            else:
+                pred = c
+            row[i] = (row[i] + pred) & 0xFF
+    return row
+
+
+def _samples(row: bytearray, depth: int, count: int) -> bytearray:
+    """Return the samples of a row as one byte per sample.
+
+    :param row: Unfiltered row.
+    :param depth: Bits per sample.
+    :param count: Number of samples in the row.
+    """
+    if depth == 8:
+        return row
+    if depth == 16:
+        return row[0::2]  # high byte
+    samples = bytearray(count)
+    per_byte = 8 // depth
+    mask = (1 << depth) - 1
+    for i in range(count):
+        shift = 8 - depth * (i % per_byte + 1)
+        samples[i] = (row[i // per_byte] >> shift) & mask
+    return samples
+
+
+def _to_rgba(
+    samples: bytearray,
+    color_type: int,
+    palette: bytes,
+    transparency: bytes,
+    depth: int,
+) -> bytearray:
+    """Convert the samples of one row to RGBA.
+
+    :param samples: One byte per sample, see `_samples`.
+    :param color_type: PNG color type.
+    :param palette: Content of the PLTE chunk.
+    :param transparency: Content of the tRNS chunk.
+    :param depth: Bits per sample of the original image.
+    """
+    if color_type == 3:  # palette
+        alpha = transparency or b""
+        lut = [
+            palette[3 * i : 3 * i + 3] + bytes([alpha[i] if i < len(alpha) else 255])
+            for i in range(len(palette) // 3)
+        ]
+        return bytearray(b"".join(lut[i] for i in samples))
+
+    if color_type in (0, 4) and depth < 8:  # scale gray levels to 8 bit
+        scale = 255 // ((1 << depth) - 1)
+        samples = bytearray(it * scale for it in samples)
+
+    width = len(samples) // _PNG_CHANNELS[color_type]
+    rgba = bytearray(b"\xff" * (4 * width))
+    if color_type == 0:
+        for ch in range(3):
+            rgba[ch::4] = samples
+    elif color_type == 4:
+        for ch in range(3):
+            rgba[ch::4] = samples[0::2]
+        rgba[3::4] = samples[1::2]
+    elif color_type == 2:
+        for ch in range(3):
+            rgba[ch::4] = samples[ch::3]
+    else:
+        rgba[:] = samples
+
+    # a single transparent color for gray and RGB images
+    if transparency and color_type in (0, 2):
+        values = struct.unpack(f">{len(transparency) // 2}H", transparency)
+        if depth == 16:
+            values = tuple(it >> 8 for it in values)
+        elif color_type == 0 and depth < 8:
+            values = tuple(it * (255 // ((1 << depth) - 1)) for it in values)
+        key = bytes(values) if color_type == 2 else bytes(values) * 3
+        for x in range(width):
+            if rgba[4 * x : 4 * x + 3] == key:
+                rgba[4 * x + 3] = 0
+    return rgba
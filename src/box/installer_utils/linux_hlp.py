@@ -1,11 +1,99 @@
 # Helper functions to create a linux GUI installer.
 
+from typing import Union
+
+from box.config import config_default
+
+# Bash functions to manage side-by-side installed versions. Each version is installed
+# into `ROOT/versions/VERSION` and the `ROOT/current` symlink points to the active one.
+BASH_VERSION_FUNCTIONS = r"""# Atomically point the `current` symlink in folder $1 to version $2
+activate_version() {
+    ln -sfn "versions/$2" "$1/.current.tmp"
+    mv -Tf "$1/.current.tmp" "$1/current"
+}
+
+# Delete all but the $2 most recently installed versions in folder $1
+prune_versions() {
+    local CURRENT_VERSION
+    CURRENT_VERSION=$(basename "$(readlink "$1/current")")
+    ls -1t "$1/versions" | tail -n +$(($2 + 1)) | while read -r OLD_VERSION; do
+        if [ "$OLD_VERSION" != "$CURRENT_VERSION" ]; then
+            rm -rf "${1:?}/versions/$OLD_VERSION"
+        fi
+    done
+}
+
+# Write a script into folder $1 that switches to another installed version
+write_switch_script() {
+    cat > "$1/switch_version.sh" << 'EOF_SWITCH'
+#!/bin/bash
+# Switch to another installed version, e.g., to roll back an update.
+ROOT_DIR=$(cd "$(dirname "$0")" && pwd)
+if [ -z "$1" ] || [ ! -d "$ROOT_DIR/versions/$1" ]; then
+    echo "Usage: $0 VERSION"
+    echo "Installed versions:"
+    ls -1 "$ROOT_DIR/versions"
+    exit 1
+fi
+ln -sfn "versions/$1" "$ROOT_DIR/.current.tmp"
+mv -Tf "$ROOT_DIR/.current.tmp" "$ROOT_DIR/current"
+echo "Switched to version $1."
+EOF_SWITCH
+    chmod +x "$1/switch_version.sh"
+}"""
+
+
+def bash_prewarm(self_command: str = "self", timeout: Union[int, None] = None) -> str:
+    """Create the bash commands that pre-warm the PyApp environment after installing.
+
+    The installed binary `$INSTALL_FILE` runs PyApp's `restore` management command,
+    such that the Python distribution and the project are installed right away and
+    the first start of the program is fast. If the installer runs as root via `sudo`,
+    e.g., to install into `/usr/local/bin`, the binary runs as `$SUDO_USER`, such
+    that the data folder of the invoking user is set up instead of root's.
+
+    :param self_command: Name of PyApp's management command, see `PYAPP_SELF_COMMAND`.
+    :param timeout: Timeout in seconds, or `None` to disable pre-warming.
+
+    :return: The bash commands, empty if pre-warming is disabled.
+    """
+    if timeout is None:
+        return ""
+    return rf"""
+# Pre-warm the environment, such that the first start of the program is fast
+echo "Setting up $INSTALL_NAME, this can take a while..."
+RUN_AS=""
+if [ "$(id -u)" -eq 0 ] && [ -n "$SUDO_USER" ] && command -v sudo > /dev/null; then
+    RUN_AS="sudo -u $SUDO_USER -H"
+fi
+if command -v timeout > /dev/null; then
+    timeout {timeout} $RUN_AS "$INSTALL_FILE" {self_command} restore \
+        < /dev/null > /dev/null 2>&1
+else
+    $RUN_AS "$INSTALL_FILE" {self_command} restore < /dev/null > /dev/null 2>&1
+fi
+if [ $? -ne 0 ]; then
+    echo "Warning: Setup did not finish, it will be completed on the first start."
+fi
+"""
 
-def create_bash_installer_cli(name_pkg, version) -> str:
+
+def create_bash_installer_cli(
+    name_pkg,
+    version,
+    keep_versions: int = config_default("keep_versions"),
+    prewarm: str = "",
+) -> str:
     """Create a bash installer for a CLI application.
 
+    The binary is installed into `INSTALL_DIR/.name_pkg/versions/version` and the
+    `current` symlink is switched atomically to the new version. The executable
+    `INSTALL_DIR/name_pkg` is a symlink to the current version.
+
     :param name_pkg: The name of the program.
     :param version: The version of the program.
+    :param keep_versions: Number of installed versions to keep, including the new one.
+    :param prewarm: Commands to pre-warm the environment, see `bash_prewarm`.
 
     :return: The bash installer content.
     """
@@ -15,6 +103,10 @@ def create_bash_installer_cli(name_pkg, version) -> str:
 # Default installation name and folder
 INSTALL_NAME={name_pkg}
 INSTALL_DIR=/usr/local/bin
+VERSION={version}
+KEEP_VERSIONS={keep_versions}
+
+{BASH_VERSION_FUNCTIONS}
 
 # Check if user has a better path:
 read -p "Enter the installation path (default: $INSTALL_DIR): " USER_INSTALL_DIR
@@ -35,9 +127,11 @@ if [ ! -w "$INSTALL_DIR" ]; then
 fi
 
 INSTALL_FILE=$INSTALL_DIR/$INSTALL_NAME
+ROOT_DIR=$INSTALL_DIR/.$INSTALL_NAME
+VERSION_DIR=$ROOT_DIR/versions/$VERSION
 
-# check if installation file already exist and if it does, ask if overwrite is ok
-if [ -f "$INSTALL_FILE" ]; then
+# check if a file that is not managed by this installer exists, ask if overwrite is ok
+if [ -e "$INSTALL_FILE" ] && [ ! -L "$INSTALL_FILE" ]; then
     read -p "File already exists. Overwrite? (y/n): " OVERWRITE
     if [ "$OVERWRITE" != "y" ]; then
         echo "Installation aborted."
@@ -45,26 +139,168 @@ if [ -f "$INSTALL_FILE" ]; then
     fi
 fi
 
+# check if this version is already installed and if it does, ask if reinstall is ok
+if [ -d "$VERSION_DIR" ]; then
+    read -p "Version $VERSION is already installed. Reinstall? (y/n): " OVERWRITE
+    if [ "$OVERWRITE" != "y" ]; then
+        echo "Installation aborted."
+        exit 1
+    fi
+fi
+
 if ! [[ ":$PATH:" == *":$INSTALL_DIR:"* ]]; then\
   echo "$INSTALL_DIR is not on your PATH. Please add it."
 fi
 
+# write the new version next to the old ones, then switch over atomically
+mkdir -p "$VERSION_DIR"
+sed -e '1,/^#__PROGRAM_BINARY__$/d' "$0" > "$VERSION_DIR/.$INSTALL_NAME.tmp"
+chmod +x "$VERSION_DIR/.$INSTALL_NAME.tmp"
+mv -f "$VERSION_DIR/.$INSTALL_NAME.tmp" "$VERSION_DIR/$INSTALL_NAME"
+touch "$VERSION_DIR"
+activate_version "$ROOT_DIR" "$VERSION"
+
+# the executable on the PATH always points to the current version
+if [ "$(readlink "$INSTALL_FILE")" != ".$INSTALL_NAME/current/$INSTALL_NAME" ]; then
+    ln -sfn ".$INSTALL_NAME/current/$INSTALL_NAME" "$INSTALL_DIR/.$INSTALL_NAME.tmp"
+    mv -Tf "$INSTALL_DIR/.$INSTALL_NAME.tmp" "$INSTALL_FILE"
+fi
 
-sed -e '1,/^#__PROGRAM_BINARY__$/d' "$0" > $INSTALL_FILE
-chmod +x $INSTALL_FILE
-
+prune_versions "$ROOT_DIR" "$KEEP_VERSIONS"
+write_switch_script "$ROOT_DIR"
+{prewarm}
 echo "Successfully installed $INSTALL_NAME to $INSTALL_DIR"
+echo "Switch between installed versions with $ROOT_DIR/switch_version.sh"
 exit 0
 #__PROGRAM_BINARY__
 """
 
 
-def create_bash_installer_gui(name_pkg, version, icon_name) -> str:
+def create_bash_installer_pipe(
+    name_pkg,
+    version,
+    payload_size: int,
+    payload_sha256: str,
+    keep_versions: int = config_default("keep_versions"),
+    prewarm: str = "",
+) -> str:
+    """Create a bash installer for a CLI application that can be piped into bash.
+
+    The installer is non-interactive and can be run with, e.g.,
+    `curl -fsSL URL | bash`. The binary is appended to the script without any marker.
+    The installer reads it from stdin while it arrives, or with `tail` from the script
+    itself if it is run as a file. The SHA-256 checksum is computed while the
+    binary is written and verified before the new version is activated. All
+    commands are wrapped in a function, such that nothing is executed if the
+    download of the script is interrupted.
+
+    :param name_pkg: The name of the program.
+    :param version: The version of the program.
+    :param payload_size: Size of the binary in bytes.
+    :param payload_sha256: SHA-256 hex digest of the binary.
+    :param keep_versions: Number of installed versions to keep, including the new one.
+    :param prewarm: Commands to pre-warm the environment, see `bash_prewarm`.
+
+    :return: The bash installer content.
+    """
+    return rf"""#!/bin/bash
+# This is a generated installer for {name_pkg} v{version}. Install it with:
+#   curl -fsSL URL | bash
+# Set BOX_INSTALL_DIR to install into another folder than /usr/local/bin.
+
+INSTALL_NAME={name_pkg}
+VERSION={version}
+KEEP_VERSIONS={keep_versions}
+PAYLOAD_SIZE={payload_size}
+PAYLOAD_SHA256={payload_sha256}
+
+{BASH_VERSION_FUNCTIONS}
+
+install_program() {{
+INSTALL_DIR=${{BOX_INSTALL_DIR:-/usr/local/bin}}
+
+# Check if installation folder exists
+if [ ! -d "$INSTALL_DIR" ]; then
+    echo "Error: Installation folder $INSTALL_DIR does not exist."
+    return 1
+fi
+
+# Check if installation folder requires root access
+if [ ! -w "$INSTALL_DIR" ]; then
+    echo "Error: Installation folder requires root access. Please run with sudo."
+    return 1
+fi
+
+INSTALL_FILE=$INSTALL_DIR/$INSTALL_NAME
+ROOT_DIR=$INSTALL_DIR/.$INSTALL_NAME
+VERSION_DIR=$ROOT_DIR/versions/$VERSION
+TMP_FILE=$VERSION_DIR/.$INSTALL_NAME.tmp
+
+# never overwrite a file that is not managed by this installer without asking
+if [ -e "$INSTALL_FILE" ] && [ ! -L "$INSTALL_FILE" ]; then
+    echo "Error: $INSTALL_FILE already exists. Please remove it first."
+    return 1
+fi
+
+if ! [[ ":$PATH:" == *":$INSTALL_DIR:"* ]]; then
+  echo "$INSTALL_DIR is not on your PATH. Please add it."
+fi
+
+# write the binary while it arrives on stdin, or from this file if run as a file
+mkdir -p "$VERSION_DIR"
+if [ -n "${{BASH_SOURCE[0]}}" ] && [ -f "${{BASH_SOURCE[0]}}" ]; then
+    CHECKSUM=$(tail -c "$PAYLOAD_SIZE" "${{BASH_SOURCE[0]}}" | tee "$TMP_FILE" | sha256sum)
+else
+    CHECKSUM=$(head -c "$PAYLOAD_SIZE" | tee "$TMP_FILE" | sha256sum)
+fi
+
+if [ "${{CHECKSUM%% *}}" != "$PAYLOAD_SHA256" ]; then
+    rm -f "$TMP_FILE"
+    rmdir "$VERSION_DIR" 2> /dev/null
+    echo "Error: Checksum mismatch, the download is incomplete or corrupted."
+    return 1
+fi
+
+# switch over to the new version atomically
+chmod +x "$TMP_FILE"
+mv -f "$TMP_FILE" "$VERSION_DIR/$INSTALL_NAME"
+touch "$VERSION_DIR"
+activate_version "$ROOT_DIR" "$VERSION"
+
+# the executable on the PATH always points to the current version
+if [ "$(readlink "$INSTALL_FILE")" != ".$INSTALL_NAME/current/$INSTALL_NAME" ]; then
+    ln -sfn ".$INSTALL_NAME/current/$INSTALL_NAME" "$INSTALL_DIR/.$INSTALL_NAME.tmp"
+    mv -Tf "$INSTALL_DIR/.$INSTALL_NAME.tmp" "$INSTALL_FILE"
+fi
+
+prune_versions "$ROOT_DIR" "$KEEP_VERSIONS"
+write_switch_script "$ROOT_DIR"
+{prewarm}
+echo "Successfully installed $INSTALL_NAME to $INSTALL_DIR"
+}}
+
+install_program; exit $?
+"""
+
+
+def create_bash_installer_gui(
+    name_pkg,
+    version,
+    icon_name,
+    keep_versions: int = config_default("keep_versions"),
+    prewarm: str = "",
+) -> str:
     """Create a bash installer for a GUI application.
 
+    The binary and icon are installed into `INSTALL_DIR/versions/version` and the
+    `current` symlink is switched atomically to the new version. The desktop file
+    points to the current version.
+
     :param name_pkg: The name of the program.
     :param version: The version of the program.
     :param icon_name: The name of the icon file.
+    :param keep_versions: Number of installed versions to keep, including the new one.
+    :param prewarm: Commands to pre-warm the environment, see `bash_prewarm`.
 
     :return: The bash installer content.
     """
@@ -75,6 +311,10 @@ def create_bash_installer_gui(name_pkg, version, icon_name) -> str:
 # Program specific variables
 INSTALL_NAME={name_pkg}
 ICON_NAME={icon_name}
+VERSION={version}
+KEEP_VERSIONS={keep_versions}
+
+{BASH_VERSION_FUNCTIONS}
 
 # Default installation name and folder
 INSTALL_DIR=$HOME/.local/share/$INSTALL_NAME
@@ -92,8 +332,10 @@ if [ ! -z "$USER_DESKTOP_DIR" ]; then
     DESKTOP_DIR=$USER_DESKTOP_DIR
 fi
 
-# Check if installation folder exists
-if [ -d "$INSTALL_DIR" ]; then
+# Check if installation folder exists, no need to ask if it contains older versions
+if [ -d "$INSTALL_DIR/versions" ]; then
+    UPGRADE=y
+elif [ -d "$INSTALL_DIR" ]; then
     # ask if installation folder should be used even though it exists
     read -p "Installation folder already exists. Continue? (y/n): " CONTINUE
     if [ "$CONTINUE" != "y" ]; then
@@ -126,22 +368,14 @@ fi
 # Copy the binary and the icon to the installation folder
 
 
-INSTALL_FILE=$INSTALL_DIR/$INSTALL_NAME
-ICON_FILE=$INSTALL_DIR/$ICON_NAME
+VERSION_DIR=$INSTALL_DIR/versions/$VERSION
+INSTALL_FILE=$INSTALL_DIR/current/$INSTALL_NAME
+ICON_FILE=$INSTALL_DIR/current/$ICON_NAME
 DESKTOP_FILE=$DESKTOP_DIR/$INSTALL_NAME.desktop
 
-# check if installation file already exist and if it does, ask if overwrite is ok
-if [ -f "$INSTALL_FILE" ]; then
-    read -p "File already exists. Overwrite? (y/n): " OVERWRITE
-    if [ "$OVERWRITE" != "y" ]; then
-        echo "Installation aborted."
-        exit 1
-    fi
-fi
-
-# check if icon file already exist and if it does, ask if overwrite is ok
-if [ -f "$ICON_FILE" ]; then
-    read -p "Icon file already exists. Overwrite? (y/n): " OVERWRITE
+# check if this version is already installed and if it does, ask if reinstall is ok
+if [ -d "$VERSION_DIR" ]; then
+    read -p "Version $VERSION is already installed. Reinstall? (y/n): " OVERWRITE
     if [ "$OVERWRITE" != "y" ]; then
         echo "Installation aborted."
         exit 1
@@ -149,7 +383,7 @@ if [ -f "$ICON_FILE" ]; then
 fi
 
 # check if desktop file already exist and if it does, ask if overwrite is ok
-if [ -f "$DESKTOP_FILE" ]; then
+if [ -f "$DESKTOP_FILE" ] && [ "$UPGRADE" != "y" ]; then
     read -p "Desktop file already exists. Overwrite? (y/n): " OVERWRITE
     if [ "$OVERWRITE" != "y" ]; then
         echo "Installation aborted."
@@ -157,12 +391,16 @@ if [ -f "$DESKTOP_FILE" ]; then
     fi
 fi
 
-# do the copying
-sed -n '/^#__PROGRAM_BINARY__$/,/^#__ICON_BINARY__$/p' < "$0" | sed '1d;$d' > $INSTALL_FILE
-sed -e '1,/^#__ICON_BINARY__$/d' "$0" > $ICON_FILE
-
-# make the installation file executable
-chmod +x $INSTALL_FILE
+# write the new version next to the old ones, then switch over atomically
+mkdir -p "$VERSION_DIR"
+sed -n '/^#__PROGRAM_BINARY__$/,/^#__ICON_BINARY__$/p' < "$0" | sed '1d;$d' > "$VERSION_DIR/.$INSTALL_NAME.tmp"
+sed -e '1,/^#__ICON_BINARY__$/d' "$0" > "$VERSION_DIR/$ICON_NAME"
+chmod +x "$VERSION_DIR/.$INSTALL_NAME.tmp"
+mv -f "$VERSION_DIR/.$INSTALL_NAME.tmp" "$VERSION_DIR/$INSTALL_NAME"
+touch "$VERSION_DIR"
+activate_version "$INSTALL_DIR" "$VERSION"
+prune_versions "$INSTALL_DIR" "$KEEP_VERSIONS"
+write_switch_script "$INSTALL_DIR"
 
 # Create the desktop file
 echo "[Desktop Entry]" > $DESKTOP_FILE
@@ -182,8 +420,9 @@ echo "        echo \"Uninstaller aborted.\"" >> $UNINSTALL_FILE
 echo "        exit 1" >> $UNINSTALL_FILE
 echo "    fi" >> $UNINSTALL_FILE
 echo "" >> $UNINSTALL_FILE
-echo "rm -f $INSTALL_DIR/$INSTALL_NAME" >> $UNINSTALL_FILE
-echo "rm -f $INSTALL_DIR/$ICON_NAME" >> $UNINSTALL_FILE
+echo "rm -f \"$INSTALL_DIR/current\"" >> $UNINSTALL_FILE
+echo "rm -rf \"$INSTALL_DIR/versions\"" >> $UNINSTALL_FILE
+echo "rm -f $INSTALL_DIR/switch_version.sh" >> $UNINSTALL_FILE
 echo "rm -f $UNINSTALL_FILE" >> $UNINSTALL_FILE
 echo "rmdir $INSTALL_DIR" >> $UNINSTALL_FILE
 echo "rm -f $DESKTOP_FILE" >> $UNINSTALL_FILE
@@ -192,7 +431,7 @@ echo "" >> $UNINSTALL_FILE
 echo "echo \"Successfully uninstalled $INSTALL_NAME.\"" >> $UNINSTALL_FILE
 echo "exit 0" >> $UNINSTALL_FILE
 chmod +x $UNINSTALL_FILE
-
+{prewarm}
 # Notify user of successful installation
 echo "Successfully installed $INSTALL_NAME to $INSTALL_DIR"
 exit 0
@@ -0,0 +1,426 @@
+# Helper functions to create Linux `.deb` and `.rpm` packages in pure Python.
+#
+# Both writers stream the payload straight into the output file. Sizes and digests
+# that are only known once the payload is written are patched in afterwards by
+# seeking back, such that the (potentially very large) binary is written only once.
+
+import gzip
+import hashlib
+import io
+import platform
+import struct
+import tarfile
+import time
+from pathlib import Path
+from typing import BinaryIO, List, NamedTuple
+
+import box.checksums as cs
+
+DEB_ARCHITECTURES = {"x86_64": "amd64", "amd64": "amd64", "aarch64": "arm64"}
+RPM_ARCHITECTURES = {"amd64": "x86_64", "arm64": "aarch64"}
+
+
+class PackageFile(NamedTuple):
+    """A file to be packaged, with its absolute install path, content, and mode."""
+
+    path: str
+    content: bytes
+    mode: int = 0o644
+
+
+def deb_architecture() -> str:
+    """Return the Debian architecture name of the current machine."""
+    machine = platform.machine().lower()
+    return DEB_ARCHITECTURES.get(machine, machine)
+
+
+def rpm_architecture() -> str:
+    """Return the RPM architecture name of the current machine."""
+    machine = platform.machine().lower()
+    return RPM_ARCHITECTURES.get(machine, machine)
+
+
+def package_name(name: str) -> str:
+    """Return a valid `.deb`/`.rpm` package name from a project name.
+
+    :param name: Name of the project.
+    """
+    return name.lower().replace("_", "-")
+
+
+def desktop_file(name_pkg: str, exec_path: str, icon_path: str) -> bytes:
+    """Create the content of a `.desktop` file for a GUI application.
+
+    :param name_pkg: The name of the program.
+    :param exec_path: Absolute path to the installed binary.
+    :param icon_path: Absolute path to the installed icon.
+    """
+    return (
+        f"[Desktop Entry]\n"
+        f"Type=Application\n"
+        f"Name={name_pkg}\n"
+        f"Exec={exec_path}\n"
+        f"Icon={icon_path}\n"
+    ).encode("utf-8")
+
+
+# DEB #
+
+
+def write_deb(
+    fout: BinaryIO,
+    name: str,
+    version: str,
+    maintainer: str,
+    description: str,
+    files: List[PackageFile],
+    mtime: int = None,
+) -> None:
+    """Write a `.deb` package to an open, seekable binary file.
+
+    :param fout: File object to write to.
+    :param name: Package name.
+    :param version: Package version.
+    :param maintainer: Maintainer of the package.
+    :param description: Short, one line description of the package.
+    :param files: Files to put into the package.
+    :param mtime: Modification time for all entries, defaults to now.
+        Files are always sorted by path, such that the output is deterministic for a
+        fixed `mtime`.
+    """
+    if mtime is None:
+        mtime = int(time.time())
+    files = sorted(files, key=lambda it: it.path)
+
+    installed_size = sum(len(it.content) for it in files) // 1024 + 1
+    control = (
+        f"Package: {package_name(name)}\n"
+        f"Version: {version}\n"
+        f"Architecture: {deb_architecture()}\n"
+        f"Maintainer: {maintainer}\n"
+        f"Installed-Size: {installed_size}\n"
+        f"Section: utils\n"
+        f"Priority: optional\n"
+        f"Description: {description}\n"
+    ).encode("utf-8")
+    md5sums = "".join(
+        f"{hashlib.md5(it.content).hexdigest()}  {it.path.lstrip('/')}\n"
+        for it in files
+    ).encode("utf-8")
+
+    control_tar = io.BytesIO()
+    with gzip.GzipFile(fileobj=control_tar, mode="wb", mtime=mtime) as gz:
+        with tarfile.open(fileobj=gz, mode="w|") as tar:
+            _tar_dir(tar, ".", mtime)
+            _tar_file(tar, "./control", control, 0o644, mtime)
+            _tar_file(tar, "./md5sums", md5sums, 0o644, mtime)
+
+    fout.write(b"!<arch>\n")
+    _ar_member(fout, "debian-binary", b"2.0\n", mtime)
+    _ar_member(fout, "control.tar.gz", control_tar.getvalue(), mtime)
+
+    # stream the data archive and patch its size in the ar header afterwards
+    header_pos = fout.tell()
+    fout.write(_ar_header("data.tar.gz", 0, mtime))
+    data_start = fout.tell()
+    with gzip.GzipFile(filename="", fileobj=fout, mode="wb", mtime=mtime) as gz:
+        with tarfile.open(fileobj=gz, mode="w|") as tar:
+            for directory in _parent_dirs(files):
+                _tar_dir(tar, f".{directory}", mtime)
+            for it in files:
+                _tar_file(tar, f".{it.path}", it.content, it.mode, mtime)
+    data_size = fout.tell() - data_start
+    if data_size % 2:
+        fout.write(b"\n")
+    end_pos = fout.tell()
+    fout.seek(header_pos)
+    fout.write(_ar_header("data.tar.gz", data_size, mtime))
+    fout.seek(end_pos)
+
+
+def _ar_header(name: str, size: int, mtime: int) -> bytes:
+    """Return a 60 byte header for a member of an `ar` archive."""
+    header = f"{name:<16}{mtime:<12}{0:<6}{0:<6}{'100644':<8}{size:<10}`\n"
+    return header.encode("ascii")
+
+
+def _ar_member(fout: BinaryIO, name: str, content: bytes, mtime: int) -> None:
+    """Write a complete member to an `ar` archive, padded to an even length."""
+    fout.write(_ar_header(name, len(content), mtime))
+    fout.write(content)
+    if len(content) % 2:
+        fout.write(b"\n")
+
+
+def _parent_dirs(files: List[PackageFile]) -> List[str]:
+    """Return all parent directories of the files, sorted, as absolute paths."""
+    dirs = set()
+    for it in files:
+        for parent in Path(it.path).parents:
+            if parent.as_posix() != "/":
+                dirs.add(parent.as_posix())
+    return sorted(dirs)
+
+
+def _tar_dir(tar: tarfile.TarFile, name: str, mtime: int) -> None:
+    """Add a directory entry owned by root to a tar archive."""
+    info = tarfile.TarInfo(f"{name}/" if name != "." else "./")
+    info.type = tarfile.DIRTYPE
+    info.mode = 0o755
+    info.mtime = mtime
+    info.uname = info.gname = "root"
+    tar.addfile(info)
+
+
+def _tar_file(
+    tar: tarfile.TarFile, name: str, content: bytes, mode: int, mtime: int
+) -> None:
+    """Add a regular file owned by root to a tar archive."""
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    info.mode = mode
+    info.mtime = mtime
+    info.uname = info.gname = "root"
+    tar.addfile(info, io.BytesIO(content))
+
+
+# RPM #
+
+RPM_LEAD_MAGIC = b"\xed\xab\xee\xdb"
+RPM_HEADER_MAGIC = b"\x8e\xad\xe8\x01\x00\x00\x00\x00"
+
+RPM_INT16 = 3
+RPM_INT32 = 4
+RPM_STRING = 6
+RPM_BIN = 7
+RPM_STRING_ARRAY = 8
+RPM_I18NSTRING = 9
+
+RPMSENSE_LESS = 0x02
+RPMSENSE_EQUAL = 0x08
+RPMSENSE_RPMLIB = 0x01000000
+RPMFILE_DIGEST_SHA256 = 8
+
+RPMTAG_HEADERSIGNATURES = 62
+RPMTAG_HEADERIMMUTABLE = 63
+RPMSIGTAG_SHA256 = 273
+RPMSIGTAG_SIZE = 1000
+RPMSIGTAG_MD5 = 1004
+RPMSIGTAG_PAYLOADSIZE = 1007
+
+
+def write_rpm(
+    fout: BinaryIO,
+    name: str,
+    version: str,
+    packager: str,
+    description: str,
+    files: List[PackageFile],
+    mtime: int = None,
+    release: str = "1",
+) -> None:
+    """Write a binary `.rpm` package (format version 3) to a seekable binary file.
+
+    The signature header has a fixed size, so it is written as a placeholder first.
+    The gzip compressed `cpio` payload is then streamed into the file while its
+    digest is computed, and the signature is filled in at the end.
+
+    :param fout: File object to write to.
+    :param name: Package name.
+    :param version: Package version.
+    :param packager: Packager (author) of the package.
+    :param description: Short, one line description of the package.
+    :param files: Files to put into the package.
+    :param mtime: Modification time for all entries, defaults to now.
+    :param release: Release number of the package.
+    """
+    if mtime is None:
+        mtime = int(time.time())
+    files = sorted(files, key=lambda it: it.path)
+    name = package_name(name)
+    arch = rpm_architecture()
+
+    header = _rpm_header(
+        name, version, release, arch, packager, description, files, mtime
+    )
+
+    lead_name = f"{name}-{version}-{release}".encode("utf-8")[:65]
+    fout.write(
+        RPM_LEAD_MAGIC
+        + struct.pack(">BBhh", 3, 0, 0, 1)
+        + lead_name.ljust(66, b"\x00")
+        + struct.pack(">hh", 1, 5)
+        + b"\x00" * 16
+    )
+
+    signature_pos = fout.tell()
+    fout.write(_rpm_signature(0, 0, b"\x00" * 16, "0" * 64))
+
+    # the md5 digest and the size cover the header and the compressed payload
+    hashing_out = cs.HashingWriter(fout, ("md5",))
+    hashing_out.write(header)
+    payload_size = 0
+    with gzip.GzipFile(filename="", fileobj=hashing_out, mode="wb", mtime=mtime) as gz:
+        for it in _cpio_entries(files, mtime):
+            gz.write(it)
+            payload_size += len(it)
+    end_pos = fout.tell()
+
+    fout.seek(signature_pos)
+    fout.write(
+        _rpm_signature(
+            hashing_out.size,
+            payload_size,
+            bytes.fromhex(hashing_out.hexdigests()["md5"]),
+            hashlib.sha256(header).hexdigest(),
+        )
+    )
+    fout.seek(end_pos)
+
+
+def _cpio_entries(files: List[PackageFile], mtime: int):
+    """Yield the chunks of a `newc` cpio archive of the given files."""
+
+    def entry(ino: int, name: str, mode: int, content: bytes = b""):
+        """Return the header and name of an entry, padded to four bytes."""
+        name_bytes = f"{name}".encode("utf-8") + b"\x00"
+        fields = [ino, mode, 0, 0, 1, mtime, len(content), 0, 0, 0, 0]
+        fields += [len(name_bytes), 0]
+        header = b"070701" + "".join(f"{it:08x}" for it in fields).encode("ascii")
+        header += name_bytes
+        return header + b"\x00" * (-len(header) % 4)
+
+    for ino, it in enumerate(files, start=1):
+        yield entry(ino, f".{it.path}", 0o100000 | it.mode, it.content)
+        yield it.content
+        yield b"\x00" * (-len(it.content) % 4)
+    yield entry(0, "TRAILER!!!", 0)
+
+
+def _rpm_header(
+    name: str,
+    version: str,
+    release: str,
+    arch: str,
+    packager: str,
+    description: str,
+    files: List[PackageFile],
+    mtime: int,
+) -> bytes:
+    """Create the main header of an rpm package."""
+    dirnames = sorted({str(Path(it.path).parent).rstrip("/") + "/" for it in files})
+    requires = [
+        ("rpmlib(CompressedFileNames)", "3.0.4-1"),
+        ("rpmlib(FileDigests)", "4.6.0-1"),
+        ("rpmlib(PayloadFilesHavePrefix)", "4.0-1"),
+    ]
+    nfiles = len(files)
+    tags = [
+        (1000, RPM_STRING, name),  # NAME
+        (1001, RPM_STRING, version),  # VERSION
+        (1002, RPM_STRING, release),  # RELEASE
+        (1004, RPM_I18NSTRING, description),  # SUMMARY
+        (1005, RPM_I18NSTRING, description),  # DESCRIPTION
+        (1006, RPM_INT32, [mtime]),  # BUILDTIME
+        (1007, RPM_STRING, "box"),  # BUILDHOST
+        (1009, RPM_INT32, [sum(len(it.content) for it in files)]),  # SIZE
+        (1014, RPM_STRING, "Unknown"),  # LICENSE
+        (1015, RPM_STRING, packager),  # PACKAGER
+        (1016, RPM_I18NSTRING, "Unspecified"),  # GROUP
+        (1021, RPM_STRING, "linux"),  # OS
+        (1022, RPM_STRING, arch),  # ARCH
+        (1028, RPM_INT32, [len(it.content) for it in files]),  # FILESIZES
+        (1030, RPM_INT16, [0o100000 | it.mode for it in files]),  # FILEMODES
+        (1033, RPM_INT16, [0] * nfiles),  # FILERDEVS
+        (1034, RPM_INT32, [mtime] * nfiles),  # FILEMTIMES
+        (
+            1035,
+            RPM_STRING_ARRAY,
+            [hashlib.sha256(it.content).hexdigest() for it in files],
+        ),  # FILEDIGESTS
+        (1036, RPM_STRING_ARRAY, [""] * nfiles),  # FILELINKTOS
+        (1037, RPM_INT32, [0] * nfiles),  # FILEFLAGS
+        (1039, RPM_STRING_ARRAY, ["root"] * nfiles),  # FILEUSERNAME
+        (1040, RPM_STRING_ARRAY, ["root"] * nfiles),  # FILEGROUPNAME
+        (1044, RPM_STRING, f"{name}-{version}-{release}.src.rpm"),  # SOURCERPM
+        (1045, RPM_INT32, [0xFFFFFFFF] * nfiles),  # FILEVERIFYFLAGS
+        (1047, RPM_STRING_ARRAY, [name]),  # PROVIDENAME
+        (1048, RPM_INT32, [RPMSENSE_LESS | RPMSENSE_EQUAL | RPMSENSE_RPMLIB] * 3),
+        (1049, RPM_STRING_ARRAY, [it[0] for it in requires]),  # REQUIRENAME
+        (1050, RPM_STRING_ARRAY, [it[1] for it in requires]),  # REQUIREVERSION
+        (1064, RPM_STRING, "4.11.0"),  # RPMVERSION
+        (1095, RPM_INT32, [1] * nfiles),  # FILEDEVICES
+        (1096, RPM_INT32, list(range(1, nfiles + 1))),  # FILEINODES
+        (1097, RPM_STRING_ARRAY, [""] * nfiles),  # FILELANGS
+        (1112, RPM_INT32, [RPMSENSE_EQUAL]),  # PROVIDEFLAGS
+        (1113, RPM_STRING_ARRAY, [f"{version}-{release}"]),  # PROVIDEVERSION
+        (
+            1116,
+            RPM_INT32,
+            [
+                dirnames.index(str(Path(it.path).parent).rstrip("/") + "/")
+                for it in files
+            ],
+        ),  # DIRINDEXES
+        (1117, RPM_STRING_ARRAY, [Path(it.path).name for it in files]),  # BASENAMES
+        (1118, RPM_STRING_ARRAY, dirnames),  # DIRNAMES
+        (1124, RPM_STRING, "cpio"),  # PAYLOADFORMAT
+        (1125, RPM_STRING, "gzip"),  # PAYLOADCOMPRESSOR
+        (1126, RPM_STRING, "9"),  # PAYLOADFLAGS
+        (5011, RPM_INT32, [RPMFILE_DIGEST_SHA256]),  # FILEDIGESTALGO
+    ]
+    return _rpm_header_structure(tags, RPMTAG_HEADERIMMUTABLE)
+
+
+def _rpm_signature(size: int, payload_size: int, md5: bytes, sha256: str) -> bytes:
+    """Create the signature header, padded to a multiple of 8 bytes.
+
+    All entries have a fixed length, such that the signature can be written as a
+    placeholder first and be overwritten once all values are known.
+    """
+    tags = [
+        (RPMSIGTAG_SHA256, RPM_STRING, sha256),
+        (RPMSIGTAG_SIZE, RPM_INT32, [size]),
+        (RPMSIGTAG_MD5, RPM_BIN, md5),
+        (RPMSIGTAG_PAYLOADSIZE, RPM_INT32, [payload_size]),
+    ]
+    signature = _rpm_header_structure(tags, RPMTAG_HEADERSIGNATURES)
+    return signature + b"\x00" * (-len(signature) % 8)
+
+
+def _rpm_header_structure(tags: List, region_tag: int) -> bytes:
+    """Pack tags into an rpm header structure with a leading region tag.
+
+    :param tags: List of `(tag, type, value)` tuples, sorted by tag.
+    :param region_tag: Tag of the region that encloses all entries.
+    """
+    alignment = {RPM_INT16: 2, RPM_INT32: 4}
+    index = []
+    store = b""
+    for tag, typ, value in tags:
+        store += b"\x00" * (-len(store) % alignment.get(typ, 1))
+        if typ == RPM_INT16:
+            data, count = struct.pack(f">{len(value)}H", *value), len(value)
+        elif typ == RPM_INT32:
+            data, count = struct.pack(f">{len(value)}I", *value), len(value)
+        elif typ == RPM_BIN:
+            data, count = value, len(value)
+        elif typ == RPM_STRING_ARRAY:
+            data = b"".join(it.encode("utf-8") + b"\x00" for it in value)
+            count = len(value)
+        else:  # RPM_STRING, RPM_I18NSTRING
+            data, count = value.encode("utf-8") + b"\x00", 1
+        index.append(struct.pack(">iiii", tag, typ, len(store), count))
+        store += data
+
+    nindex = len(index) + 1
+    trailer = struct.pack(">iiii", region_tag, RPM_BIN, -nindex * 16, 16)
+    region = struct.pack(">iiii", region_tag, RPM_BIN, len(store), 16)
+    store += trailer
+    return (
+        RPM_HEADER_MAGIC
+        + struct.pack(">ii", nindex, len(store))
+        + region
+        + b"".join(index)
+        + store
+    )
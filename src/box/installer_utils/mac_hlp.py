@@ -3,6 +3,8 @@
 import shutil
 from pathlib import Path
 
+from box.utils import link_or_copy
+
 
 def dmgbuild_settings(target_path: Path, name_pkg: str, icon: Path) -> dict:
     """Create the settings for building the dmg file.
@@ -41,10 +43,10 @@ def make_app(
     res_path.mkdir(parents=True)
     shutil.copy(icon, res_path.joinpath(icon.name))
 
-    # create MacOS directory and copy binary into it
+    # create MacOS directory and link the binary into it, copy only as fallback
     macos_path = app_path.joinpath("Contents/MacOS")
     macos_path.mkdir(parents=True)
-    shutil.copy(target_path.joinpath(name_pkg), macos_path.joinpath(name_pkg))
+    link_or_copy(target_path.joinpath(name_pkg), macos_path.joinpath(name_pkg))
 
     # Create the Info.plist file
     name_pkg_short = name_pkg if len(name_pkg) <= 16 else name_pkg[:16]
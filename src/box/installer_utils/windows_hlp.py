@@ -1,10 +1,54 @@
 """Helper routines for creating installers on Windows."""
 
 from pathlib import Path
+from typing import Union
+
+from box.config import config_default
+
+NSIS_COMPRESSORS = ("zlib", "bzip2", "lzma")
+
+
+def nsis_compression(
+    compressor: str = config_default("nsis_compressor"),
+    solid: bool = config_default("nsis_solid"),
+    dict_size: Union[int, None] = config_default("nsis_dict_size"),
+) -> str:
+    """Create the NSIS commands that set the compression of the installer.
+
+    :param compressor: Compressor to use, one of `NSIS_COMPRESSORS`
+    :param solid: Compress all files as one solid block
+    :param dict_size: Dictionary size of the LZMA compressor in MB, NSIS default if None
+
+    :raises ValueError: Invalid compressor or dictionary size
+    """
+    if compressor not in NSIS_COMPRESSORS:
+        raise ValueError(
+            f"Invalid NSIS compressor {compressor}. "
+            f"Valid compressors are {', '.join(NSIS_COMPRESSORS)}."
+        )
+
+    solid_flag = "/SOLID " if solid else ""
+    commands = [f"SetCompressor {solid_flag}{compressor}"]
+
+    if dict_size is not None:
+        if compressor != "lzma":
+            raise ValueError("NSIS dictionary size can only be set for lzma.")
+        if not isinstance(dict_size, int) or isinstance(dict_size, bool):
+            raise ValueError(f"Invalid NSIS dictionary size {dict_size}.")
+        if not 1 <= dict_size <= 1024:
+            raise ValueError("NSIS dictionary size must be between 1 and 1024 MB.")
+        commands.append(f"SetCompressorDictSize {dict_size}")
+
+    return "\n".join(f"  {it}" for it in commands)
 
 
 def nsis_cli_script(
-    project_name: str, installer_name: str, author: str, version: str, binary_path: Path
+    project_name: str,
+    installer_name: str,
+    author: str,
+    version: str,
+    binary_path: Path,
+    compression: str = nsis_compression(),
 ):
     """Create NSIS script for CLI installer.
 
@@ -13,6 +57,7 @@ def nsis_cli_script(
     :param author: Author of the project
     :param version: Version of the project
     :param binary_path: Path to the binary to be installed
+    :param compression: Compression commands, see `nsis_compression`
     """
     return rf"""; NSIS script to create installer for {project_name}
 
@@ -29,6 +74,9 @@ def nsis_cli_script(
   OutFile "{installer_name}"
   Unicode True
 
+  ;Compression
+{compression}
+
   ;Default installation folder
   InstallDir "$LOCALAPPDATA\{project_name}"
 
@@ -130,6 +178,7 @@ def nsis_gui_script(
     version: str,
     binary_path: Path,
     icon_path: Path,
+    compression: str = nsis_compression(),
 ):
     """Create NSIS script for GUI installer.
 
@@ -139,6 +188,7 @@ def nsis_gui_script(
     :param version: Version of the project
     :param binary_path: Path to the binary to be installed
     :param icon_path: Path to the icon file to be used in the installer
+    :param compression: Compression commands, see `nsis_compression`
     """
     return rf"""; NSIS script to create installer for {project_name}
 
@@ -157,6 +207,9 @@ def nsis_gui_script(
   OutFile "{installer_name}"
   Unicode True
 
+  ;Compression
+{compression}
+
   ;Default installation folder
   InstallDir "$LOCALAPPDATA\{project_name}"
 
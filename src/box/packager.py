@@ -13,8 +13,8 @@ import rich_click as click
 
 import box.formatters as fmt
 import box.utils as ut
-from box import BUILD_DIR_NAME, RELEASE_DIR_NAME
-from box.config import PyProjectParser
+from box import BUILD_DIR_NAME, BUILDER_COMMANDS, BUILDERS, RELEASE_DIR_NAME
+from box.config import BoxConfig
 
 PYAPP_SOURCE_URL = "https://github.com/ofek/pyapp/releases/"
 PYAPP_SOURCE_NAME = "source.tar.gz"
@@ -24,38 +24,32 @@ PYAPP_SOURCE_LATEST = f"{PYAPP_SOURCE_URL}latest/download/{PYAPP_SOURCE_NAME}"
 class PackageApp:
     """Package the project with PyApp."""
 
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, reproducible=False, progress=None):
         """Initialize the PackageApp class.
 
         :param verbose: bool, flag to enable verbose mode.
+        :param reproducible: bool, flag to create a reproducible build. Also enabled
+            if the `SOURCE_DATE_EPOCH` environmental variable is set.
+        :param progress: Callback that is called with the name of each phase
+            ("build", "pyapp_source", "cargo") and "start" or "end".
         """
         self.subp_kwargs = {}
         if not verbose:
             self.subp_kwargs["stdout"] = subprocess.DEVNULL
             self.subp_kwargs["stderr"] = subprocess.DEVNULL
+        self._verbose = verbose
 
         self._binary_name = None  # name of the binary file at the end of packaging
+        self._reproducible = reproducible
+        self._progress = progress
+
+        self.timings = {}  # duration of each phase in seconds
+        self.cache_stats = {"hits": 0, "misses": 0}  # reuse of the PyApp source
 
         # self._builder = box_config.builder
         self._dist_path = Path.cwd().joinpath("dist")
         self._pyapp_path = None
 
-        # supported builders
-        self._builders = {
-            "rye": ["rye", "build", "--out", f"{self._dist_path}", "--sdist"],
-            "hatch": ["hatch", "build", "-t", "sdist"],
-            "pdm": ["pdm", "build", "--no-wheel", "-d", f"{self._dist_path}"],
-            "build": [
-                ut.cmd_python(),
-                "-m",
-                "build",
-                "--sdist",
-                "--outdir",
-                f"{self._dist_path}",
-            ],
-            "flit": ["flit", "build", "--format", "sdist"],
-        }
-
         self._build_dir = Path.cwd().joinpath(BUILD_DIR_NAME)
         self._release_dir = Path.cwd().joinpath(RELEASE_DIR_NAME)
 
@@ -64,7 +58,7 @@ class PackageApp:
     @property
     def builders(self) -> List:
         """Return a list of supported builders."""
-        return list(self._builders.keys())
+        return list(BUILDERS)
 
     @property
     def builders_and_custom(self) -> List:
@@ -76,16 +70,31 @@ class PackageApp:
         return self._binary_name
 
     @property
-    def config(self) -> PyProjectParser:
-        """Return the project configuration."""
+    def config(self) -> BoxConfig:
+        """Return the validated project configuration, see `BoxConfig`.
+
+        :raises click.ClickException: Invalid configuration.
+        """
         if self._config is None:
-            self._config = PyProjectParser()
+            self._config = BoxConfig.from_pyproject()
         return self._config
 
+    @property
+    def sdist(self) -> Union[Path, None]:
+        """Return the source distribution of the project in the `dist` folder."""
+        if not self._dist_path.is_dir():
+            return None
+        for file in self._dist_path.iterdir():
+            if self.config.version in file.name and file.suffix == ".gz":
+                return file
+        return None
+
     @property
     def builder_command(self) -> List[str]:
         """Get the command list to run for specific builder.
 
+        The `inprocess` builder has no command, see `box.pep517.build_sdist`.
+
         :param builder: Builder to run with.
 
         :raises KeyError: Unknown builder.
@@ -96,17 +105,29 @@ class PackageApp:
             cmd = builder.split("=", 1)[1].strip("'\"")
             return cmd.split(" ")
 
-        try:
-            return self._builders[builder]
-        except KeyError as e:
-            raise KeyError(f"Unknown {builder=}") from e
+        cmd = BUILDER_COMMANDS.get(builder)
+        if cmd is None:
+            raise KeyError(f"Unknown {builder=}")
+        # finding the Python command starts a process on Windows, so only if needed
+        python = ut.cmd_python() if "{python}" in cmd else None
+        return [it.format(dist=self._dist_path, python=python) for it in cmd]
 
     def build(self):
         """Build the project with PyApp."""
         builder = self.config.builder
         fmt.info(f"Building project with {builder}...")
 
-        subprocess.run(self.builder_command, **self.subp_kwargs)
+        # builders honour `SOURCE_DATE_EPOCH` for the timestamps in the sdist
+        if (epoch := ut.source_date_epoch(self._reproducible)) is not None:
+            os.environ["SOURCE_DATE_EPOCH"] = str(epoch)
+
+        with ut.phase("build", self.timings, self._progress):
+            if builder == "inprocess":
+                from box.pep517 import build_sdist
+
+                build_sdist(Path.cwd(), self._dist_path, verbose=self._verbose)
+            else:
+                subprocess.run(self.builder_command, **self.subp_kwargs)
 
         fmt.success(f"Project built with {builder}.")
 
@@ -119,9 +140,11 @@ class PackageApp:
         fmt.info("Hold on, packaging the project with PyApp...")
         self._build_dir.mkdir(exist_ok=True)
         self._release_dir.mkdir(parents=True, exist_ok=True)
-        self._get_pyapp(pyapp_version, local_source=local_source)
-        self._set_env()
-        self._package_pyapp()
+        with ut.phase("pyapp_source", self.timings, self._progress):
+            self._get_pyapp(pyapp_version, local_source=local_source)
+        with ut.phase("cargo", self.timings, self._progress):
+            self._set_env()
+            self._package_pyapp()
 
     def _get_pyapp(
         self, pyapp_version: str = "latest", local_source: Union[Path, str] = None
@@ -142,6 +165,9 @@ class PackageApp:
         if isinstance(local_source, str):
             local_source = Path(local_source)
 
+        # `pyapp_source_url` is a mirror of the GitHub releases
+        base_url = (self.config.pyapp_source_url or PYAPP_SOURCE_URL).rstrip("/")
+
         with ut.set_dir(self._build_dir):
             if local_source:  # copy local source if provided
                 if local_source.suffix == ".gz" and local_source.is_file():
@@ -166,14 +192,15 @@ class PackageApp:
             else:  # no local source
                 if Path(local_source_destination).is_dir():
                     local_source_exists = True
+                    self.cache_stats["hits"] += 1
                     fmt.info("Using existing local pyapp source.")
                 elif not tar_name.is_file():
+                    self.cache_stats["misses"] += 1
                     if pyapp_version == "latest":
-                        pyapp_source = PYAPP_SOURCE_LATEST
+                        pyapp_source = f"{base_url}/latest/download/{PYAPP_SOURCE_NAME}"
                     else:
                         pyapp_source = (
-                            f"{PYAPP_SOURCE_URL}download/{pyapp_version}/"
-                            f"{PYAPP_SOURCE_NAME}"
+                            f"{base_url}/download/{pyapp_version}/{PYAPP_SOURCE_NAME}"
                         )
                     urllib.request.urlretrieve(pyapp_source, tar_name)
 
@@ -183,6 +210,8 @@ class PackageApp:
                             f"Check if version {pyapp_version} exists and if your "
                             f"internet connection is working."
                         )
+                else:  # downloaded in an earlier run
+                    self.cache_stats["hits"] += 1
 
             # check if pyapp source code is already extracted
             all_pyapp_folders = []
@@ -270,6 +299,9 @@ class PackageApp:
         )
         shutil.move(binary_path, self._binary_name)
 
+        if (epoch := ut.source_date_epoch(self._reproducible)) is not None:
+            os.utime(self._binary_name, (epoch, epoch))
+
     def _set_env(self):
         """Set the environment for packaging the project with PyApp."""
         # clean all variables startying with `PYAPP` from environment
@@ -278,11 +310,7 @@ class PackageApp:
                 del os.environ[var]
 
         # find the tar.gz file in dist folder with correct version number
-        dist_file = None
-        for file in self._dist_path.iterdir():
-            if self.config.version in file.name and file.suffix == ".gz":
-                dist_file = file
-                break
+        dist_file = self.sdist
 
         # get the python version or set to default
         py_version = self.config.python_version or ut.PYAPP_PYTHON_VERSIONS[-1]
@@ -299,24 +327,42 @@ class PackageApp:
         os.environ["PYAPP_PYTHON_VERSION"] = py_version
         if value := self.config.optional_dependencies:
             os.environ["PYAPP_PROJECT_FEATURES"] = value
-        optional_pyapp_vars = self.config.env_vars
-        for key, value in optional_pyapp_vars.items():
-            os.environ[key] = value
+        os.environ.update(self.config.env_vars)  # values are strings already
         if self.config.is_gui:
             os.environ["PYAPP_IS_GUI"] = "1"
 
+        if (epoch := ut.source_date_epoch(self._reproducible)) is not None:
+            self._set_env_reproducible(epoch)
+
+    def _set_env_reproducible(self, epoch: int):
+        """Set the environment for a reproducible build with cargo.
+
+        Incremental compilation is disabled and local paths are remapped,
+        such that they are not embedded in the binary.
+
+        :param epoch: Timestamp to set as `SOURCE_DATE_EPOCH`.
+        """
+        os.environ["SOURCE_DATE_EPOCH"] = str(epoch)
+        os.environ["CARGO_INCREMENTAL"] = "0"
+
+        # rustc applies the last matching remap: from least to most specific
+        remaps = [
+            f"--remap-path-prefix={Path.home()}=/home",
+            f"--remap-path-prefix={Path.cwd()}=/project",
+        ]
+        if self._pyapp_path is not None:
+            remaps.append(f"--remap-path-prefix={self._pyapp_path}=/pyapp")
+        rustflags = os.environ.get("RUSTFLAGS", "").split()
+        os.environ["RUSTFLAGS"] = " ".join(
+            rustflags + [it for it in remaps if it not in rustflags]
+        )
+
     # STATIC METHODS #
     @staticmethod
     def check_requirements():
         """Check if all requirements are installed."""
-        # check for cargo
-        try:
-            subprocess.run(
-                ["cargo", "--version"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-        except FileNotFoundError:
+        # look up cargo on the `PATH` instead of starting it for `cargo --version`
+        if shutil.which("cargo") is None:
             raise click.ClickException(
                 "Error: cargo not found. Please install cargo and try again."
             )
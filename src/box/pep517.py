@@ -0,0 +1,208 @@
+# Build the sdist of a project in-process by calling its PEP 517 backend directly.
+
+import hashlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Iterable, List
+
+import rich_click as click
+
+import box.utils as ut
+from box.config import load_pyproject
+
+# used if `pyproject.toml` has no `[build-system]` table, see PEP 517
+DEFAULT_BUILD_SYSTEM = {
+    "requires": ["setuptools>=40.8.0"],
+    "build-backend": "setuptools.build_meta:__legacy__",
+}
+
+# bump to invalidate all cached build environments
+BUILD_ENV_VERSION = "1"
+
+
+def build_sdist(project_dir: Path, dist_dir: Path, verbose: bool = False) -> Path:
+    """Build the sdist of a project with its build backend in this process.
+
+    The requirements of `build-system.requires` are installed once into a build
+    environment in the box cache folder, which is re-used by all projects with the
+    same requirements. The backend is imported from there and its `build_sdist` hook
+    is called directly, such that no builder and no interpreter is started. Modules
+    that the backend imports are removed afterwards, such that the next build
+    imports them again, e.g., from another build environment.
+
+    Modules that are already imported in this process, e.g., `packaging` or
+    `tomli`, shadow the versions in the build environment. Use another builder if
+    the backend requires versions of these that differ from the ones box uses.
+
+    :param project_dir: Folder of the project with the `pyproject.toml` file.
+    :param dist_dir: Folder to write the sdist to.
+    :param verbose: Show the output of the backend and of installing requirements.
+
+    :return: Path to the sdist.
+
+    :raises click.ClickException: Requirements cannot be installed or backend failed.
+    """
+    project_dir = Path(project_dir).absolute()
+    dist_dir = Path(dist_dir).absolute()
+    build_system = load_pyproject(project_dir.joinpath("pyproject.toml")).get(
+        "build-system", DEFAULT_BUILD_SYSTEM
+    )
+    requires = list(build_system.get("requires", DEFAULT_BUILD_SYSTEM["requires"]))
+    backend_name = build_system.get(
+        "build-backend", DEFAULT_BUILD_SYSTEM["build-backend"]
+    )
+    backend_path = [
+        project_dir.joinpath(it) for it in build_system.get("backend-path", [])
+    ]
+
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    with ut.set_dir(project_dir), _output(verbose):
+        env = build_env(requires, verbose=verbose)
+        with _imports_from(backend_path + [env]):
+            hook = getattr(
+                _load_backend(backend_name), "get_requires_for_build_sdist", None
+            )
+            try:
+                extra = list(hook({})) if hook is not None else []
+            except Exception as e:
+                raise click.ClickException(
+                    f"Build backend `{backend_name}` failed to get the requirements "
+                    f"for the sdist: {e}"
+                ) from e
+        if extra:
+            env = build_env(requires + extra, verbose=verbose)
+
+        with _imports_from(backend_path + [env]):
+            backend = _load_backend(backend_name)
+            try:
+                name = backend.build_sdist(str(dist_dir), {})
+            except Exception as e:
+                raise click.ClickException(
+                    f"Build backend `{backend_name}` failed to build the sdist: {e}"
+                ) from e
+    return dist_dir.joinpath(name)
+
+
+def build_env(requires: Iterable[str], verbose: bool = False) -> Path:
+    """Return a folder with the requirements installed, creating it only once.
+
+    Build environments live in the `build-envs` folder of the box cache folder and
+    are keyed by the requirements and the Python version. They are created with
+    `pip install --target`, or `uv pip install --target` if pip is not available,
+    into a temporary folder that is then renamed, such that concurrent builds never
+    see a partial environment.
+
+    :param requires: Requirements of the build backend, e.g., `["hatchling"]`.
+    :param verbose: Show the output of `pip`.
+
+    :raises click.ClickException: Requirements cannot be installed.
+    """
+    requires = sorted(set(requires))
+    key = json.dumps(
+        {
+            "requires": requires,
+            "python": sys.implementation.cache_tag,
+            "version": BUILD_ENV_VERSION,
+        },
+        sort_keys=True,
+    )
+    env = ut.cache_dir().joinpath(
+        "build-envs", hashlib.sha256(key.encode()).hexdigest()[:16]
+    )
+    if env.is_dir():
+        return env
+
+    tmp_env = env.with_name(f"{env.name}.{os.getpid()}.tmp")
+    tmp_env.mkdir(parents=True)
+    try:
+        if requires:
+            _pip_install(requires, tmp_env, verbose)
+        try:
+            os.rename(tmp_env, env)
+        except OSError:  # created by a concurrent build in the meantime
+            if not env.is_dir():
+                raise
+    finally:
+        shutil.rmtree(tmp_env, ignore_errors=True)
+    return env
+
+
+def _pip_install(requires: List[str], target: Path, verbose: bool) -> None:
+    """Install requirements into a target folder with `pip`.
+
+    Environments created by `uv` have no pip, so `uv pip` is used instead if found.
+    """
+    if importlib.util.find_spec("pip") is not None:
+        tool = "pip"
+        cmd = [sys.executable, "-m", "pip", "install", "--target", str(target)]
+        cmd += ["--disable-pip-version-check", "--no-warn-script-location"]
+    elif uv := shutil.which("uv"):
+        tool = "uv pip"
+        cmd = [uv, "pip", "install", "--target", str(target)]
+        cmd += ["--python", sys.executable]
+    else:
+        raise click.ClickException(
+            "Cannot install the build requirements: neither pip nor uv is available. "
+            "Install pip into the environment of box, install uv, "
+            "or use another builder."
+        )
+    if not verbose:
+        cmd.append("--quiet")
+    result = subprocess.run(cmd + requires, capture_output=not verbose, text=True)
+    if result.returncode != 0:
+        raise click.ClickException(
+            f"Cannot install the build requirements {', '.join(requires)} with {tool}."
+            f"\n{result.stderr or ''}".rstrip()
+        )
+
+
+def _load_backend(name: str):
+    """Import a build backend given as `module:object`, see PEP 517."""
+    module_name, _, obj_path = name.partition(":")
+    try:
+        backend = importlib.import_module(module_name)
+    except ImportError as e:
+        raise click.ClickException(f"Cannot import build backend `{name}`: {e}") from e
+    for attr in filter(None, obj_path.split(".")):
+        try:
+            backend = getattr(backend, attr)
+        except AttributeError as e:
+            raise click.ClickException(
+                f"Cannot find build backend `{name}`: {e}"
+            ) from e
+    return backend
+
+
+@contextmanager
+def _imports_from(paths: List[Path]) -> None:
+    """Import from the given folders first and forget all new imports on exit."""
+    path, meta_path, modules = list(sys.path), list(sys.meta_path), dict(sys.modules)
+    sys.path[:0] = [str(it) for it in paths]
+    importlib.invalidate_caches()
+    try:
+        yield
+    finally:
+        sys.path[:] = path
+        sys.meta_path[:] = meta_path  # e.g., the `distutils` shim of setuptools
+        for name in set(sys.modules) - set(modules):
+            del sys.modules[name]
+        sys.modules.update(modules)
+
+
+@contextmanager
+def _output(verbose: bool) -> None:
+    """Hide the output of the backend unless in verbose mode."""
+    if verbose:
+        yield
+        return
+    log = io.StringIO()
+    with redirect_stdout(log), redirect_stderr(log):
+        yield
@@ -1,13 +1,17 @@
 # Utility and helper functions
 
 import os
+import shutil
 import subprocess
+import sys
+import time
 from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Dict, Union
 
 from rich_click import ClickException
 
-from box.config import PyProjectParser
+from box.config import PyProjectParser, current_pyproject, resolve_config
 
 # available app entry types that are used in box
 PYAPP_APP_ENTRY_TYPES = ["spec", "module", "script", "notebook"]
@@ -25,6 +29,32 @@ PYAPP_PYTHON_VERSIONS = (
     "3.12",
 )
 
+# ioctl request to clone a file on Linux (btrfs, xfs, ...), see `ioctl_ficlone(2)`
+FICLONE = 0x40049409
+
+# timestamp for reproducible builds if `SOURCE_DATE_EPOCH` is not set:
+# 1980-01-01 00:00:00 UTC, the earliest date that can be stored in a zip file.
+REPRODUCIBLE_EPOCH = 315532800
+
+
+def cache_dir() -> Path:
+    """Return the user cache folder of box.
+
+    The folder can be set with `cache_dir` in the user configuration file, the
+    `[tool.box]` table of the project in the current folder, or the `BOX_CACHE_DIR`
+    environment variable, see `box.config.resolve_config`. Otherwise, the
+    platform's user cache folder is used. The folder is not created.
+    """
+    if configured := resolve_config(current_pyproject())["cache_dir"][0]:
+        return Path(configured).expanduser()
+    if is_windows():
+        base = os.environ.get("LOCALAPPDATA") or Path.home().joinpath("AppData/Local")
+        return Path(base).joinpath("box", "Cache")
+    if sys.platform == "darwin":
+        return Path.home().joinpath("Library", "Caches", "box")
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home().joinpath(".cache")
+    return Path(base).joinpath("box")
+
 
 def check_boxproject() -> None:
     """Check if the box project is already initialized."""
@@ -58,6 +88,90 @@ def cmd_python() -> str:
     return "python"
 
 
+def source_date_epoch(reproducible: bool = False) -> Union[int, None]:
+    """Get the timestamp that should be used for all files in reproducible builds.
+
+    The `SOURCE_DATE_EPOCH` environmental variable is always honoured.
+    If it is not set, `REPRODUCIBLE_EPOCH` is returned in reproducible mode.
+
+    :param reproducible: Flag if reproducible mode was requested.
+
+    :return: Timestamp, or `None` if no reproducible build is requested.
+
+    :raises ClickException: `SOURCE_DATE_EPOCH` is not an integer.
+    """
+    if (value := os.environ.get("SOURCE_DATE_EPOCH")) is not None:
+        try:
+            return int(value)
+        except ValueError as e:
+            raise ClickException(
+                f"SOURCE_DATE_EPOCH must be an integer timestamp, got {value}."
+            ) from e
+    if reproducible:
+        return REPRODUCIBLE_EPOCH
+    return None
+
+
+def link_or_copy(src: Path, dst: Path) -> str:
+    """Place a file at a new location without copying its data if possible.
+
+    The file is hardlinked if source and destination are on the same file system.
+    Otherwise, a reflink (copy-on-write clone) is tried, which is supported, e.g.,
+    by btrfs and xfs on Linux and by APFS on macOS. If both fail, the file is copied.
+    Note that a hardlink shares its data with the source: do not modify the
+    destination in place.
+
+    :param src: Path to the source file.
+    :param dst: Path to the destination file, must not exist.
+
+    :return: Method that was used: "hardlink", "reflink", or "copy".
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+
+    if _reflink(src, dst):
+        shutil.copymode(src, dst)
+        return "reflink"
+
+    shutil.copy(src, dst)
+    return "copy"
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Try to create a copy-on-write clone of a file.
+
+    :param src: Path to the source file.
+    :param dst: Path to the destination file, must not exist.
+
+    :return: True if the clone was created, False otherwise.
+    """
+    if sys.platform == "darwin":
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            clonefile = libc.clonefile
+        except AttributeError:
+            return False
+        return clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            try:
+                fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+                return True
+            except OSError:
+                pass
+        os.remove(dst)
+
+    return False
+
+
 def is_windows() -> bool:
     """Check if the operating system is Windows.
 
@@ -78,3 +192,22 @@ def set_dir(my_dir: Path) -> None:
         yield
     finally:
         os.chdir(origin)
+
+
+@contextmanager
+def phase(
+    name: str, timings: Dict[str, float], progress: Union[Callable, None] = None
+) -> None:
+    """Context manager to time a phase and report its start and end.
+
+    :param name: Name of the phase, e.g., "build".
+    :param timings: Dictionary in which the duration (in seconds) is stored.
+    :param progress: Callback that is called with the name and "start" or "end".
+    """
+    if progress is not None:
+        progress(name, "start")
+    tic = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - tic
+    if progress is not None:
+        progress(name, "end")
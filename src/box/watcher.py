@@ -0,0 +1,343 @@
+# Watch the project and package it again when files of the source distribution change.
+
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import os
+import select
+import struct
+import tarfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Set, Union
+
+import rich_click as click
+
+import box.checksums as cs
+import box.formatters as fmt
+from box.packager import PackageApp
+
+# seconds without further changes before the project is packaged again
+WATCH_DEBOUNCE = 0.3
+
+# seconds between two scans of the polling watcher
+WATCH_POLL_INTERVAL = 0.5
+
+# new files with these names never trigger a rebuild
+WATCH_IGNORE = (".*", "*~", "*.pyc", "*.pyo", "*.swp", "*.tmp", "__pycache__")
+
+# inotify events that are watched, see `inotify(7)`
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """Watch folders with `inotify` on Linux, called with `ctypes`."""
+
+    def __init__(self, folders: Iterable[Path]):
+        """Start watching the given folders, not recursively.
+
+        :param folders: Folders to watch.
+
+        :raises OSError: `inotify` is not available, e.g., not on Linux.
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+            self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except AttributeError as e:
+            raise OSError("inotify is not available") from e
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "Cannot initialize inotify")
+
+        self._folders = {}
+        try:
+            self.watch(folders)
+        except OSError:
+            self.close()
+            raise
+
+    def watch(self, folders: Iterable[Path]) -> None:
+        """Watch further folders, folders that are watched already are skipped.
+
+        :param folders: Folders to watch.
+
+        :raises OSError: A folder cannot be watched.
+        """
+        mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        for folder in set(map(Path, folders)) - set(self._folders.values()):
+            wd = self._add_watch(self._fd, os.fsencode(folder), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Cannot watch {folder}")
+            self._folders[wd] = folder
+
+    def changes(self, timeout: Union[float, None] = None) -> Set[Path]:
+        """Wait for changes and return the paths that changed.
+
+        :param timeout: Seconds to wait at most, wait forever if `None`.
+
+        :return: Changed paths, empty if there was no change within the timeout.
+        """
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if wd in self._folders and name:
+                changed.add(self._folders[wd].joinpath(os.fsdecode(name)))
+        return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watch folders by scanning them regularly, if `inotify` is not available."""
+
+    def __init__(self, folders: Iterable[Path]):
+        """Start watching the given folders, not recursively.
+
+        :param folders: Folders to watch.
+        """
+        self._folders = []
+        self._state = {}
+        self.watch(folders)
+
+    def watch(self, folders: Iterable[Path]) -> None:
+        """Watch further folders, folders that are watched already are skipped.
+
+        :param folders: Folders to watch.
+        """
+        new = set(map(Path, folders)) - set(self._folders)
+        self._folders += sorted(new)
+        self._state.update(self._scan(new))
+
+    def changes(self, timeout: Union[float, None] = None) -> Set[Path]:
+        """Wait for changes and return the paths that changed.
+
+        :param timeout: Seconds to wait at most, wait forever if `None`.
+
+        :return: Changed paths, empty if there was no change within the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = WATCH_POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.monotonic(), 0))
+            time.sleep(wait)
+
+            state = self._scan(self._folders)
+            changed = {
+                path
+                for path in state.keys() | self._state.keys()
+                if state.get(path) != self._state.get(path)
+            }
+            self._state = state
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+
+    @staticmethod
+    def _scan(folders: Iterable[Path]) -> Dict[Path, tuple]:
+        """Return the modification time and size of all entries in the folders."""
+        state = {}
+        for folder in folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        stat = entry.stat(follow_symlinks=False)
+                        state[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                pass
+        return state
+
+
+def make_watcher(folders: Iterable[Path]) -> Union[InotifyWatcher, PollingWatcher]:
+    """Return an `inotify` watcher if available, otherwise a polling watcher.
+
+    :param folders: Folders to watch, not recursively.
+    """
+    folders = list(folders)
+    try:
+        return InotifyWatcher(folders)
+    except (OSError, TypeError):  # `TypeError`: no C library found
+        return PollingWatcher(folders)
+
+
+class ProjectWatcher:
+    """Package the project again whenever files change that end up in the sdist.
+
+    The files to watch are taken from the source distribution that was built last.
+    Only stages that are invalidated run again: Files that were saved without
+    changing their content are ignored, and `cargo` only runs if the content of the
+    source distribution changed. The PyApp source is downloaded and extracted once.
+    """
+
+    def __init__(self, verbose=False, reproducible=False, pyapp_version="latest"):
+        """Initialize the project watcher.
+
+        :param verbose: bool, flag to enable verbose mode.
+        :param reproducible: bool, flag to create reproducible builds.
+        :param pyapp_version: PyApp version to download if not already available.
+        """
+        self._verbose = verbose
+        self._reproducible = reproducible
+        self._pyapp_version = pyapp_version
+
+        self._root = Path.cwd()
+        self._files = {}  # relative paths of the files in the sdist: digest
+        self._sdist_digest = None
+
+    def run(self) -> None:
+        """Watch the project and package it on changes until interrupted.
+
+        The same watcher stays open while the project is packaged again, such that
+        files that are saved during a rebuild trigger the next one.
+        """
+        self._snapshot(PackageApp().sdist)
+        watcher = make_watcher(self._folders())
+        try:
+            fmt.info("Watching for changes, press Ctrl+C to stop.")
+            while True:
+                changed = self._wait_for_changes(watcher)
+                fmt.info(f"{len(changed)} file(s) changed, packaging again...")
+                try:
+                    self._rebuild(changed)
+                except click.ClickException as e:
+                    e.show()
+                watcher.watch(self._folders())
+                fmt.info("Watching for changes, press Ctrl+C to stop.")
+        finally:
+            watcher.close()
+
+    def relevant(self, paths: Iterable[Path]) -> Set[Path]:
+        """Return the paths that invalidate the source distribution.
+
+        These are files of the sdist whose content changed or that were deleted,
+        and new files in the source folders (new Python files only in the
+        project's root folder), unless they match `WATCH_IGNORE`.
+
+        :param paths: Paths that changed.
+        """
+        relevant = set()
+        for path in paths:
+            rel = self._relative(path)
+            if rel in self._files:
+                if _digest_file(path) != self._files[rel]:
+                    relevant.add(path)
+            elif not any(fnmatch.fnmatch(path.name, it) for it in WATCH_IGNORE):
+                in_root = path.parent == self._root
+                if not in_root or path.suffix == ".py":
+                    relevant.add(path)
+        return relevant
+
+    def _folders(self) -> Set[Path]:
+        """Return the folders to watch: the root and all folders of the sdist files."""
+        return {self._root.joinpath(it).parent for it in self._files} | {self._root}
+
+    def _relative(self, path: Path) -> str:
+        """Return the path relative to the project root, as in the sdist."""
+        return Path(os.path.relpath(path, self._root)).as_posix()
+
+    def _wait_for_changes(
+        self, watcher: Union[InotifyWatcher, PollingWatcher]
+    ) -> Set[Path]:
+        """Block until relevant files changed and no more changes came in.
+
+        :param watcher: Watcher of the project folders, see `_folders`.
+        """
+        changed = set()
+        while not changed:
+            changed = watcher.changes()
+            while more := watcher.changes(WATCH_DEBOUNCE):
+                changed |= more
+            changed = self.relevant(changed)
+        return changed
+
+    def _rebuild(self, changed: Iterable[Path] = ()) -> None:
+        """Build the sdist again and run cargo only if its content changed.
+
+        The files are digested before the build, such that files that are saved
+        while building are compared to the content that the build saw.
+
+        :param changed: Paths that changed since the last build.
+        """
+        paths = {self._root.joinpath(it) for it in self._files} | set(changed)
+        digests = {self._relative(it): _digest_file(it) for it in paths}
+
+        packager = PackageApp(verbose=self._verbose, reproducible=self._reproducible)
+        packager.build()
+        sdist = packager.sdist
+        if sdist is not None and _digest_sdist(sdist) == self._sdist_digest:
+            fmt.info("Content of the source distribution did not change.")
+        else:
+            packager.package(self._pyapp_version)
+            fmt.success(f"Project packaged again: {packager.binary_name.name}")
+        self._snapshot(sdist, digests)
+
+    def _snapshot(
+        self, sdist: Union[Path, None], digests: Dict[str, Union[str, None]] = None
+    ) -> None:
+        """Remember the files in the sdist and their content.
+
+        :param sdist: Path to the source distribution.
+        :param digests: Digests of the files taken before the sdist was built, by
+            their relative path. Files that are not listed are digested now.
+        """
+        if sdist is None:
+            raise click.ClickException(
+                "No source distribution found in the `dist` folder to watch."
+            )
+        with tarfile.open(sdist, "r:gz") as tar:
+            names = [it.name for it in tar.getmembers() if it.isfile()]
+        digests = digests or {}
+        self._files = {}
+        for name in names:
+            rel = name.split("/", 1)[-1]  # strip the `name-version/` prefix
+            if rel in digests:
+                self._files[rel] = digests[rel]
+            elif (file := self._root.joinpath(rel)).is_file():
+                self._files[rel] = _digest_file(file)
+        self._sdist_digest = _digest_sdist(sdist)
+
+
+def _digest_file(file: Path) -> Union[str, None]:
+    """Return the SHA-256 digest of a file or `None` if it does not exist."""
+    try:
+        return cs.hash_file(file, ("sha256",))["sha256"]
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def _digest_sdist(sdist: Path) -> str:
+    """Return a digest of the names and contents of all files in an sdist.
+
+    Timestamps and the order of the members are ignored, such that the same
+    sources always give the same digest.
+    """
+    hasher = hashlib.sha256()
+    with tarfile.open(sdist, "r:gz") as tar:
+        members = [it for it in tar.getmembers() if it.isfile()]
+        for member in sorted(members, key=lambda it: it.name):
+            hasher.update(member.name.encode() + b"\0")
+            hasher.update(tar.extractfile(member).read())
+    return hasher.hexdigest()
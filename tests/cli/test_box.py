@@ -1,11 +1,16 @@
 # General tests for CLI
 
 import importlib.metadata
+import subprocess
+import sys
 
 from click.testing import CliRunner
 
 from box.cli import cli
 
+# box modules that `box --version` may import, all others are imported lazily
+STARTUP_MODULES = {"box", "box.cli", "box.config", "box.formatters", "box.utils"}
+
 
 def test_version():
     runner = CliRunner()
@@ -16,3 +21,26 @@ def test_version():
         assert result.output.rstrip().endswith(
             importlib.metadata.version("box_packager")
         )
+
+
+def test_version_imports():
+    """Keep `box --version` fast: subsystems must not be imported at startup."""
+    code = (
+        "import sys\n"
+        "from box.cli import cli\n"
+        "try:\n"
+        "    cli(['--version'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(' '.join(sorted(sys.modules)))"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert "version" in result.stdout
+    modules = set(result.stdout.splitlines()[-1].split())
+    box_modules = {it for it in modules if it.split(".")[0] == "box"}
+    assert box_modules <= STARTUP_MODULES
+    assert "tomlkit" not in modules
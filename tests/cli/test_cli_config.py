@@ -0,0 +1,33 @@
+# Test showing the layered configuration with the CLI
+
+from click.testing import CliRunner
+
+from box.cli import cli
+
+
+def test_config_show_origin(rye_project, monkeypatch):
+    """Show the resolved values and where they come from."""
+    user_file = rye_project.joinpath("user.toml")
+    user_file.write_text("keep_versions = 5\n")
+    monkeypatch.setenv("BOX_CONFIG_FILE", str(user_file))
+    monkeypatch.setenv("BOX_INSTALLER_PREWARM", "1")
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["config", "--show-origin"])
+
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert 'default\tnsis_compressor = "lzma"' in lines
+    assert f"user:{user_file}\tkeep_versions = 5" in lines
+    assert 'pyproject.toml\tbuilder = "rye"' in lines
+    assert "env:BOX_INSTALLER_PREWARM\tinstaller_prewarm = true" in lines
+    assert not any(it.endswith("cache_dir = null") for it in lines)
+
+
+def test_config_outside_project(tmp_path_chdir):
+    """Show the host-wide settings outside of a project."""
+    runner = CliRunner()
+    result = runner.invoke(cli, ["config"])
+
+    assert result.exit_code == 0
+    assert "keep_versions = 3" in result.output.splitlines()
@@ -1,8 +1,12 @@
 # Tests for setting environment variables with `box env ...`
 
+import subprocess
+import sys
+
 import pytest
 from click.testing import CliRunner
 
+from box import config
 from box.cli import cli
 
 
@@ -36,6 +40,34 @@ def test_env_set(rye_project, my_vars):
     assert "type string" in result.output
 
 
+def test_env_get_without_tomlkit(rye_project):
+    """Read-only commands parse `pyproject.toml` without importing `tomlkit`."""
+    code = (
+        "import sys; from click.testing import CliRunner; from box.cli import cli\n"
+        "result = CliRunner().invoke(cli, ['env', '--list'])\n"
+        "assert result.exit_code == 0, result.output\n"
+        "print('tomlkit' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_env_set_multiple_one_write(rye_project, mocker):
+    """Set several variables at once with a single write of `pyproject.toml`."""
+    dump_spy = mocker.spy(config, "_dump_pyproject")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["env", "--set", "A=a", "--set-int", "B=2", "--set-bool", "C=1"]
+    )
+
+    assert result.exit_code == 0
+    assert dump_spy.call_count == 1
+    assert config.PyProjectParser().env_vars == {"A": "a", "B": 2, "C": True}
+
+
 @pytest.mark.parametrize("key_val", ["key=value=something", "only_a_key"])
 def test_env_set_key_value_invalid(rye_project, key_val):
     """Ensure an error is raised if key-value pair to be set is invalid."""
@@ -185,3 +217,87 @@ def test_env_unset(rye_project):
     assert "Warning" in result_2.output
 
     assert "Warning" in result_3.output
+
+
+@pytest.mark.parametrize(
+    "fname_content",
+    [
+        (
+            "vars.env",
+            "# comment\nexport A=\"a b\"\nB=42\nC=True\nD=0x1\nE='7'\n",
+        ),
+        ("vars.json", '{"A": "a b", "B": 42, "C": true, "D": "0x1", "E": "7"}'),
+        ("vars.toml", 'A = "a b"\nB = 42\nC = true\nD = "0x1"\nE = "7"\n'),
+    ],
+)
+def test_env_import(rye_project, mocker, fname_content):
+    """Import typed variables from a file with a single write."""
+    fname, content = fname_content
+    rye_project.joinpath(fname).write_text(content)
+    dump_spy = mocker.spy(config, "_dump_pyproject")
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["env", "--import", fname])
+
+    assert result.exit_code == 0
+    assert "Imported 5 variables" in result.output
+    assert dump_spy.call_count == 1
+    assert config.PyProjectParser().env_vars == {
+        "A": "a b",
+        "B": 42,
+        "C": True,
+        "D": "0x1",
+        "E": "7",
+    }
+
+
+@pytest.mark.parametrize(
+    "fname_content_msg",
+    [
+        ("vars.env", "A=1\nINVALID\n", "line 2"),
+        ("vars.json", '{"A": [1, 2]}', "must be a string, integer, or boolean"),
+        ("vars.json", '["A"]', "must contain an object"),
+        ("vars.toml", "A = ", "Cannot read"),
+        ("vars.yaml", "A: 1", "Unsupported file format .yaml"),
+    ],
+)
+def test_env_import_invalid(rye_project, fname_content_msg):
+    """Do not write anything if the file to import is invalid."""
+    fname, content, msg = fname_content_msg
+    rye_project.joinpath(fname).write_text(content)
+    pyproject = rye_project.joinpath("pyproject.toml").read_text()
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["env", "--import", fname])
+
+    assert result.exit_code != 0
+    assert msg in result.output
+    assert rye_project.joinpath("pyproject.toml").read_text() == pyproject
+
+
+@pytest.mark.parametrize("fname", ["vars.env", ".env", "vars.json", "vars.toml"])
+def test_env_export_import(rye_project, fname):
+    """Export all variables and import them again with the same types."""
+    env_vars = {"A": 'say "hi"', "B": 3, "C": False, "D": "42"}
+    config.pyproject_writer("env-vars", env_vars)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["env", "--export", fname])
+    assert result.exit_code == 0
+    assert "Exported 4 variables" in result.output
+
+    config.unset_env_variable("A")
+    result = runner.invoke(cli, ["env", "--import", fname])
+    assert result.exit_code == 0
+    assert config.PyProjectParser().env_vars == env_vars
+
+
+def test_env_export_stdout(rye_project):
+    """Print the variables in `.env` format."""
+    config.pyproject_writer("env-vars", {"A": "a", "B": True})
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["env", "--export", "-"])
+
+    assert result.exit_code == 0
+    assert result.output == 'A="a"\nB=true\n'
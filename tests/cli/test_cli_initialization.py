@@ -4,6 +4,7 @@ import pytest
 from click.testing import CliRunner
 
 import box.utils as ut
+from box import config
 from box.cli import cli
 from box.config import PyProjectParser
 from box.packager import PackageApp
@@ -171,11 +172,23 @@ def test_initialize_again_custom_builder(rye_project_no_box):
     assert builder_1 == builder_2
 
 
-def test_initialize_project_quiet(rye_project_no_box):
-    """Initialize a new project quietly."""
+def test_initialize_uv_builder(rye_project_no_box):
+    """Choose `uv` as the builder in the interactive initialization."""
+    runner = CliRunner()
+    result = runner.invoke(cli, ["init"], input="uv\n\n\nsome_entry")
+
+    assert result.exit_code == 0
+    assert PyProjectParser().builder == "uv"
+
+
+def test_initialize_project_quiet(rye_project_no_box, mocker):
+    """Initialize a new project quietly, writing `pyproject.toml` only once."""
+    dump_spy = mocker.spy(config, "_dump_pyproject")
+
     runner = CliRunner()
     result = runner.invoke(cli, ["init", "-q"])
     assert result.exit_code == 0
+    assert dump_spy.call_count == 1
     assert "Project initialized." not in result.output
 
     # assert it's now a box project
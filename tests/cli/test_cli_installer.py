@@ -1,8 +1,17 @@
 ### CLI tests for the installer
 
+import gzip
+import hashlib
+import io
+import json
 import os
 import stat
+import struct
+import subprocess
 import sys
+import tarfile
+import time
+import zipfile
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -114,8 +123,11 @@ def test_installer_gui_linux(rye_project):
     assert file_content.find(icon_file_content, icon_start) != -1
     assert os.stat(installer_file).st_mode & stat.S_IXUSR != 0
 
-    # assure we only have one `rm -rf` in the install file (for pyapp folder)
-    assert file_content.count("rm -rf") == 1
+    # assure we only have the expected `rm -rf`: pruning versions, and the versions
+    # and pyapp folders in the uninstaller
+    assert file_content.count("rm -rf") == 3
+    assert 'rm -rf "${1:?}/versions/$OLD_VERSION"' in file_content
+    assert 'echo "rm -rf \\"$INSTALL_DIR/versions\\""' in file_content
 
     assert installer_file.name in result.output
 
@@ -324,3 +336,335 @@ def test_not_implemented_installers(rye_project, mocker):
     assert result.exit_code == 0
     assert "currently not supported" in result.output
     assert platform in result.output
+
+
+@pytest.mark.skipif("sys.platform == 'win32'", reason="Not supported on Windows")
+def test_installer_formats(rye_project):
+    """Create multiple installer formats in parallel."""
+    conf = config.PyProjectParser()
+    target_file_content = setup_mock_target_binary(rye_project, conf.name)
+    release_path = rye_project.joinpath("target/release")
+    base_name = f"{conf.name}-v0.1.0-linux"
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "sh,tar,zip,bin"])
+
+    assert result.exit_code == 0
+
+    sh_file = release_path.joinpath(f"{base_name}.sh")
+    assert target_file_content in sh_file.read_text()
+
+    with tarfile.open(release_path.joinpath(f"{base_name}.tar.gz")) as tar:
+        member = tar.getmember(f"{conf.name}-v0.1.0/{conf.name}")
+        assert member.mode == 0o755
+        assert tar.extractfile(member).read().decode() == target_file_content
+
+    with zipfile.ZipFile(release_path.joinpath(f"{base_name}.zip")) as zf:
+        assert zf.read(f"{conf.name}-v0.1.0/{conf.name}").decode() == (
+            target_file_content
+        )
+
+    bin_file = release_path.joinpath(base_name)
+    assert bin_file.read_text() == target_file_content
+    assert os.stat(bin_file).st_mode & stat.S_IXUSR != 0
+    checksum = hashlib.sha256(target_file_content.encode()).hexdigest()
+    assert release_path.joinpath(f"{base_name}.sha256").read_text() == (
+        f"{checksum}  {base_name}\n"
+    )
+
+    for fmt_name in ["sh", "tar", "zip", "bin"]:
+        assert f"({fmt_name}) in" in result.output
+
+
+def test_installer_formats_duplicates(rye_project):
+    """Create formats that are requested multiple times only once."""
+    conf = config.PyProjectParser()
+    target_file_content = setup_mock_target_binary(rye_project, conf.name)
+    release_path = rye_project.joinpath("target/release")
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "tar,bin,tar"])
+
+    assert result.exit_code == 0
+    assert result.output.count("(tar) in") == 1
+    tar_file = release_path.joinpath(f"{conf.name}-v0.1.0-linux.tar.gz")
+    with tarfile.open(tar_file) as tar:
+        member = tar.getmember(f"{conf.name}-v0.1.0/{conf.name}")
+        assert tar.extractfile(member).read().decode() == target_file_content
+
+
+def test_installer_formats_unknown(rye_project):
+    """Raise an error if an unknown installer format is requested."""
+    conf = config.PyProjectParser()
+    _ = setup_mock_target_binary(rye_project, conf.name)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "sh,exe"])
+
+    assert result.exit_code != 0
+    assert "Unknown installer format(s): exe" in result.output
+
+
+@pytest.mark.parametrize("gui", [True, False])
+def test_installer_formats_deb(rye_project, gui):
+    """Create a `.deb` package and check the `ar` members and the payload."""
+    conf = config.PyProjectParser()
+    target_file_content = setup_mock_target_binary(rye_project, conf.name)
+    if gui:
+        _ = setup_mock_icon(rye_project)
+        config.pyproject_writer("is_gui", True)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "deb"])
+
+    assert result.exit_code == 0
+
+    deb_file = next(rye_project.joinpath("target/release").glob("*.deb"))
+    members = {}
+    with open(deb_file, "rb") as f:
+        assert f.read(8) == b"!<arch>\n"
+        while header := f.read(60):
+            size = int(header[48:58])
+            members[header[:16].decode().strip()] = f.read(size)
+            f.read(size % 2)
+
+    assert list(members.keys()) == ["debian-binary", "control.tar.gz", "data.tar.gz"]
+    assert members["debian-binary"] == b"2.0\n"
+
+    with tarfile.open(fileobj=io.BytesIO(members["control.tar.gz"])) as tar:
+        control = tar.extractfile("./control").read().decode()
+    assert f"Package: {conf.name}\n" in control
+    assert "Version: 0.1.0\n" in control
+
+    with tarfile.open(fileobj=io.BytesIO(members["data.tar.gz"])) as tar:
+        binary = tar.extractfile(f"./usr/bin/{conf.name}").read().decode()
+        names = tar.getnames()
+    assert binary == target_file_content
+    assert (f"./usr/share/applications/{conf.name}.desktop" in names) == gui
+
+
+def test_installer_formats_rpm(rye_project):
+    """Create an `.rpm` package and check the signature and the payload."""
+    conf = config.PyProjectParser()
+    target_file_content = setup_mock_target_binary(rye_project, conf.name)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "rpm"])
+
+    assert result.exit_code == 0
+
+    rpm_file = next(rye_project.joinpath("target/release").glob("*.rpm"))
+    data = rpm_file.read_bytes()
+    assert data[:4] == b"\xed\xab\xee\xdb"
+
+    def read_header(offset):
+        """Return the tags (offset, count) dictionary, store and end of header."""
+        assert data[offset : offset + 4] == b"\x8e\xad\xe8\x01"
+        nindex, hsize = struct.unpack(">ii", data[offset + 8 : offset + 16])
+        store = offset + 16 + nindex * 16
+        tags = {}
+        for it in range(nindex):
+            entry = data[offset + 16 + it * 16 : offset + 32 + it * 16]
+            tag, _, tag_offset, count = struct.unpack(">iiii", entry)
+            tags[tag] = (store + tag_offset, count)
+        return tags, store + hsize
+
+    sig_tags, sig_end = read_header(96)
+    header_start = sig_end + (-sig_end % 8)
+    header_tags, payload_start = read_header(header_start)
+
+    size_offset, _ = sig_tags[1000]
+    assert struct.unpack(">I", data[size_offset : size_offset + 4])[0] == (
+        len(data) - header_start
+    )
+    md5_offset, md5_count = sig_tags[1004]
+    assert data[md5_offset : md5_offset + md5_count] == (
+        hashlib.md5(data[header_start:]).digest()
+    )
+
+    name_offset, _ = header_tags[1000]
+    assert data[name_offset:].startswith(f"{conf.name}\x00".encode())
+
+    payload = gzip.decompress(data[payload_start:])
+    assert payload.startswith(b"070701")
+    assert f"./usr/bin/{conf.name}".encode() in payload
+    assert target_file_content.encode() in payload
+    assert payload.rstrip(b"\x00").endswith(b"TRAILER!!!")
+
+
+def test_installer_formats_reproducible(rye_project, monkeypatch):
+    """Create identical installers in two runs if `SOURCE_DATE_EPOCH` is set."""
+    epoch = 1700000000
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", str(epoch))
+    conf = config.PyProjectParser()
+    _ = setup_mock_target_binary(rye_project, conf.name)
+    formats = ["tar", "zip", "bin", "deb", "rpm"]
+    if sys.platform != "win32":
+        formats.append("sh")
+
+    def create_and_hash():
+        """Create the formats and return the hashes of all artifacts."""
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["installer", "--formats", ",".join(formats), "--force"]
+        )
+        assert result.exit_code == 0
+        hashes = {}
+        for file in rye_project.joinpath("target/release").iterdir():
+            if file.name != conf.name and not file.name.endswith(".exe"):
+                hashes[file.name] = hashlib.sha256(file.read_bytes()).hexdigest()
+                assert os.stat(file).st_mtime == epoch
+        return hashes
+
+    hashes_first = create_and_hash()
+    time.sleep(1.1)  # make sure the clock moved on
+    assert create_and_hash() == hashes_first
+
+
+def test_installer_verify_reproducible(rye_project):
+    """Verify that reproducible installers are identical in two runs."""
+    conf = config.PyProjectParser()
+    _ = setup_mock_target_binary(rye_project, conf.name)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["installer", "--formats", "tar,zip,deb,rpm", "--verify-reproducible"]
+    )
+
+    assert result.exit_code == 0
+    assert "Installer(s) are reproducible" in result.output
+
+
+@pytest.mark.skipif("sys.platform == 'win32'", reason="Not supported on Windows")
+def test_installer_checksum_manifest(rye_project):
+    """Write the checksums of all created files to the manifests."""
+    conf = config.PyProjectParser()
+    _ = setup_mock_target_binary(rye_project, conf.name)
+    release_path = rye_project.joinpath("target/release")
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "sh,tar,zip,bin,deb,rpm"])
+    assert result.exit_code == 0
+
+    manifest = json.loads(release_path.joinpath("checksums.json").read_text())
+    sha256sums = release_path.joinpath("SHA256SUMS").read_text().splitlines()
+    assert len(manifest) == len(sha256sums) == 7  # bin has a checksum file
+    for name, entry in manifest.items():
+        data = release_path.joinpath(name).read_bytes()
+        assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+        assert entry["blake2b"] == hashlib.blake2b(data).hexdigest()
+        assert entry["size"] == len(data)
+        assert f"{entry['sha256']}  {name}" in sha256sums
+
+    # entries of previous runs are kept
+    result = runner.invoke(cli, ["installer"])
+    assert result.exit_code == 0
+    manifest_new = json.loads(release_path.joinpath("checksums.json").read_text())
+    assert manifest_new == manifest
+
+
+def test_verify(rye_project):
+    """Verify the artifacts against the manifest and detect modifications."""
+    conf = config.PyProjectParser()
+    _ = setup_mock_target_binary(rye_project, conf.name)
+    release_path = rye_project.joinpath("target/release")
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["verify"])
+    assert result.exit_code != 0
+    assert "No checksums found" in result.output
+
+    runner.invoke(cli, ["installer", "--formats", "tar,zip"])
+    result = runner.invoke(cli, ["verify"])
+    assert result.exit_code == 0
+    assert "All 2 file(s) verified." in result.output
+
+    with open(release_path.joinpath(f"{conf.name}-v0.1.0-linux.zip"), "ab") as f:
+        f.write(b"tampered")
+    release_path.joinpath(f"{conf.name}-v0.1.0-linux.tar.gz").unlink()
+
+    result = runner.invoke(cli, ["verify"])
+    assert result.exit_code != 0
+    assert "mismatch" in result.output
+    assert "Verification failed for 2 of 2 file(s)." in result.output
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+def test_installer_skip_unchanged(rye_project):
+    """Only create the installer again if its inputs changed or if forced."""
+    conf = config.PyProjectParser()
+    _ = setup_mock_target_binary(rye_project, conf.name)
+    installer_file = rye_project.joinpath(f"target/release/{conf.name}-v0.1.0-linux.sh")
+
+    runner = CliRunner()
+
+    def run_installer(*args) -> bool:
+        """Run the installer and return if the installer file was written."""
+        mtime_before = installer_file.stat().st_mtime_ns
+        result = runner.invoke(cli, ["installer", *args])
+        assert result.exit_code == 0
+        skipped = "is up to date" in result.output
+        assert skipped == (installer_file.stat().st_mtime_ns == mtime_before)
+        return not skipped
+
+    result = runner.invoke(cli, ["installer"])
+    assert result.exit_code == 0
+    assert "is up to date" not in result.output
+
+    assert not run_installer()
+    assert run_installer("--force")
+    assert not run_installer()
+
+    # changed binary, config, and modified installer are created again
+    rye_project.joinpath(f"target/release/{conf.name}").write_text("new binary")
+    assert run_installer()
+    config.pyproject_writer("nsis_solid", False)
+    assert run_installer()
+    installer_file.write_text("tampered")
+    assert run_installer()
+    assert not run_installer()
+
+
+def test_installer_formats_skip_unchanged(rye_project):
+    """Only create the formats whose inputs changed."""
+    conf = config.PyProjectParser()
+    _ = setup_mock_target_binary(rye_project, conf.name)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "tar,zip"])
+    assert result.exit_code == 0
+
+    result = runner.invoke(cli, ["installer", "--formats", "tar,zip,bin"])
+    assert result.exit_code == 0
+    assert "(tar) is up to date" in result.output
+    assert "(zip) is up to date" in result.output
+    assert "(bin) in" in result.output
+    for suffix in [".tar.gz", ".zip", ""]:  # all installers are listed
+        assert f"-v0.1.0-linux{suffix}" in result.output
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+def test_installer_formats_pipe(rye_project, tmp_path):
+    """Create a pipe installer and install it by piping it into bash."""
+    conf = config.PyProjectParser()
+    target_file_content = setup_mock_target_binary(rye_project, conf.name)
+    install_dir = tmp_path.joinpath("bin")
+    install_dir.mkdir()
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["installer", "--formats", "pipe"])
+    assert result.exit_code == 0
+
+    installer_file = rye_project.joinpath(
+        f"target/release/{conf.name}-v0.1.0-linux-pipe.sh"
+    )
+    env = dict(os.environ, BOX_INSTALL_DIR=str(install_dir))
+    with open(installer_file, "rb") as f:
+        subprocess.run(["bash"], stdin=f, check=True, env=env)
+    assert install_dir.joinpath(conf.name).read_text() == target_file_content
+
+    # not available for GUIs
+    config.pyproject_writer("is_gui", True)
+    result = runner.invoke(cli, ["installer", "--formats", "pipe"])
+    assert result.exit_code != 0
+    assert "only available for CLIs" in result.output
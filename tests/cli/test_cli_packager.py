@@ -167,3 +167,24 @@ def test_cargo_not_found(rye_project, mocker):
 
     assert result.exit_code == 1
     assert "cargo not found" in result.output
+
+
+def test_package_watch(rye_project, mocker):
+    """Package the project, then watch it until interrupted."""
+    mocker.patch("box.packager.PackageApp.check_requirements")
+    mocker.patch("box.packager.PackageApp.build")
+    mocker.patch("box.packager.PackageApp.package")
+    mocker.patch(
+        "box.packager.PackageApp.binary_name", rye_project.joinpath("target/myapp")
+    )
+    run_mock = mocker.patch(
+        "box.watcher.ProjectWatcher.run", side_effect=KeyboardInterrupt
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["package", "--watch"])
+
+    assert result.exit_code == 0
+    assert "Project successfully packaged." in result.output
+    assert "Stopped watching." in result.output
+    run_mock.assert_called_once()
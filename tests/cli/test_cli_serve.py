@@ -0,0 +1,63 @@
+# Test forwarding commands to the box daemon with the CLI
+
+import pytest
+from click.testing import CliRunner
+
+from box.cli import cli
+
+
+def test_forward_to_daemon(rye_project, box_daemon, mocker, monkeypatch):
+    """Forward commands to the daemon if `BOX_DAEMON_SOCKET` is set."""
+    monkeypatch.setenv("BOX_DAEMON_SOCKET", str(box_daemon.socket_path))
+    run_mock = mocker.patch("box.daemon._run", return_value=3)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["package", "-v"])
+
+    assert result.exit_code == 3
+    assert run_mock.call_args[0][0].args == ["package", "-v"]
+
+
+def test_forward_local_commands(rye_project, box_daemon, mocker, monkeypatch):
+    """Commands that are not forwarded and help always run locally."""
+    monkeypatch.setenv("BOX_DAEMON_SOCKET", str(box_daemon.socket_path))
+    run_mock = mocker.patch("box.daemon._run")
+
+    runner = CliRunner()
+    assert runner.invoke(cli, ["--version"]).exit_code == 0
+    assert runner.invoke(cli, ["config", "--help"]).exit_code == 0
+    run_mock.assert_not_called()
+
+
+@pytest.mark.parametrize("args", [["package", "--watch"], ["package", "-vw"]])
+def test_forward_watch_locally(rye_project, box_daemon, mocker, monkeypatch, args):
+    """Never forward commands that keep running, they would block the daemon."""
+    monkeypatch.setenv("BOX_DAEMON_SOCKET", str(box_daemon.socket_path))
+    run_mock = mocker.patch("box.daemon._run")
+    for method in ("check_requirements", "build", "package"):
+        mocker.patch(f"box.packager.PackageApp.{method}")
+    mocker.patch(
+        "box.packager.PackageApp.binary_name", rye_project.joinpath("target/myapp")
+    )
+    watch_mock = mocker.patch(
+        "box.watcher.ProjectWatcher.run", side_effect=KeyboardInterrupt
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(cli, args)
+
+    assert result.exit_code == 0
+    watch_mock.assert_called_once()
+    run_mock.assert_not_called()
+
+
+def test_forward_daemon_not_running(rye_project, monkeypatch):
+    """Run locally with a warning if the daemon cannot be reached."""
+    monkeypatch.setenv("BOX_DAEMON_SOCKET", str(rye_project.joinpath("box.sock")))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["config"])
+
+    assert result.exit_code == 0
+    assert "Cannot reach the box daemon" in result.output
+    assert 'builder = "rye"' in result.output
@@ -2,11 +2,48 @@
 
 import os
 import subprocess
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
-from box.config import pyproject_writer
+from box.config import CONFIG_DEFAULTS, pyproject_writer
+from box.daemon import BoxDaemon, is_running
+
+
+@pytest.fixture(autouse=True)
+def box_cache_dir(tmp_path_factory, monkeypatch):
+    """Isolate tests from the host: use a temporary cache folder and no user config."""
+    for key in CONFIG_DEFAULTS:
+        monkeypatch.delenv(f"BOX_{key.upper()}", raising=False)
+    monkeypatch.delenv("BOX_DAEMON_SOCKET", raising=False)
+    host = tmp_path_factory.mktemp("box_host")
+    monkeypatch.setenv("BOX_CONFIG_FILE", str(host.joinpath("config.toml")))
+
+    cache = tmp_path_factory.mktemp("box_cache")
+    monkeypatch.setenv("BOX_CACHE_DIR", str(cache))
+    return cache
+
+
+@pytest.fixture
+def box_daemon(tmp_path_factory):
+    """Run a box daemon with a queue of one job in a thread."""
+    socket_path = tmp_path_factory.mktemp("daemon").joinpath("box.sock")
+    daemon = BoxDaemon(socket_path, queue_size=1)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not is_running(socket_path):
+        assert thread.is_alive() and time.monotonic() < deadline
+        time.sleep(0.01)
+
+    yield daemon
+
+    # clean up
+    daemon.shutdown()
+    thread.join()
 
 
 @pytest.fixture
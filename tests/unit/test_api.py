@@ -0,0 +1,120 @@
+# Test the programmatic API
+
+import hashlib
+import os
+import sys
+import urllib.request
+from pathlib import Path
+
+import pytest
+import rich_click as click
+
+import box.utils as ut
+from box import api
+from box.config import PyProjectParser
+
+
+@pytest.fixture
+def elsewhere(tmp_path_factory, monkeypatch):
+    """Run the API from a folder other than the project."""
+    folder = tmp_path_factory.mktemp("elsewhere")
+    monkeypatch.chdir(folder)
+    return folder
+
+
+def mock_release_binary(project: Path) -> bytes:
+    """Create a release binary in the project and return its content."""
+    with ut.set_dir(project):
+        name = PyProjectParser().name
+    release = project.joinpath("target/release")
+    release.mkdir(parents=True)
+    content = b"This is the content of the mock binary file..."
+    release.joinpath(name).write_bytes(content)
+    return content
+
+
+def test_package(rye_project, elsewhere, mocker):
+    """Package a project and return the binary, timings, and cache statistics."""
+    mocker.patch("subprocess.run")
+    mocker.patch("shutil.which", return_value="cargo")
+    mocker.patch.object(urllib.request, "urlretrieve")
+    mocker.patch("tarfile.open")
+
+    name = rye_project.name.replace("-", "_")
+    rye_project.joinpath("dist").mkdir()
+    rye_project.joinpath(f"dist/{name}-v0.1.0.tar.gz").touch()
+    build_dir = rye_project.joinpath("build")
+    build_dir.joinpath("pyapp-v1.2.3/target/release").mkdir(parents=True)
+    build_dir.joinpath("pyapp-source.tar.gz").touch()
+    exename = "pyapp.exe" if sys.platform == "win32" else "pyapp"
+    build_dir.joinpath("pyapp-v1.2.3/target/release", exename).write_bytes(b"app")
+
+    environ = dict(os.environ)
+    events = []
+    result = api.package(rye_project, progress=lambda *args: events.append(args))
+
+    assert result.binary.path.parent == rye_project.joinpath("target/release")
+    assert result.binary.sha256 == hashlib.sha256(b"app").hexdigest()
+    assert result.binary.size == 3
+    assert result.sdist == rye_project.joinpath(f"dist/{name}-v0.1.0.tar.gz")
+    assert set(result.timings) == {"build", "pyapp_source", "cargo"}
+    assert result.cache_stats == {"hits": 1, "misses": 0}
+    assert "Project built with rye." in result.log
+    assert events[:2] == [("build", "start"), ("build", "end")]
+    assert events[-1] == ("cargo", "end")
+
+    assert Path.cwd() == elsewhere
+    assert dict(os.environ) == environ
+
+
+def test_make_installer(rye_project, elsewhere):
+    """Create installers and report the cache statistics of a second run."""
+    content = mock_release_binary(rye_project)
+
+    events = []
+    result = api.make_installer(
+        rye_project, formats=["tar", "bin"], progress=lambda *args: events.append(args)
+    )
+
+    assert [it.path.parent for it in result.artifacts] == [
+        rye_project.joinpath("target/release")
+    ] * 2
+    assert result.artifacts[1].sha256 == hashlib.sha256(content).hexdigest()
+    assert set(result.timings) == {"tar", "bin"}
+    assert result.cache_stats == {"hits": 0, "misses": 2}
+    assert sorted(events) == [
+        ("bin", "end"),
+        ("bin", "start"),
+        ("tar", "end"),
+        ("tar", "start"),
+    ]
+
+    again = api.make_installer(rye_project, formats=["tar", "bin"])
+    assert again.artifacts == result.artifacts
+    assert again.timings == {}
+    assert again.cache_stats == {"hits": 2, "misses": 0}
+    assert "is up to date" in again.log
+    assert Path.cwd() == elsewhere
+
+
+def test_make_installer_no_project(elsewhere):
+    """Raise a click exception for a folder that is not a project."""
+    with pytest.raises(click.ClickException):
+        api.make_installer(elsewhere)
+
+
+def test_calls_serialized(elsewhere, mocker):
+    """Hold the lock while a call changes the process, and release it on errors."""
+    locked = []
+
+    def check_boxproject():
+        locked.append(api._lock.locked())
+        raise click.ClickException("not a project")
+
+    mocker.patch.object(ut, "check_boxproject", side_effect=check_boxproject)
+    for _ in range(2):
+        with pytest.raises(click.ClickException):
+            api.make_installer(elsewhere)
+
+    assert locked == [True, True]
+    assert not api._lock.locked()
@@ -0,0 +1,278 @@
+# Test the asset resolver
+
+import os
+import random
+import struct
+import zlib
+from pathlib import Path
+
+import pytest
+
+from box import assets
+from box.installer_utils import icon_hlp
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache."""
+    assets.clear_cache()
+    yield
+    assets.clear_cache()
+
+
+def create_icon(folder: Path, suffix: str = "png") -> Path:
+    """Create an icon in the assets folder of a given folder.
+
+    :param folder: Folder in which the assets folder is created.
+    :param suffix: Suffix of the icon file.
+
+    :return: Path to the icon.
+    """
+    assets_dir = folder.joinpath("assets")
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    icon = assets_dir.joinpath(f"icon.{suffix}")
+    icon.touch()
+    return icon
+
+
+@pytest.mark.parametrize(
+    "excluded",
+    [
+        "node_modules",
+        ".venv",
+        "src/pkg/.venv",
+        "sub/node_modules/pkg",
+        "build",
+        "checkout/pyapp-v0.20.0/target",
+        "src/__pycache__",
+    ],
+)
+def test_asset_dirs_pruned(tmp_path, excluded):
+    """Never walk into excluded or hidden folders, at any depth."""
+    create_icon(tmp_path.joinpath(excluded))
+
+    assert assets.asset_dirs(tmp_path) == []
+    assert assets.find_icon(root=tmp_path) is None
+
+
+def test_asset_dirs_order(tmp_path):
+    """Walk top-down and sorted, such that the shallowest assets folder is first."""
+    create_icon(tmp_path.joinpath("src/b"))
+    create_icon(tmp_path.joinpath("src/a"))
+    create_icon(tmp_path)
+
+    assert assets.asset_dirs(tmp_path) == [
+        tmp_path.joinpath("assets"),
+        tmp_path.joinpath("src/a/assets"),
+        tmp_path.joinpath("src/b/assets"),
+    ]
+
+
+def test_asset_dirs_gitignore(tmp_path):
+    """Skip folders that are ignored by `.gitignore` files."""
+    tmp_path.joinpath(".gitignore").write_text(
+        "# comment\n*.egg-info/\n/vendor\ndocs/generated\n!keep\n"
+    )
+    create_icon(tmp_path.joinpath("my.egg-info"))
+    create_icon(tmp_path.joinpath("vendor"))
+    create_icon(tmp_path.joinpath("docs/generated"))
+    keep = create_icon(tmp_path.joinpath("src/vendor"))  # `/vendor` is anchored
+
+    sub = tmp_path.joinpath("sub")
+    sub.mkdir()
+    sub.joinpath(".gitignore").write_text("out/\n")
+    create_icon(sub.joinpath("out"))
+
+    assert assets.asset_dirs(tmp_path) == [keep.parent]
+
+
+@pytest.mark.parametrize(
+    "pattern_path_dir_exp",
+    [
+        ("out/", "out", True, True),
+        ("out/", "out", False, False),
+        ("*.log", "a/b.log", False, True),
+        ("/out", "a/out", True, False),
+        ("a/*/c", "a/b/c", True, True),
+        ("**/c", "a/b/c", True, True),
+        ("!c", "c", True, False),
+    ],
+)
+def test_gitignore(pattern_path_dir_exp):
+    """Match the supported subset of the `.gitignore` syntax."""
+    pattern, path, is_dir, exp = pattern_path_dir_exp
+    assert assets.GitIgnore([pattern]).ignored(path, is_dir) == exp
+
+
+def test_asset_dirs_cached(tmp_path, mocker):
+    """Re-use the index until a walked folder changes."""
+    icon = create_icon(tmp_path.joinpath("src"))
+    walk_spy = mocker.spy(os, "walk")
+
+    assert assets.asset_dirs(tmp_path) == [icon.parent]
+    assert assets.asset_dirs(tmp_path) == [icon.parent]
+    assert walk_spy.call_count == 1
+
+    # a new assets folder changes the mtime of its parent and invalidates the cache
+    new_icon = create_icon(tmp_path)
+    os.utime(tmp_path, ns=(0, 0))
+    assert assets.asset_dirs(tmp_path) == [new_icon.parent, icon.parent]
+    assert walk_spy.call_count == 2
+
+
+@pytest.mark.parametrize("suffix_exp", [(None, "svg"), ("png", "png"), ("ico", None)])
+def test_find_icon(tmp_path, suffix_exp):
+    """Find icons with the preferred or the requested suffix."""
+    suffix, exp = suffix_exp
+    create_icon(tmp_path, "png")
+    create_icon(tmp_path, "svg")
+
+    icon = assets.find_icon(suffix, root=tmp_path)
+    if exp is None:
+        assert icon is None
+    else:
+        assert icon == tmp_path.joinpath(f"assets/icon.{exp}")
+
+
+def test_find_icon_explicit(tmp_path):
+    """Use the explicitly configured icon and files next to it with other suffixes."""
+    create_icon(tmp_path, "ico")
+    logo = tmp_path.joinpath("logos/app.png")
+    logo.parent.mkdir()
+    logo.touch()
+    logo.with_suffix(".icns").touch()
+
+    assert assets.find_icon(icon="logos/app.png", root=tmp_path) == logo
+    assert assets.find_icon("icns", "logos/app.png", tmp_path) == logo.with_suffix(
+        ".icns"
+    )
+    # the assets folders are not searched, the configured icon is converted instead
+    assert assets.find_icon("ico", "logos/app.png", tmp_path) is None
+
+
+def png_filter(filter_type: int, row: bytes, prev: bytes, bpp: int) -> bytes:
+    """Apply a PNG filter to a row, as reference for the decoder."""
+    out = bytearray(len(row))
+    for i, value in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        if filter_type == 0:
+            pred = 0
+        elif filter_type == 1:
+            pred = a
+        elif filter_type == 2:
+            pred = b
+        elif filter_type == 3:
+            pred = (a + b) >> 1
+        else:
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            pred = a if pa <= pb and pa <= pc else b if pb <= pc else c
+        out[i] = (value - pred) & 0xFF
+    return bytes([filter_type]) + bytes(out)
+
+
+def make_png(width: int, height: int, rows: list, color_type: int, depth=8) -> bytes:
+    """Create a PNG file, cycling through all filter types row by row."""
+    bpp = max(1, {0: 1, 2: 3, 4: 2, 6: 4}[color_type] * depth // 8)
+    raw = b""
+    prev = bytes(len(rows[0]))
+    for y, row in enumerate(rows):
+        raw += png_filter(y % 5, row, prev, bpp)
+        prev = row
+
+    def chunk(chunk_type, content):
+        crc = zlib.crc32(chunk_type + content)
+        return (
+            struct.pack(">I", len(content))
+            + chunk_type
+            + content
+            + (struct.pack(">I", crc))
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, depth, color_type, 0, 0, 0)
+    return (
+        icon_hlp.PNG_SIGNATURE
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def test_read_png_filters():
+    """Decode all PNG filter types."""
+    rgba = [bytes(random.randrange(256) for _ in range(4 * 7)) for _ in range(10)]
+    rgba = [bytes(it[i] if i % 4 != 3 else 255 for i in range(len(it))) for it in rgba]
+
+    image = icon_hlp.read_png(make_png(7, 10, rgba, 6))
+
+    assert (image.width, image.height) == (7, 10)
+    assert image.to_rgba() == b"".join(rgba)
+
+
+@pytest.mark.parametrize(
+    "color_type_depth_row_exp",
+    [
+        (0, 8, b"\x00\x80", b"\x00\x00\x00\xff\x80\x80\x80\xff"),
+        (0, 1, b"\x40", b"\x00\x00\x00\xff\xff\xff\xff\xff"),
+        (2, 16, b"\x10\x00\x20\x00\x30\x00", b"\x10\x20\x30\xff"),
+        (4, 8, b"\x80\x00", b"\x00\x00\x00\x00"),
+    ],
+)
+def test_read_png_color_types(color_type_depth_row_exp):
+    """Convert gray, RGB, and gray-alpha images with various depths to RGBA."""
+    color_type, depth, row, exp = color_type_depth_row_exp
+    width = len(exp) // 4
+    image = icon_hlp.read_png(make_png(width, 1, [row], color_type, depth))
+    assert image.to_rgba() == exp
+
+
+def test_read_png_invalid():
+    """Raise a ValueError for files that are not PNGs."""
+    with pytest.raises(ValueError):
+        icon_hlp.read_png(b"GIF89a")
+
+
+def test_resize():
+    """Average pixels and do not bleed the color of transparent pixels."""
+    rgba = bytearray(b"\xff\x00\x00\xff" + b"\x00\xff\x00\x00") * 2 * 4
+    image = icon_hlp.Image.from_rgba(4, 4, rgba)
+
+    assert image.resized(2).to_rgba() == b"\xff\x00\x00\x80" * 4
+    assert image.resized(3).width == 3
+    assert image.resized(8).to_rgba()[:4] == b"\xff\x00\x00\xff"
+
+
+@pytest.mark.parametrize("suffix", ["ico", "icns"])
+def test_convert_icon(tmp_path, box_cache_dir, mocker, suffix):
+    """Convert a master PNG and cache the result by its content hash."""
+    rows = [b"".join(bytes([x, y, 128, 255]) for x in range(64)) for y in range(64)]
+    master = tmp_path.joinpath("icon.png")
+    master.write_bytes(make_png(64, 64, rows, 6))
+    convert_spy = mocker.spy(icon_hlp, "convert_png")
+
+    icon = assets.convert_icon(master, suffix)
+
+    assert icon.name == f"icon.{suffix}"
+    assert box_cache_dir in icon.parents
+    content = icon.read_bytes()
+    if suffix == "ico":
+        assert struct.unpack("<HHH", content[:6]) == (0, 1, 5)  # 16 to 64 pixels
+    else:
+        assert content[:4] == b"icns"
+        assert struct.unpack(">I", content[4:8])[0] == len(content)
+    assert (
+        content.count(icon_hlp.PNG_SIGNATURE)
+        == len(icon_hlp.icon_sizes(suffix, 64)) + (suffix == "icns") * 2
+    )  # retina types share sizes
+
+    # cached: no new conversion
+    assert assets.convert_icon(master, suffix) == icon
+    assert convert_spy.call_count == 1
+
+    # a changed master is converted again
+    rows[0] = bytes(4 * 64)
+    master.write_bytes(make_png(64, 64, rows, 6))
+    assert assets.convert_icon(master, suffix) != icon
+    assert convert_spy.call_count == 2
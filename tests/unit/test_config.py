@@ -1,9 +1,18 @@
 # Test the pyproject parser
 
+import builtins
+import errno
+import os
+import subprocess
+import sys
 from pathlib import Path
 
 import pytest
+import rich_click as click
+import tomlkit
 
+import box.utils as ut
+from box import config
 from box.config import PyProjectParser, pyproject_writer
 
 TOML_BASIC_FILE = """[project]
@@ -35,6 +44,33 @@ def test_pyproject_parser_basic_project(tmp_path_chdir):
     assert parser.name_pkg == "my_app"
     assert parser.version == "0.1.0"
 
+    project = parser.project_table
+    assert project["name"] == "my-app"
+    project["name"] = "changed"  # a copy, the cached document is not modified
+    assert PyProjectParser().name == "my-app"
+
+
+def test_pyproject_parser_cached(tmp_path_chdir, mocker):
+    """Parse the `pyproject.toml` file only once until it changes."""
+    pyproject = tmp_path_chdir.joinpath("pyproject.toml")
+    pyproject.write_text(TOML_BASIC_FILE)
+    load_spy = mocker.spy(config.tomllib, "load")
+
+    PyProjectParser()
+    PyProjectParser()
+    assert load_spy.call_count == 1
+
+    # writes by box invalidate the cache, even if mtime and size are unchanged
+    stat = pyproject.stat()
+    pyproject_writer("builder", "hatch")
+    os.utime(pyproject, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert PyProjectParser().builder == "hatch"
+
+    # external modifications are detected by mtime and size
+    pyproject.write_text(TOML_BASIC_FILE.replace("my-app", "my-app2"))
+    assert PyProjectParser().name == "my-app2"
+    assert load_spy.call_count == 3
+
 
 def test_pyproject_parser_entry_point(tmp_path_chdir):
     """Try to get an entry point for the app from project.scripts."""
@@ -99,6 +135,23 @@ def test_pyproject_parser_env_vars_always_returns_dict(rye_project):
     assert ret_val == {}
 
 
+def test_pyproject_parser_nsis_compression(rye_project):
+    """Return defaults for NSIS compression and the configured values if set."""
+    parser = PyProjectParser()
+    assert parser.nsis_compressor == "lzma"
+    assert parser.nsis_solid is True
+    assert parser.nsis_dict_size is None
+
+    pyproject_writer("nsis_compressor", "bzip2")
+    pyproject_writer("nsis_solid", False)
+    pyproject_writer("nsis_dict_size", 64)
+
+    parser = PyProjectParser()
+    assert parser.nsis_compressor == "bzip2"
+    assert parser.nsis_solid is False
+    assert parser.nsis_dict_size == 64
+
+
 def test_pyproject_writer_set_entry(tmp_path_chdir):
     """Set the app entry in the pyproject.toml file."""
     fname = "pyproject.toml"
@@ -135,16 +188,288 @@ def test_pyproject_writer_called_with_newline(tmp_path_chdir, mocker):
     fname = "pyproject.toml"
     tmp_path_chdir.joinpath(fname).write_text(TOML_BASIC_FILE)
 
-    # mock open
-    mock_open = mocker.patch("builtins.open", mocker.mock_open())
+    open_spy = mocker.spy(builtins, "open")
+
+    pyproject_writer("builder", "rye")
+
+    write_calls = [it for it in open_spy.call_args_list if it.args[1:2] == ("w",)]
+    assert len(write_calls) == 1
+    assert write_calls[0].kwargs == {"newline": "\n"}
+
+
+def test_pyproject_transaction(tmp_path_chdir, mocker):
+    """Batch several writes into one write and roll back on errors."""
+    pyproject = tmp_path_chdir.joinpath("pyproject.toml")
+    pyproject.write_text(TOML_BASIC_FILE)
+    dump_spy = mocker.spy(config, "_dump_pyproject")
+
+    with config.pyproject_transaction():
+        pyproject_writer("builder", "hatch")
+        pyproject_writer("is_gui", True)
+        pyproject_writer("PYAPP_FULL_ISOLATION", True, category="env-vars")
+        # readers see the pending changes, the file is unchanged
+        assert PyProjectParser().builder == "hatch"
+        assert pyproject.read_text() == TOML_BASIC_FILE
+
+    assert dump_spy.call_count == 1
+    parser = PyProjectParser()
+    assert parser.is_gui
+    assert parser.env_vars == {"PYAPP_FULL_ISOLATION": True}
+
+    with pytest.raises(RuntimeError):
+        with config.pyproject_transaction():
+            pyproject_writer("builder", "rye")
+            raise RuntimeError
+    assert PyProjectParser().builder == "hatch"
+
+    # unchanged documents are not written
+    with config.pyproject_transaction():
+        pyproject_writer("builder", "hatch")
+    assert dump_spy.call_count == 1
+    assert not list(tmp_path_chdir.glob(".*.tmp"))
+
+
+def test_pyproject_writer_durable(tmp_path_chdir, mocker):
+    """Sync the new file to disk before it replaces `pyproject.toml`."""
+    pyproject = tmp_path_chdir.joinpath("pyproject.toml")
+    pyproject.write_text(TOML_BASIC_FILE)
+    pyproject.chmod(0o640)
+    fsync_spy = mocker.spy(os, "fsync")
+
+    pyproject_writer("builder", "rye")
+
+    assert fsync_spy.call_count >= 1
+    assert pyproject.stat().st_mode & 0o777 == 0o640
+    assert PyProjectParser().builder == "rye"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses a POSIX shell.")
+def test_pyproject_writer_concurrent(tmp_path_chdir):
+    """Serialize concurrent writers from several processes without losing updates."""
+    tmp_path_chdir.joinpath("pyproject.toml").write_text(TOML_BASIC_FILE)
+    code = (
+        "import sys; from box.config import pyproject_writer\n"
+        "for i in range(10): pyproject_writer(f'k{sys.argv[1]}_{i}', i)"
+    )
+
+    procs = [subprocess.Popen([sys.executable, "-c", code, str(it)]) for it in range(6)]
+    assert all(proc.wait() == 0 for proc in procs)
+
+    box_table = PyProjectParser().box_table
+    assert len(box_table) == 60
+    assert not list(tmp_path_chdir.glob(".*.tmp"))
+
+
+def test_pyproject_writer_lock_file(tmp_path_chdir, box_cache_dir):
+    """Keep the lock file in the cache folder, not in the project."""
+    tmp_path_chdir.joinpath("pyproject.toml").write_text(TOML_BASIC_FILE)
 
     pyproject_writer("builder", "rye")
-    print(tmp_path_chdir.absolute())
 
-    mock_open.assert_called_with(Path(fname), "w", newline="\n")
+    assert sorted(it.name for it in tmp_path_chdir.iterdir()) == ["pyproject.toml"]
+    assert len(list(box_cache_dir.joinpath("locks").glob("*.lock"))) == 1
+
+
+def test_pyproject_writer_lock_file_fallback(tmp_path_chdir, monkeypatch):
+    """Keep the lock file next to the project if the cache folder is unusable."""
+    tmp_path_chdir.joinpath("pyproject.toml").write_text(TOML_BASIC_FILE)
+    tmp_path_chdir.joinpath("not-a-folder").touch()
+    monkeypatch.setenv("BOX_CACHE_DIR", str(tmp_path_chdir.joinpath("not-a-folder")))
+
+    pyproject_writer("builder", "rye")
+
+    assert tmp_path_chdir.joinpath(".pyproject.toml.lock").is_file()
+    assert PyProjectParser().builder == "rye"
+
+
+@pytest.mark.parametrize("error", [errno.EACCES, errno.EBADF])
+def test_pyproject_writer_lock_windows(tmp_path_chdir, monkeypatch, mocker, error):
+    """Retry the lock on Windows only while another process holds it."""
+    tmp_path_chdir.joinpath("pyproject.toml").write_text(TOML_BASIC_FILE)
+    msvcrt = mocker.MagicMock()
+    msvcrt.locking.side_effect = [OSError(error, "locked"), None, None]
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    monkeypatch.setitem(sys.modules, "msvcrt", msvcrt)
+    mocker.patch("time.sleep")
+
+    if error == errno.EBADF:
+        with pytest.raises(OSError):
+            pyproject_writer("builder", "rye")
+        assert msvcrt.locking.call_count == 1
+    else:
+        pyproject_writer("builder", "rye")
+        assert msvcrt.locking.call_count == 3  # two attempts and the unlock
+
+
+def test_pyproject_writer_lock_windows_timeout(tmp_path_chdir, monkeypatch, mocker):
+    """Give up waiting for the lock on Windows after the timeout."""
+    tmp_path_chdir.joinpath("pyproject.toml").write_text(TOML_BASIC_FILE)
+    msvcrt = mocker.MagicMock()
+    msvcrt.locking.side_effect = OSError(errno.EACCES, "locked")
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    monkeypatch.setitem(sys.modules, "msvcrt", msvcrt)
+    monkeypatch.setattr(config, "PYPROJECT_LOCK_TIMEOUT", 0)
+
+    with pytest.raises(click.ClickException) as e:
+        pyproject_writer("builder", "rye")
+
+    assert "Timed out waiting for the lock" in e.value.message
 
 
 def test_pyproject_writer_no_pyproject_toml_file(tmp_path_chdir):
     """Raise FileNotFound error if no pyproject.toml file in folder."""
     with pytest.raises(FileNotFoundError):
         pyproject_writer("builder", "rye")
+
+
+def test_box_config(rye_project):
+    """Create a snapshot with plain attributes and env-vars as strings."""
+    pyproject_writer("env-vars", {"PYAPP_A": True, "PYAPP_B": False, "PYAPP_C": 3})
+
+    conf = config.BoxConfig.from_pyproject()
+
+    assert conf.builder == "rye"
+    assert conf.app_entry_type == "spec"
+    assert conf.is_gui is False
+    assert conf.keep_versions == 3
+    assert conf.env_vars == {"PYAPP_A": "1", "PYAPP_B": "0", "PYAPP_C": "3"}
+    assert not hasattr(conf, "__dict__")
+    with pytest.raises(AttributeError):
+        conf.unknown = 1
+
+
+def test_box_config_builders():
+    """Derive the builders of the packager from the builder table."""
+    from box import BUILDER_COMMANDS, BUILDERS
+    from box.packager import PackageApp
+
+    assert PackageApp().builders == list(BUILDERS) == list(BUILDER_COMMANDS)
+
+
+def test_box_config_invalid(rye_project):
+    """Report all problems of the configuration at once."""
+    doc = tomlkit.parse(rye_project.joinpath("pyproject.toml").read_text())
+    del doc["tool"]["box"]["entry_type"]
+    doc["tool"]["box"]["is_gui"] = 1
+    doc["tool"]["box"]["builder"] = "custom=''"
+    doc["tool"]["box"]["env-vars"] = {"PYAPP_LIST": [1, 2]}
+    rye_project.joinpath("pyproject.toml").write_text(doc.as_string())
+
+    with pytest.raises(click.ClickException) as e:
+        config.BoxConfig.from_pyproject()
+
+    msg = e.value.message
+    assert "`entry_type` is missing." in msg
+    assert "`is_gui` must be a bool, not 1." in msg
+    assert "The custom builder has no command." in msg
+    assert "Variable `PYAPP_LIST`" in msg
+
+
+def test_resolve_config(rye_project, monkeypatch):
+    """Resolve defaults, user config, `pyproject.toml`, and `BOX_*` variables."""
+    user_file = rye_project.joinpath("user.toml")
+    user_file.write_text('keep_versions = 5\njobs = 2\nnsis_compressor = "bzip2"\n')
+    monkeypatch.setenv("BOX_CONFIG_FILE", str(user_file))
+    monkeypatch.setenv("BOX_JOBS", "4")
+    monkeypatch.setenv("BOX_NSIS_SOLID", "false")
+    pyproject_writer("nsis_compressor", "zlib")
+
+    resolved = config.resolve_config(PyProjectParser())
+
+    assert resolved["installer_prewarm"] == (False, "default")
+    assert resolved["keep_versions"] == (5, f"user:{user_file}")
+    assert resolved["nsis_compressor"] == ("zlib", "pyproject.toml")
+    assert resolved["jobs"] == (4, "env:BOX_JOBS")
+    assert resolved["nsis_solid"] == (False, "env:BOX_NSIS_SOLID")
+    assert resolved["builder"] == ("rye", "pyproject.toml")
+
+    conf = config.BoxConfig.from_pyproject()
+    assert (conf.keep_versions, conf.jobs, conf.nsis_solid) == (5, 4, False)
+
+    # the host-wide layers alone
+    assert config.resolve_config()["nsis_compressor"][0] == "bzip2"
+
+
+@pytest.mark.parametrize(
+    "var_value",
+    [("BOX_JOBS", "many"), ("BOX_JOBS", "+-5"), ("BOX_NSIS_SOLID", "2")],
+)
+def test_resolve_config_invalid_env(tmp_path_chdir, monkeypatch, var_value):
+    """Raise an exception if a `BOX_*` variable cannot be converted."""
+    var, value = var_value
+    monkeypatch.setenv(var, value)
+
+    with pytest.raises(click.ClickException) as e:
+        config.resolve_config()
+
+    assert var in e.value.message
+
+
+@pytest.mark.parametrize("line", ['jobs = "4"', "keep_versions = true"])
+def test_resolve_config_invalid_user_file(tmp_path_chdir, monkeypatch, line):
+    """Raise an exception if a value in the user file has the wrong type."""
+    user_file = tmp_path_chdir.joinpath("user.toml")
+    user_file.write_text(f"{line}\n")
+    monkeypatch.setenv("BOX_CONFIG_FILE", str(user_file))
+
+    with pytest.raises(click.ClickException) as e:
+        config.resolve_config()
+
+    assert str(user_file) in e.value.message
+    assert line.split()[0] in e.value.message
+
+
+@pytest.mark.parametrize(
+    "key_value",
+    [
+        ("nsis_solid", "false"),
+        ("installer_prewarm", "yes"),
+        ("keep_versions", "3"),
+        ("keep_versions", True),
+        ("cache_dir", 42),
+    ],
+)
+def test_resolve_config_invalid_pyproject(rye_project, key_value):
+    """Raise an exception if a value in `[tool.box]` has the wrong type."""
+    key, value = key_value
+    pyproject_writer(key, value)
+
+    with pytest.raises(click.ClickException) as e:
+        config.BoxConfig.from_pyproject()
+    assert f"`{key}` must be a" in e.value.message
+    assert "pyproject.toml" in e.value.message
+
+    with pytest.raises(click.ClickException):
+        ut.cache_dir()
+
+
+def test_box_config_author_fallback(rye_project):
+    """Use the project name as author if the project has no author name."""
+    doc = tomlkit.parse(rye_project.joinpath("pyproject.toml").read_text())
+    doc["project"]["authors"] = [{"email": "me@example.com"}]
+    rye_project.joinpath("pyproject.toml").write_text(doc.as_string())
+
+    conf = config.BoxConfig.from_pyproject()
+
+    assert conf.author == conf.name
+
+
+def test_cache_dir_pyproject(rye_project, monkeypatch):
+    """Use the cache folder that the project configures, as `box config` shows."""
+    monkeypatch.delenv("BOX_CACHE_DIR")
+    pyproject_writer("cache_dir", str(rye_project.joinpath("cache")))
+
+    assert config.resolve_config(config.current_pyproject())["cache_dir"] == (
+        str(rye_project.joinpath("cache")),
+        "pyproject.toml",
+    )
+    assert ut.cache_dir() == rye_project.joinpath("cache")
+
+
+def test_user_config_file(monkeypatch, mocker):
+    """Use the platform's user configuration folder."""
+    monkeypatch.delenv("BOX_CONFIG_FILE")
+    monkeypatch.setenv("XDG_CONFIG_HOME", "/xdg")
+    mocker.patch("sys.platform", "linux")
+
+    assert config.user_config_file() == Path("/xdg/box/config.toml")
@@ -0,0 +1,138 @@
+# Test the box daemon and its clients
+
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import rich_click as click
+
+from box.daemon import BoxDaemon, _pump, forward, is_running
+
+
+def test_daemon_runs_command(rye_project, tmp_path_factory, capsys):
+    """Run a command in a daemon process and stream its output back."""
+    socket_path = tmp_path_factory.mktemp("daemon").joinpath("box.sock")
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "box", "serve", "--socket", str(socket_path)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not is_running(socket_path):
+            assert daemon.poll() is None and time.monotonic() < deadline
+            time.sleep(0.05)
+
+        assert forward(socket_path, ["config"]) == 0
+        assert forward(socket_path, ["env", "--list"]) == 0
+    finally:
+        daemon.terminate()
+        daemon.wait(30)
+
+    output = capsys.readouterr().out
+    assert 'builder = "rye"' in output
+    assert "No variables set" in output
+    assert not socket_path.exists()
+
+
+def test_daemon_exit_code(rye_project, box_daemon, capsys):
+    """Return the exit code and the error message of a failing command."""
+    assert forward(box_daemon.socket_path, ["verify"]) == 1
+
+    assert "No checksums found" in capsys.readouterr().out
+
+
+def test_daemon_rejects_watch(rye_project, box_daemon, capsys):
+    """Reject commands that keep running instead of blocking the worker."""
+    assert forward(box_daemon.socket_path, ["package", "--watch"]) == 1
+
+    captured = capsys.readouterr()  # the daemon runs in this process
+    assert "cannot run in the box daemon" in captured.out + captured.err
+
+
+def test_daemon_client_environment(rye_project, box_daemon, monkeypatch, capsys):
+    """Run the command with the environment of the client, not of the daemon."""
+    monkeypatch.setenv("BOX_KEEP_VERSIONS", "7")
+    assert forward(box_daemon.socket_path, ["config"]) == 0
+
+    assert "keep_versions = 7" in capsys.readouterr().out
+    assert "BOX_KEEP_VERSIONS" in os.environ  # environment of the client is kept
+
+
+def test_daemon_streams_subprocess_output(tmp_path_chdir, box_daemon, mocker, capsys):
+    """Stream the output that subprocesses write to the file descriptors."""
+    mocker.patch("box.daemon._run", side_effect=lambda job: os.system("echo hello"))
+    assert forward(box_daemon.socket_path, ["package"]) == 0
+
+    assert "hello" in capsys.readouterr().out
+
+
+def test_daemon_busy(tmp_path_chdir, box_daemon, mocker, capsys):
+    """Clients run locally if the queue of the daemon is full."""
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_run(job):
+        started.set()
+        release.wait()
+        return 0
+
+    mocker.patch("box.daemon._run", side_effect=blocking_run)
+    codes = []
+    clients = [
+        threading.Thread(
+            target=lambda: codes.append(forward(box_daemon.socket_path, ["package"]))
+        )
+        for _ in range(2)
+    ]
+
+    clients[0].start()
+    assert started.wait(10)  # the worker is busy with the first job
+    clients[1].start()
+    while not box_daemon.jobs.full():  # second job waits in the queue
+        pass
+
+    assert forward(box_daemon.socket_path, ["package"]) is None
+    assert "The box daemon is busy. Running locally." in capsys.readouterr().out
+
+    release.set()
+    for client in clients:
+        client.join()
+    assert codes == [0, 0]
+
+
+def test_daemon_unreachable(tmp_path_chdir, capsys):
+    """Clients run locally if no daemon is listening."""
+    socket_path = tmp_path_chdir.joinpath("box.sock")
+    assert not is_running(socket_path)
+    assert forward(socket_path, ["package"]) is None
+
+    assert "Cannot reach the box daemon" in capsys.readouterr().out
+
+
+def test_daemon_already_running(box_daemon):
+    """Do not start a second daemon on the same socket."""
+    with pytest.raises(click.ClickException) as err:
+        BoxDaemon(box_daemon.socket_path).serve_forever()
+
+    assert "already listening" in err.value.message
+
+
+def test_pump_split_characters():
+    """Decode characters that are split across chunks of the pipe."""
+    read_fd, write_fd = os.pipe()
+    messages = queue.Queue()
+    pump = threading.Thread(target=_pump, args=(read_fd, messages))
+    pump.start()
+
+    data = "Größe: 5 µm ✓".encode()
+    for it in range(len(data)):  # one byte per chunk
+        os.write(write_fd, data[it : it + 1])
+        time.sleep(0.001)
+    os.close(write_fd)
+    pump.join()
+
+    output = "".join(message["out"] for message in messages.queue)
+    assert output == "Größe: 5 µm ✓"
@@ -3,6 +3,9 @@
 Only functions that are not tested within the CLI are tested here.
 """
 
+import rich_click as click
+
+from box import config
 from box.config import PyProjectParser
 from box.initialization import InitializeProject
 
@@ -21,3 +24,22 @@ def test_quiet_init(rye_project_no_box):
     assert pyproj.app_entry_type == "spec"
     assert pyproj.python_version == "3.12"
     assert pyproj.env_vars == {}
+
+
+def test_init_prompts_without_lock(rye_project_no_box, mocker):
+    """Prompt the user before `pyproject.toml` is locked for writing."""
+
+    def prompt(*args, **kwargs):
+        assert not config._transactions
+        return kwargs.get("default", "hello:run")
+
+    mocker.patch.object(click, "prompt", side_effect=prompt)
+    mocker.patch.object(click, "confirm", side_effect=prompt)
+    lock_spy = mocker.spy(config, "_lock_pyproject")
+
+    InitializeProject().initialize()
+
+    assert lock_spy.call_count == 1
+    pyproj = PyProjectParser()
+    assert pyproj.app_entry == "hello:run"
+    assert not pyproj.is_gui
@@ -1,12 +1,19 @@
 """Unit tests for the installer module."""
 
+import hashlib
 import os
+import shutil
+import subprocess
+import time
 from pathlib import Path
 
 import pytest
 import rich_click as click
 
+import box.checksums as cs
 from box import installer as inst
+from box.config import pyproject_writer
+from box.installer_utils import linux_hlp, mac_hlp, windows_hlp
 
 
 def create_icon(suffix: str, path: Path) -> None:
@@ -60,6 +67,47 @@ def test_get_specific_icon(tmp_path_chdir):
     assert isinstance(result, Path)
 
 
+@pytest.mark.parametrize("suffix", ["ico", "icns"])
+def test_get_icon_converted(tmp_path_chdir, box_cache_dir, suffix):
+    """Convert the PNG icon if no `.ico` or `.icns` file exists."""
+    from box.installer_utils.icon_hlp import Image, write_png
+
+    create_icon("png", Path.cwd())
+    image = Image.from_rgba(32, 32, bytearray(b"\x10\x20\x30\xff" * 32 * 32))
+    Path("assets/icon.png").write_bytes(write_png(image))
+
+    result = inst.get_icon(suffix)
+    assert result.name == f"icon.{suffix}"
+    assert box_cache_dir in result.parents
+
+
+def test_get_icon_configured_over_assets(tmp_path_chdir, box_cache_dir):
+    """Convert the configured icon instead of using an `icon.ico` in the assets."""
+    from box.installer_utils.icon_hlp import Image, write_png
+
+    create_icon("ico", Path.cwd())  # stale icon of the assets folder
+    logo = Path("logos/app.png")
+    logo.parent.mkdir()
+    image = Image.from_rgba(32, 32, bytearray(b"\x10\x20\x30\xff" * 32 * 32))
+    logo.write_bytes(write_png(image))
+
+    result = inst.get_icon("ico", "logos/app.png")
+    assert box_cache_dir in result.parents
+
+    logo.with_suffix(".ico").touch()
+    assert inst.get_icon("ico", "logos/app.png") == Path.cwd().joinpath("logos/app.ico")
+
+
+def test_get_icon_converted_invalid(tmp_path_chdir):
+    """Raise an exception if the PNG icon cannot be converted."""
+    create_icon("png", Path.cwd())  # empty file
+
+    with pytest.raises(click.ClickException) as e:
+        inst.get_icon("ico")
+
+    assert "Cannot convert" in e.value.message
+
+
 def test_get_icon_no_icon(tmp_path_chdir):
     """Raise an exception if no icon file is found."""
     with pytest.raises(click.ClickException):
@@ -98,3 +146,408 @@ def test_get_icon_icon_in_wrong_folder(tmp_path_chdir):
 
     with pytest.raises(click.ClickException):
         inst.get_icon()
+
+
+@pytest.mark.parametrize(
+    "compressor_solid_dict_exp",
+    [
+        ("lzma", True, None, ["SetCompressor /SOLID lzma"]),
+        ("lzma", True, 64, ["SetCompressor /SOLID lzma", "SetCompressorDictSize 64"]),
+        ("zlib", False, None, ["SetCompressor zlib"]),
+        ("bzip2", True, None, ["SetCompressor /SOLID bzip2"]),
+    ],
+)
+def test_nsis_scripts_compression(compressor_solid_dict_exp, tmp_path_chdir):
+    """Render the compression commands into the General section of NSIS scripts."""
+    compressor, solid, dict_size, commands_exp = compressor_solid_dict_exp
+    compression = windows_hlp.nsis_compression(compressor, solid, dict_size)
+    binary = Path("app.exe")
+
+    scripts = [
+        windows_hlp.nsis_cli_script(
+            "app", "app.exe", "me", "0.1.0", binary, compression
+        ),
+        windows_hlp.nsis_gui_script(
+            "app", "app.exe", "me", "0.1.0", binary, Path("icon.ico"), compression
+        ),
+    ]
+    for script in scripts:
+        lines = script.splitlines()
+        idx = lines.index("  ;Compression")
+        assert lines[idx + 1 : idx + 1 + len(commands_exp)] == [
+            f"  {it}" for it in commands_exp
+        ]
+        # compression must be set before the first file is added
+        assert idx < lines.index('  File "app.exe"')
+        assert script.count("SetCompressor ") == 1
+
+
+def test_nsis_scripts_compression_default(tmp_path_chdir):
+    """Use solid LZMA compression by default."""
+    script = windows_hlp.nsis_cli_script("app", "app.exe", "me", "0.1.0", Path("a"))
+    assert "  SetCompressor /SOLID lzma\n" in script
+    assert "SetCompressorDictSize" not in script
+
+
+@pytest.mark.parametrize(
+    "compressor_dict",
+    [("lzma2", None), ("zlib", 64), ("lzma", 0), ("lzma", 2048), ("lzma", "64")],
+)
+def test_nsis_compression_invalid(compressor_dict):
+    """Raise a ValueError for invalid compression settings."""
+    with pytest.raises(ValueError):
+        windows_hlp.nsis_compression(compressor_dict[0], True, compressor_dict[1])
+
+
+def test_create_installer_nsis_compression_invalid(rye_project):
+    """Raise a ClickException if the configured NSIS compression is invalid."""
+    pyproject_writer("nsis_compressor", "lzma2")
+    cri = inst.CreateInstaller()
+
+    with pytest.raises(click.ClickException) as e:
+        cri._nsis_compression()
+
+    assert "Invalid NSIS compressor lzma2" in str(e.value)
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(shutil.which("makensis") is None, reason="makensis not found")
+def test_nsis_compression_size(tmp_path_chdir):
+    """Solid LZMA creates a smaller installer than zlib for a compressible binary."""
+    binary = Path("app.exe")
+    binary.write_bytes(b"".join(i.to_bytes(4, "little") for i in range(1 << 20)))
+
+    sizes = {}
+    for compressor, solid in (("zlib", False), ("lzma", True)):
+        installer = Path(f"app-{compressor}.exe")
+        compression = windows_hlp.nsis_compression(compressor, solid)
+        Path("make_installer.nsi").write_text(
+            windows_hlp.nsis_cli_script(
+                "app", installer.name, "me", "0.1.0", binary, compression
+            )
+        )
+        subprocess.run(["makensis", "make_installer.nsi"], check=True)
+        sizes[compressor] = installer.stat().st_size
+
+    assert sizes["lzma"] < sizes["zlib"]
+
+
+def test_make_app_links_binary(tmp_path):
+    """Hardlink the binary into the `.app` bundle instead of copying it."""
+    binary = tmp_path.joinpath("myapp")
+    binary.write_bytes(b"binary")
+    icon = tmp_path.joinpath("icon.icns")
+    icon.touch()
+
+    mac_hlp.make_app(tmp_path, "myapp", "me", "0.1.0", icon)
+
+    app_binary = tmp_path.joinpath("myapp.app/Contents/MacOS/myapp")
+    assert app_binary.read_bytes() == b"binary"
+    assert os.stat(app_binary).st_ino == os.stat(binary).st_ino
+    assert tmp_path.joinpath("myapp.app/Contents/Resources/icon.icns").is_file()
+    assert tmp_path.joinpath("myapp.app/Contents/Info.plist").is_file()
+
+
+def run_bash_installer(installer: Path, content: str, user_input: str) -> str:
+    """Write a bash installer with the given content and run it.
+
+    :param installer: Path to the installer file.
+    :param content: Content of the installer.
+    :param user_input: Input to provide to the prompts of the installer.
+
+    :return: Output of the installer.
+    """
+    installer.write_text(content)
+    result = subprocess.run(
+        ["bash", str(installer)], input=user_input, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+def test_linux_cli_installer_versions(tmp_path):
+    """Install versions side by side, switch atomically, prune and roll back."""
+    install_dir = tmp_path.joinpath("bin")
+    install_dir.mkdir()
+    install_file = install_dir.joinpath("app")
+    root_dir = install_dir.joinpath(".app")
+
+    for version in ["0.1.0", "0.2.0", "0.3.0"]:
+        content = linux_hlp.create_bash_installer_cli("app", version, keep_versions=2)
+        run_bash_installer(
+            tmp_path.joinpath("installer.sh"),
+            content + f"binary {version}\n",
+            f"{install_dir}\n",
+        )
+        assert install_file.is_symlink()
+        assert install_file.read_text() == f"binary {version}\n"
+        if version == "0.1.0":  # leftovers must not prevent pruning
+            root_dir.joinpath("versions/0.1.0/.app.tmp").write_text("partial")
+        time.sleep(0.01)  # versions are pruned by modification time
+
+    assert os.readlink(install_file) == ".app/current/app"
+    assert sorted(os.listdir(root_dir.joinpath("versions"))) == ["0.2.0", "0.3.0"]
+    assert os.readlink(root_dir.joinpath("current")) == "versions/0.3.0"
+
+    # instant rollback
+    subprocess.run([str(root_dir.joinpath("switch_version.sh")), "0.2.0"], check=True)
+    assert install_file.read_text() == "binary 0.2.0\n"
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+def test_linux_gui_installer_versions(tmp_path):
+    """Upgrade a GUI without prompts and uninstall all versions again."""
+    install_dir = tmp_path.joinpath("gui")
+    desktop_dir = tmp_path.joinpath("applications")
+    desktop_dir.mkdir()
+
+    # versions with different icons and extra files must be removed as well
+    for version, icon in [("0.1.0", "icon.png"), ("0.2.0", "icon.svg")]:
+        content = linux_hlp.create_bash_installer_gui("app", version, icon)
+        run_bash_installer(
+            tmp_path.joinpath("installer.sh"),
+            content + f"binary {version}\n#__ICON_BINARY__\n<svg/>",
+            f"{install_dir}\n{desktop_dir}\n",
+        )
+        if version == "0.1.0":
+            install_dir.joinpath("versions/0.1.0/.app.tmp").write_text("partial")
+
+    assert install_dir.joinpath("current/app").read_text() == "binary 0.2.0\n"
+    assert install_dir.joinpath("current/icon.svg").read_text() == "<svg/>"
+    assert install_dir.joinpath("versions/0.1.0/icon.png").is_file()
+    assert sorted(os.listdir(install_dir.joinpath("versions"))) == ["0.1.0", "0.2.0"]
+    desktop_file = desktop_dir.joinpath("app.desktop").read_text()
+    assert f"Exec={install_dir}/current/app" in desktop_file
+
+    run_bash_installer(
+        tmp_path.joinpath("uninstall.sh"),
+        install_dir.joinpath("uninstall_app.sh").read_text(),
+        "y\n",
+    )
+    assert not install_dir.exists()
+    assert not desktop_dir.joinpath("app.desktop").exists()
+
+
+@pytest.mark.parametrize(
+    "keep_versions_msg",
+    [
+        (0, "Invalid keep_versions"),
+        (-1, "Invalid keep_versions"),
+        ("3", "`keep_versions` must be a int"),
+        (True, "`keep_versions` must be a int"),
+    ],
+)
+def test_create_installer_keep_versions_invalid(rye_project, keep_versions_msg):
+    """Raise a ClickException if the number of versions to keep is invalid."""
+    keep_versions, msg = keep_versions_msg
+    pyproject_writer("keep_versions", keep_versions)
+
+    with pytest.raises(click.ClickException) as e:
+        _ = inst.CreateInstaller()._keep_versions
+
+    assert msg in str(e.value)
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+@pytest.mark.parametrize("timeout_sleep", [(30, 0), (1, 10)])
+def test_linux_cli_installer_prewarm(tmp_path, timeout_sleep):
+    """Run the restore command of the installed binary, stop it after the timeout."""
+    timeout, sleep = timeout_sleep
+    install_dir = tmp_path.joinpath("bin")
+    install_dir.mkdir()
+    # mock binary that records how it was called
+    binary = f'#!/bin/bash\nsleep {sleep}\necho "$@" > "{tmp_path}/called"\n'
+
+    prewarm = linux_hlp.bash_prewarm("mgmt", timeout)
+    content = linux_hlp.create_bash_installer_cli("app", "0.1.0", prewarm=prewarm)
+    tic = time.time()
+    output = run_bash_installer(
+        tmp_path.joinpath("installer.sh"), content + binary, f"{install_dir}\n"
+    )
+
+    assert time.time() - tic < 9
+    assert "Setting up app" in output
+    if sleep:
+        assert "Setup did not finish" in output
+        assert not tmp_path.joinpath("called").exists()
+    else:
+        assert "Setup did not finish" not in output
+        assert tmp_path.joinpath("called").read_text() == "mgmt restore\n"
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+@pytest.mark.skipif("os.geteuid() != 0", reason="Installer must run as root")
+def test_linux_cli_installer_prewarm_sudo_user(tmp_path, monkeypatch):
+    """Pre-warm as the user that invoked `sudo`, not as root."""
+    install_dir = tmp_path.joinpath("bin")
+    install_dir.mkdir()
+    mock_bin = tmp_path.joinpath("mock_bin")
+    mock_bin.mkdir()
+    sudo = mock_bin.joinpath("sudo")
+    sudo.write_text(f'#!/bin/bash\necho "$@" > "{tmp_path}/sudo"\n')
+    sudo.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{mock_bin}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("SUDO_USER", "dev")
+
+    prewarm = linux_hlp.bash_prewarm("self", 30)
+    content = linux_hlp.create_bash_installer_cli("app", "0.1.0", prewarm=prewarm)
+    run_bash_installer(
+        tmp_path.joinpath("installer.sh"), content + "binary\n", f"{install_dir}\n"
+    )
+
+    assert tmp_path.joinpath("sudo").read_text() == (
+        f"-u dev -H {install_dir}/app self restore\n"
+    )
+
+
+def test_bash_installers_prewarm_disabled():
+    """Do not pre-warm the environment by default."""
+    assert linux_hlp.bash_prewarm("self", None) == ""
+    assert "restore" not in linux_hlp.create_bash_installer_cli("app", "0.1.0")
+    assert "restore" not in linux_hlp.create_bash_installer_gui("app", "0.1.0", "i")
+
+
+def test_create_installer_prewarm(rye_project):
+    """Render pre-warming with the configured timeout and management command."""
+    cri = inst.CreateInstaller()
+    assert cri._bash_prewarm() == ""
+
+    pyproject_writer("installer_prewarm", True)
+    pyproject_writer("installer_prewarm_timeout", 42)
+    pyproject_writer("env-vars", {"PYAPP_SELF_COMMAND": "mgmt"})
+    cri = inst.CreateInstaller()
+    assert 'timeout 42 $RUN_AS "$INSTALL_FILE" mgmt restore' in cri._bash_prewarm()
+
+    pyproject_writer("installer_prewarm_timeout", 0)
+    cri = inst.CreateInstaller()
+    with pytest.raises(click.ClickException):
+        cri._bash_prewarm()
+
+    pyproject_writer("env-vars", {"PYAPP_SELF_COMMAND": "none"})
+    cri = inst.CreateInstaller()
+    assert cri._bash_prewarm() == ""
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+def test_linux_pipe_installer_streams(tmp_path):
+    """Extract the binary from a pipe while it arrives and verify it at the end."""
+    install_dir = tmp_path.joinpath("bin")
+    install_dir.mkdir()
+    version_dir = install_dir.joinpath(".app/versions/0.1.0")
+    payload = os.urandom(1 << 20) + b"\n#__PROGRAM_BINARY__\n\x00"
+    content = linux_hlp.create_bash_installer_pipe(
+        "app", "0.1.0", len(payload), hashlib.sha256(payload).hexdigest()
+    ).encode("utf-8")
+
+    env = dict(os.environ, BOX_INSTALL_DIR=str(install_dir))
+    proc = subprocess.Popen(
+        ["bash"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env
+    )
+    first_part = 1 << 18
+    proc.stdin.write(content + payload[:first_part])
+    proc.stdin.flush()
+
+    # the first part is written (in blocks) before the rest of the payload arrives
+    tmp_file = version_dir.joinpath(".app.tmp")
+    tic = time.time()
+    while not (tmp_file.is_file() and tmp_file.stat().st_size > first_part // 2):
+        assert time.time() - tic < 10
+        time.sleep(0.01)
+    assert tmp_file.stat().st_size <= first_part
+
+    proc.stdin.write(payload[first_part:])
+    output, _ = proc.communicate()
+
+    assert proc.returncode == 0, output
+    assert install_dir.joinpath("app").read_bytes() == payload
+    assert not tmp_file.exists()
+
+
+@pytest.mark.skipif("sys.platform != 'linux'", reason="Linux installer")
+@pytest.mark.parametrize("pipe", [True, False])
+def test_linux_pipe_installer_checksum(tmp_path, pipe):
+    """Run the pipe installer from a pipe or a file and reject corrupted binaries."""
+    install_dir = tmp_path.joinpath("bin")
+    install_dir.mkdir()
+    payload = b"binary"
+    content = linux_hlp.create_bash_installer_pipe(
+        "app", "0.1.0", len(payload), hashlib.sha256(payload).hexdigest()
+    ).encode("utf-8")
+    env = dict(os.environ, BOX_INSTALL_DIR=str(install_dir))
+
+    def run(data: bytes) -> subprocess.CompletedProcess:
+        """Run the installer from a pipe or from a file."""
+        if pipe:
+            return subprocess.run(["bash"], input=data, capture_output=True, env=env)
+        installer = tmp_path.joinpath("installer.sh")
+        installer.write_bytes(data)
+        return subprocess.run(["bash", str(installer)], capture_output=True, env=env)
+
+    result = run(content + b"binarY")
+    assert result.returncode == 1
+    assert b"Checksum mismatch" in result.stdout
+    assert not install_dir.joinpath("app").exists()
+
+    result = run(content + payload)
+    assert result.returncode == 0
+    assert install_dir.joinpath("app").read_bytes() == payload
+
+
+def test_hashing_writer_patched(tmp_path):
+    """Flag the hashes as invalid if the writer seeks back to patch a header."""
+    file = tmp_path.joinpath("file")
+    with open(file, "wb") as f:
+        writer = cs.HashingWriter(f, ("sha256",))
+        writer.write(b"head")
+        assert not writer.patched
+        writer.seek(0)
+        writer.write(b"HEAD")
+        writer.seek(0, os.SEEK_END)
+        writer.write(b"tail")
+
+    assert file.read_bytes() == b"HEADtail"
+    assert writer.patched
+    assert writer.size == 8
+    with pytest.raises(ValueError):
+        writer.hexdigests()
+
+
+def test_create_installer_icon_configured(rye_project):
+    """Use the icon that is configured in `[tool.box]`."""
+    create_icon("png", Path.cwd())
+    logo = Path.cwd().joinpath("logo.svg")
+    logo.touch()
+    pyproject_writer("icon", "logo.svg")
+
+    cri = inst.CreateInstaller()
+    assert cri._icon() == logo
+    with pytest.raises(click.ClickException) as e:
+        cri._icon("png")  # the icon of the assets folder is not used
+    assert "configured icon logo.svg" in e.value.message
+    logo.with_suffix(".png").touch()
+    assert cri._icon("png") == logo.with_suffix(".png")
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_verify_reproducible_restores_force(rye_project, mocker, fails):
+    """Restore the force flag after the check, such that the cache is used again."""
+    cri = inst.CreateInstaller()
+    forced = []
+
+    def create_installer():
+        forced.append(cri._force)
+        if fails:
+            raise click.ClickException("failed")
+
+    mocker.patch.object(cri, "create_installer", side_effect=create_installer)
+    mocker.patch.object(inst.CreateInstaller, "installer_name", None)
+
+    if fails:
+        with pytest.raises(click.ClickException):
+            cri.verify_reproducible()
+    else:
+        cri.verify_reproducible()
+
+    assert forced == ([True] if fails else [True, True])
+    assert cri._force is False
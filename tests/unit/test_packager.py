@@ -1,6 +1,7 @@
 # Test building a project with PyApp.
 
 import os
+import sys
 import tarfile
 import urllib.request
 from pathlib import Path
@@ -40,21 +41,23 @@ def create_pyapp_source(project_path: Path) -> Path:
 # TESTS #
 
 
-def test_builder_invalid(rye_project):
+def test_builder_invalid(rye_project, mocker):
     """Raise an error if an invalid builder is given."""
     builder = "invalid"  # can only happen in user-modified pyproject.toml
     pyproject_writer("builder", builder)
 
+    sp_mock = mocker.patch("subprocess.run")
     packager = PackageApp()
 
-    with pytest.raises(KeyError) as e:
+    with pytest.raises(click.ClickException) as e:
         packager.build()
 
-    assert f"Unknown {builder=}" in e.value.args[0]
+    assert f"Unknown builder '{builder}'" in e.value.message
+    sp_mock.assert_not_called()  # fail before building
 
 
-@pytest.mark.parametrize("builder", ["rye", "hatch", "build", "flit", "pdm"])
-def test_builders(min_proj_no_box, mocker, builder):
+@pytest.mark.parametrize("builder", ["rye", "hatch", "build", "flit", "pdm", "uv"])
+def test_builders(rye_project, mocker, builder):
     """Test all builders are called correctly."""
     # mock subprocess.run
     sp_mock = mocker.patch("subprocess.run")
@@ -66,14 +69,46 @@ def test_builders(min_proj_no_box, mocker, builder):
     packager.build()
 
     sp_mock.assert_called_with(
-        packager._builders[builder], stdout=mocker.ANY, stderr=mocker.ANY
+        packager.builder_command, stdout=mocker.ANY, stderr=mocker.ANY
     )
+    assert not any("{" in it for it in packager.builder_command)
 
-    expected_path = min_proj_no_box.joinpath("dist")
+    expected_path = rye_project.joinpath("dist")
     assert packager._dist_path == expected_path
 
 
-def test_custom_builder(min_proj_no_box, mocker):
+@pytest.mark.parametrize("builder_python", [("build", True), ("uv", False)])
+def test_builder_python_lazy(rye_project, mocker, builder_python):
+    """Find the Python command only for builders that run it."""
+    builder, uses_python = builder_python
+    mocker.patch("subprocess.run")
+    python_mock = mocker.patch("box.utils.cmd_python", return_value="py")
+    pyproject_writer("builder", builder)
+
+    packager = PackageApp()
+    python_mock.assert_not_called()
+    packager.build()
+
+    assert python_mock.called == uses_python
+    assert ("py" in packager.builder_command) == uses_python
+
+
+def test_inprocess_builder(rye_project, mocker):
+    """Build the sdist with the PEP 517 backend in this process."""
+    sp_mock = mocker.patch("subprocess.run")
+    build_mock = mocker.patch("box.pep517.build_sdist")
+    pyproject_writer("builder", "inprocess")
+
+    packager = PackageApp()
+    packager.build()
+
+    build_mock.assert_called_with(
+        rye_project, rye_project.joinpath("dist"), verbose=False
+    )
+    sp_mock.assert_not_called()
+
+
+def test_custom_builder(rye_project, mocker):
     """Test custom builder called correctly."""
     # mock subprocess.run
     sp_mock = mocker.patch("subprocess.run")
@@ -90,7 +125,7 @@ def test_custom_builder(min_proj_no_box, mocker):
         build_cmd.split(" "), stdout=mocker.ANY, stderr=mocker.ANY
     )
 
-    expected_path = min_proj_no_box.joinpath("dist")
+    expected_path = rye_project.joinpath("dist")
     assert packager._dist_path == expected_path
 
 
@@ -369,3 +404,61 @@ def test_set_env_delete_existing(rye_project):
 
     with pytest.raises(KeyError):
         _ = os.environ[var_name]
+
+
+def test_set_env_reproducible(rye_project, mocker):
+    """Set the environment for a reproducible cargo build."""
+    mocker.patch.dict(os.environ, {"RUSTFLAGS": "-C opt-level=3"})
+    mocker.patch.dict(os.environ)
+    os.environ.pop("SOURCE_DATE_EPOCH", None)
+
+    packager = PackageApp(reproducible=True)
+    packager._dist_path = rye_project
+    packager._pyapp_path = rye_project.joinpath("build/pyapp-vx.y.z")
+    packager._set_env()
+
+    assert os.environ["SOURCE_DATE_EPOCH"] == str(ut.REPRODUCIBLE_EPOCH)
+    assert os.environ["CARGO_INCREMENTAL"] == "0"
+    rustflags = os.environ["RUSTFLAGS"]
+    assert rustflags.startswith("-C opt-level=3 ")
+    # rustc applies the last matching remap, so the most specific comes last
+    assert rustflags.split()[-3:] == [
+        f"--remap-path-prefix={Path.home()}=/home",
+        f"--remap-path-prefix={rye_project}=/project",
+        f"--remap-path-prefix={packager._pyapp_path}=/pyapp",
+    ]
+
+
+def test_package_pyapp_reproducible_mtime(rye_project, mocker):
+    """Set the modification time of the binary to `SOURCE_DATE_EPOCH`."""
+    mocker.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000"})
+    mocker.patch("subprocess.run")
+
+    pyapp_path = rye_project.joinpath("build/pyapp-vx.y.z")
+    binary_path = pyapp_path.joinpath("target/release/pyapp")
+    if sys.platform == "win32":
+        binary_path = binary_path.with_suffix(".exe")
+    binary_path.parent.mkdir(parents=True)
+    binary_path.write_text("not really a binary")
+
+    packager = PackageApp()
+    packager._pyapp_path = pyapp_path
+    packager._package_pyapp()
+
+    assert os.stat(packager.binary_name).st_mtime == 1700000000
+
+
+def test_get_pyapp_mirror(rye_project, mocker):
+    """Download PyApp from the configured mirror."""
+    url_mock = mocker.patch.object(urllib.request, "urlretrieve")
+    pyproject_writer("pyapp_source_url", "https://mirror.example/pyapp/")
+
+    packager = PackageApp()
+    packager._build_dir.mkdir(parents=True, exist_ok=True)
+    with pytest.raises(click.ClickException):  # nothing is downloaded
+        packager._get_pyapp("v0.20.0")
+
+    url_mock.assert_called_with(
+        "https://mirror.example/pyapp/download/v0.20.0/source.tar.gz",
+        Path("pyapp-source.tar.gz"),
+    )
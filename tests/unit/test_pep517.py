@@ -0,0 +1,171 @@
+# Test building the sdist in-process with the PEP 517 backend
+
+import importlib.util
+import subprocess
+import sys
+
+import pytest
+import rich_click as click
+
+from box import pep517
+
+IN_TREE_BACKEND = """
+import tarfile
+from pathlib import Path
+
+
+def get_requires_for_build_sdist(config_settings=None):
+    return []
+
+
+def build_sdist(sdist_directory, config_settings=None):
+    print("building the sdist")
+    name = "myapp-0.1.0.tar.gz"
+    with tarfile.open(Path(sdist_directory).joinpath(name), "w:gz") as tar:
+        tar.add("pyproject.toml", arcname="myapp-0.1.0/pyproject.toml")
+    return name
+"""
+
+
+@pytest.fixture
+def in_tree_backend(min_proj_no_box):
+    """Project with an in-tree build backend without requirements."""
+    min_proj_no_box.joinpath("_backend").mkdir()
+    min_proj_no_box.joinpath("_backend/mybackend.py").write_text(IN_TREE_BACKEND)
+    with open(min_proj_no_box.joinpath("pyproject.toml"), "a") as f:
+        f.write(
+            "\n[build-system]\n"
+            "requires = []\n"
+            'build-backend = "mybackend"\n'
+            'backend-path = ["_backend"]\n'
+        )
+    return min_proj_no_box
+
+
+def fake_pip(mocker, returncode=0, pip=True):
+    """Mock `pip install --target` and create the target folder.
+
+    :param pip: Whether pip can be imported, `uv pip` is used otherwise.
+    """
+    find_spec = importlib.util.find_spec
+    pip_spec = object() if pip else None
+    mocker.patch.object(
+        importlib.util,
+        "find_spec",
+        side_effect=lambda name, *args: (
+            pip_spec if name == "pip" else find_spec(name, *args)
+        ),
+    )
+
+    def run(cmd, **kwargs):
+        target = cmd[cmd.index("--target") + 1]
+        with open(f"{target}/installed.txt", "w") as f:
+            f.write(" ".join(cmd))
+        return subprocess.CompletedProcess(cmd, returncode, "", "pip failed")
+
+    return mocker.patch("subprocess.run", side_effect=run)
+
+
+def test_build_sdist(in_tree_backend, capsys):
+    """Build the sdist with the backend and forget its imports afterwards."""
+    path = list(sys.path)
+
+    sdist = pep517.build_sdist(in_tree_backend, in_tree_backend.joinpath("dist"))
+
+    assert sdist == in_tree_backend.joinpath("dist/myapp-0.1.0.tar.gz")
+    assert sdist.is_file()
+    assert "mybackend" not in sys.modules
+    assert sys.path == path
+    assert "building the sdist" not in capsys.readouterr().out
+
+
+def test_build_sdist_backend_fails(in_tree_backend):
+    """Raise a click exception if the backend fails."""
+    in_tree_backend.joinpath("_backend/mybackend.py").write_text(
+        "def build_sdist(sdist_directory, config_settings=None):\n"
+        "    raise RuntimeError('no sources')\n"
+    )
+
+    with pytest.raises(click.ClickException) as err:
+        pep517.build_sdist(in_tree_backend, in_tree_backend.joinpath("dist"))
+
+    assert "`mybackend` failed to build the sdist: no sources" in err.value.message
+
+
+def test_build_sdist_requires_hook_fails(in_tree_backend):
+    """Raise a click exception if the hook for the requirements fails."""
+    in_tree_backend.joinpath("_backend/mybackend.py").write_text(
+        "def get_requires_for_build_sdist(config_settings=None):\n"
+        "    raise RuntimeError('no metadata')\n"
+    )
+
+    with pytest.raises(click.ClickException) as err:
+        pep517.build_sdist(in_tree_backend, in_tree_backend.joinpath("dist"))
+
+    assert "failed to get the requirements for the sdist: no metadata" in (
+        err.value.message
+    )
+    assert "mybackend" not in sys.modules
+
+
+def test_build_sdist_backend_object_missing(in_tree_backend):
+    """Raise a click exception if the backend object does not exist."""
+    pyproject = in_tree_backend.joinpath("pyproject.toml")
+    pyproject.write_text(
+        pyproject.read_text().replace('"mybackend"', '"mybackend:missing"')
+    )
+
+    with pytest.raises(click.ClickException) as err:
+        pep517.build_sdist(in_tree_backend, in_tree_backend.joinpath("dist"))
+
+    assert "Cannot find build backend `mybackend:missing`" in err.value.message
+
+
+def test_build_env_cached(box_cache_dir, mocker):
+    """Install the requirements once and re-use the build environment."""
+    pip_mock = fake_pip(mocker)
+
+    env = pep517.build_env(["hatchling", "hatch-vcs"])
+    assert pep517.build_env(["hatch-vcs", "hatchling"]) == env
+    assert pep517.build_env(["setuptools"]) != env
+
+    assert env.parent == box_cache_dir.joinpath("build-envs")
+    assert env.joinpath("installed.txt").read_text().endswith("hatch-vcs hatchling")
+    assert pip_mock.call_count == 2
+    assert not list(env.parent.glob("*.tmp"))
+
+
+def test_build_env_pip_fails(box_cache_dir, mocker):
+    """Raise a click exception and leave no build environment if pip fails."""
+    fake_pip(mocker, returncode=1)
+
+    with pytest.raises(click.ClickException) as err:
+        pep517.build_env(["hatchling"])
+
+    assert "Cannot install the build requirements hatchling" in err.value.message
+    assert "pip failed" in err.value.message
+    assert not list(box_cache_dir.joinpath("build-envs").iterdir())
+
+
+def test_build_env_uv_pip(box_cache_dir, mocker):
+    """Install the requirements with `uv pip` if pip is not available."""
+    fake_pip(mocker, pip=False)
+    mocker.patch("shutil.which", return_value="/usr/bin/uv")
+
+    env = pep517.build_env(["hatchling"])
+
+    installed = env.joinpath("installed.txt").read_text()
+    assert installed.startswith("/usr/bin/uv pip install --target")
+    assert f"--python {sys.executable}" in installed
+
+
+def test_build_env_no_installer(box_cache_dir, mocker):
+    """Raise a click exception if neither pip nor uv is available."""
+    run_mock = fake_pip(mocker, pip=False)
+    mocker.patch("shutil.which", return_value=None)
+
+    with pytest.raises(click.ClickException) as err:
+        pep517.build_env(["hatchling"])
+
+    assert "neither pip nor uv is available" in err.value.message
+    run_mock.assert_not_called()
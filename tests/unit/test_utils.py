@@ -1,5 +1,6 @@
 # Test utility functions.
 
+import os
 from pathlib import Path
 
 import pytest
@@ -50,6 +51,75 @@ def test_check_pyproject_error(tmp_path):
             ut.check_pyproject()
 
 
+@pytest.mark.parametrize(
+    "env_reproducible_exp",
+    [
+        [None, False, None],
+        [None, True, ut.REPRODUCIBLE_EPOCH],
+        ["1700000000", False, 1700000000],
+        ["1700000000", True, 1700000000],
+    ],
+)
+def test_source_date_epoch(monkeypatch, env_reproducible_exp):
+    """Get the timestamp for reproducible builds, honour `SOURCE_DATE_EPOCH`."""
+    env, reproducible, exp = env_reproducible_exp
+    if env is None:
+        monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    else:
+        monkeypatch.setenv("SOURCE_DATE_EPOCH", env)
+    assert ut.source_date_epoch(reproducible) == exp
+
+
+def test_source_date_epoch_invalid(monkeypatch):
+    """Raise a click exception if `SOURCE_DATE_EPOCH` is not an integer."""
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "yesterday")
+    with pytest.raises(ClickException):
+        ut.source_date_epoch()
+
+
+def test_link_or_copy_hardlink(tmp_path):
+    """Hardlink the file if source and destination are on the same file system."""
+    src = tmp_path.joinpath("src")
+    src.write_bytes(b"binary")
+    dst = tmp_path.joinpath("dst")
+
+    assert ut.link_or_copy(src, dst) == "hardlink"
+    assert os.stat(src).st_ino == os.stat(dst).st_ino
+
+
+@pytest.mark.parametrize("reflink", [True, False])
+def test_link_or_copy_fallback(tmp_path, mocker, reflink):
+    """Reflink or copy the file including its mode if hardlinking fails."""
+    mocker.patch("os.link", side_effect=OSError("cross-device link"))
+    reflink_mock = mocker.patch("box.utils._reflink", return_value=reflink)
+
+    src = tmp_path.joinpath("src")
+    src.write_bytes(b"binary")
+    src.chmod(0o755)
+    dst = tmp_path.joinpath("dst")
+    if reflink:  # the mock does not create the file
+        dst.write_bytes(b"binary")
+
+    assert ut.link_or_copy(src, dst) == ("reflink" if reflink else "copy")
+    reflink_mock.assert_called_once_with(src, dst)
+    assert dst.read_bytes() == b"binary"
+    assert os.stat(src).st_ino != os.stat(dst).st_ino
+    if os.name != "nt":
+        assert os.stat(dst).st_mode & 0o777 == 0o755
+
+
+def test_reflink_unsupported_cleans_up(tmp_path, mocker):
+    """Remove the destination file again if the file system cannot reflink."""
+    mocker.patch("sys.platform", "linux")
+    mocker.patch("fcntl.ioctl", side_effect=OSError("not supported"))
+    src = tmp_path.joinpath("src")
+    src.write_bytes(b"binary")
+    dst = tmp_path.joinpath("dst")
+
+    assert not ut._reflink(src, dst)
+    assert not dst.exists()
+
+
 def test_set_dir(tmp_path):
     """Change to a different folder inside context manager, then change back"""
     origin = Path.cwd()
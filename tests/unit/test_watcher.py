@@ -0,0 +1,198 @@
+# Test watching the project and packaging it again
+
+import io
+import sys
+import tarfile
+import threading
+import time
+
+import pytest
+
+from box import watcher as wt
+from box.watcher import InotifyWatcher, PollingWatcher, ProjectWatcher
+
+
+def write_sdist(project, files):
+    """Write an sdist of the given files, which are also created in the project."""
+    dist = project.joinpath("dist")
+    dist.mkdir(exist_ok=True)
+    sdist = dist.joinpath("myapp-0.1.0.tar.gz")
+    with tarfile.open(sdist, "w:gz") as tar:
+        for name, content in files.items():
+            file = project.joinpath(name)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(content)
+            info = tarfile.TarInfo(f"myapp-0.1.0/{name}")
+            info.size = len(content)
+            info.mtime = time.time()  # timestamps do not change the digest
+            tar.addfile(info, io.BytesIO(content.encode()))
+    return sdist
+
+
+@pytest.fixture
+def watched_project(min_proj_no_box):
+    """Project with an sdist of `pyproject.toml` and a package in `src`."""
+    files = {
+        "pyproject.toml": min_proj_no_box.joinpath("pyproject.toml").read_text(),
+        "src/myapp/__init__.py": "print('hello')\n",
+    }
+    project_watcher = ProjectWatcher()
+    project_watcher._snapshot(write_sdist(min_proj_no_box, files))
+    return min_proj_no_box, project_watcher, files
+
+
+@pytest.mark.parametrize(
+    "watcher_class",
+    [
+        PollingWatcher,
+        pytest.param(
+            InotifyWatcher,
+            marks=pytest.mark.skipif(
+                not sys.platform.startswith("linux"), reason="inotify is Linux only"
+            ),
+        ),
+    ],
+)
+def test_watcher_changes(tmp_path, watcher_class, mocker):
+    """Report modified, new, and deleted files in the watched folders."""
+    mocker.patch.object(wt, "WATCH_POLL_INTERVAL", 0.01)
+    existing = tmp_path.joinpath("existing.py")
+    existing.write_text("a")
+    watcher = watcher_class([tmp_path])
+    try:
+        assert watcher.changes(0.05) == set()
+
+        time.sleep(0.01)  # modification time must change for polling
+        existing.write_text("bb")
+        new = tmp_path.joinpath("new.py")
+        new.write_text("c")
+        assert watcher.changes(5) | watcher.changes(0.1) >= {existing, new}
+
+        existing.unlink()
+        assert existing in watcher.changes(5)
+    finally:
+        watcher.close()
+
+
+def test_polling_watcher_watch(tmp_path, mocker):
+    """Watch further folders without reporting their existing entries."""
+    mocker.patch.object(wt, "WATCH_POLL_INTERVAL", 0.01)
+    folder = tmp_path.joinpath("pkg")
+    folder.mkdir()
+    folder.joinpath("existing.py").write_text("a")
+    watcher = PollingWatcher([tmp_path])
+
+    watcher.watch([tmp_path, folder])
+    assert watcher.changes(0.05) == set()
+
+    new = folder.joinpath("new.py")
+    new.write_text("b")
+    assert new in watcher.changes(5)
+
+
+def test_make_watcher_fallback(tmp_path, mocker):
+    """Fall back to polling if inotify is not available."""
+    mocker.patch.object(wt, "InotifyWatcher", side_effect=OSError)
+    assert isinstance(wt.make_watcher([tmp_path]), PollingWatcher)
+
+
+def test_relevant_changes(watched_project):
+    """Only changes of files that end up in the sdist are relevant."""
+    project, project_watcher, _ = watched_project
+    init = project.joinpath("src/myapp/__init__.py")
+    pkg = init.parent
+
+    init.write_text("print('hello')\n")  # saved without changing the content
+    for name in ("__pycache__", "mod.pyc", ".mod.py.swp"):
+        pkg.joinpath(name).touch()
+    project.joinpath("README.md").touch()  # not in a source folder
+    assert project_watcher.relevant(pkg.iterdir()) == set()
+    assert project_watcher.relevant([project.joinpath("README.md")]) == set()
+
+    init.write_text("print('changed')\n")
+    new_module = pkg.joinpath("module.py")
+    new_module.touch()
+    setup = project.joinpath("setup.py")
+    setup.touch()
+    assert project_watcher.relevant([init, new_module, setup]) == {
+        init,
+        new_module,
+        setup,
+    }
+
+    init.unlink()
+    assert project_watcher.relevant([init]) == {init}
+
+
+@pytest.mark.parametrize("changed", [True, False])
+def test_rebuild_skips_cargo(watched_project, mocker, changed):
+    """Only run cargo if the content of the source distribution changed."""
+    project, project_watcher, files = watched_project
+    if changed:
+        files["src/myapp/__init__.py"] = "print('changed')\n"
+
+    mocker.patch.object(
+        wt.PackageApp, "build", side_effect=lambda: write_sdist(project, files)
+    )
+    package_mock = mocker.patch.object(wt.PackageApp, "package")
+    mocker.patch.object(wt.PackageApp, "binary_name", project.joinpath("myapp"))
+    mocker.patch.object(
+        wt.PackageApp, "sdist", project.joinpath("dist/myapp-0.1.0.tar.gz")
+    )
+
+    project_watcher._rebuild()
+
+    assert package_mock.called == changed
+
+
+def test_wait_for_changes_debounced(watched_project, mocker):
+    """Collect changes until none come in for the debounce time."""
+    project, project_watcher, _ = watched_project
+    mocker.patch.object(wt, "WATCH_DEBOUNCE", 0.2)
+    init = project.joinpath("src/myapp/__init__.py")
+    module = project.joinpath("src/myapp/module.py")
+
+    def edit():
+        time.sleep(0.2)
+        init.write_text("print('changed')\n")
+        time.sleep(0.05)
+        module.write_text("")
+
+    watcher = wt.make_watcher(project_watcher._folders())
+    editor = threading.Thread(target=edit)
+    editor.start()
+    try:
+        changed = project_watcher._wait_for_changes(watcher)
+    finally:
+        editor.join()
+        watcher.close()
+
+    assert changed == {init, module}
+
+
+def test_change_during_rebuild(watched_project, mocker):
+    """Files saved while the project is packaged again trigger the next rebuild."""
+    project, project_watcher, files = watched_project
+    init = project.joinpath("src/myapp/__init__.py")
+    mocker.patch.object(wt, "WATCH_DEBOUNCE", 0.05)
+    mocker.patch.object(wt, "WATCH_POLL_INTERVAL", 0.01)
+
+    def build():
+        """Build the sdist, then the user saves a file before packaging finished."""
+        write_sdist(project, files)
+        time.sleep(0.01)  # modification time must change for polling
+        init.write_text("print('saved during the build')\n")
+
+    mocker.patch.object(wt.PackageApp, "build", side_effect=build)
+    mocker.patch.object(wt.PackageApp, "package")
+    mocker.patch.object(wt.PackageApp, "binary_name", project.joinpath("myapp"))
+    mocker.patch.object(
+        wt.PackageApp, "sdist", project.joinpath("dist/myapp-0.1.0.tar.gz")
+    )
+
+    watcher = wt.make_watcher(project_watcher._folders())
+    try:
+        project_watcher._rebuild()
+        assert project_watcher._wait_for_changes(watcher) == {init}
+    finally:
+        watcher.close()